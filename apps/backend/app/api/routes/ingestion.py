@@ -2,53 +2,311 @@
 
 from __future__ import annotations
 
+import asyncio
+import tarfile
+import zipfile
 from pathlib import Path
-from typing import List
+from typing import AsyncIterable, AsyncIterator, List, Mapping, Optional
 
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile
 from fastapi.responses import JSONResponse
 
+from ...config import settings
 from ...database import DeadLetter, IngestionRun, get_session
-from ...schemas import DeadLetterRead, FolderIngestionRequest, IngestionRunRead, TriggerIngestionRequest
-from ...services.ingestion import ingest_document_flow, ingest_paths
-from ...services.storage import storage_service
+from ...schemas import (
+    DeadLetterRead,
+    DeadLetterRetryReport,
+    DeadLetterRetryRequest,
+    FolderIngestionRequest,
+    IngestionJobRead,
+    IngestionRunRead,
+    IngestionRunStats,
+    TriggerIngestionRequest,
+)
+from ...services.admission import (
+    AdmissionRejected,
+    Reservation,
+    admission_controller,
+    input_sizes,
+)
+from ...services.archives import ArchiveListing, archive_reader, is_archive
+from ...services.dead_letters import dead_letter_retrier
+from ...services.ingestion import ingestion_scheduler
+from ...services.jobs import job_manager
+from ...services.storage import UploadTooLargeError, storage_service
+from ...services.sync import folder_sync_service
+from ...services.timing import summarise_stage_timings
 
 router = APIRouter(prefix="/api/ingest", tags=["ingestion"])
 
 
-@router.post("/upload")
-async def upload_document(file: UploadFile) -> JSONResponse:
-    data = await file.read()
-    saved_path, checksum, mime_type = storage_service.save_upload(file.filename, data)
-    external_id = await ingest_document_flow(path=str(saved_path), source="upload")
+def _job_accepted(job_id: str, skipped: List[str] | None = None) -> JSONResponse:
+    job = job_manager.get(job_id)
+    payload = job.model_dump(mode="json") if job else {"job_id": job_id}
+    if skipped is not None:
+        payload["skipped"] = skipped
+    headers = {"Location": f"/api/ingest/jobs/{job_id}"}
+    return JSONResponse(payload, status_code=202, headers=headers)
+
+
+def _too_large_detail() -> str:
+    return f"Upload exceeds the {settings.max_upload_bytes} byte limit"
+
+
+async def _upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(settings.upload_chunk_bytes):
+        yield chunk
+
+
+def _check_extension(filename: str) -> None:
+    """Reject an upload of an unsupported type before any of its bytes are spooled."""
+
+    suffix = Path(filename).suffix.lower()
+    if not is_archive(filename) and suffix not in settings.allowed_extensions:
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported extension for ingestion: {suffix}"
+        )
+
+
+def _admit(source: str, sizes: Mapping[str, int]) -> Reservation:
+    try:
+        return admission_controller.admit(source, sizes)
+    except AdmissionRejected as exc:
+        headers = {"Retry-After": str(exc.retry_after)}
+        raise HTTPException(status_code=429, detail=str(exc), headers=headers) from exc
+
+
+async def _store_and_ingest(
+    filename: str,
+    chunks: AsyncIterable[bytes],
+    force: bool,
+    priority: Optional[int],
+    declared_bytes: int,
+) -> JSONResponse:
+    reservation = _admit("upload", {filename: declared_bytes})
+    try:
+        saved_path, checksum, mime_type = await storage_service.save_stream(filename, chunks)
+        if settings.ingestion_queue_mode == "queue":
+            # Workers own ingestion in queue mode; answer with the job to poll.
+            job_id = await job_manager.submit(
+                [saved_path],
+                source="upload",
+                force=force,
+                priority=priority,
+                filenames={str(saved_path): filename},
+            )
+            return _job_accepted(job_id)
+        external_id = await ingestion_scheduler.run(
+            str(saved_path),
+            source="upload",
+            priority=priority,
+            force=force,
+            checksum=checksum,
+            filename=filename,
+        )
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    finally:
+        reservation.release()
     return JSONResponse(
         {
             "external_id": external_id,
             "checksum": checksum,
             "mime_type": mime_type,
             "path": str(saved_path),
+            "filename": filename,
         }
     )
 
 
+async def _store_and_ingest_archive(
+    filename: str,
+    chunks: AsyncIterable[bytes],
+    force: bool,
+    priority: Optional[int],
+    declared_bytes: int,
+) -> JSONResponse:
+    reservation = _admit("upload", {filename: declared_bytes})
+    try:
+        try:
+            saved_path, _, _ = await storage_service.save_stream(filename, chunks)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        listing = await _expand([saved_path])
+        # The upload was admitted as a whole; its members inherit that admission.
+        reservation.extend(await asyncio.to_thread(input_sizes, listing.members))
+        reservation.settle(filename)
+        job_id = await job_manager.submit(
+            listing.members,
+            source="upload",
+            force=force,
+            priority=priority,
+            reservation=reservation,
+        )
+    except BaseException:
+        reservation.release()
+        raise
+    return _job_accepted(job_id, listing.skipped)
+
+
+async def _expand(paths: List[Path]) -> ArchiveListing:
+    """List ``paths`` and their archive members in a worker thread, off the event loop."""
+
+    try:
+        return await asyncio.to_thread(archive_reader.expand, paths, settings.allowed_extensions)
+    except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as exc:
+        raise HTTPException(status_code=422, detail=f"Unreadable archive: {exc}") from exc
+
+
+@router.post("/upload")
+async def upload_document(
+    file: UploadFile, force: bool = False, priority: Optional[int] = None
+) -> JSONResponse:
+    """Ingest an uploaded document; an uploaded archive is ingested member by member as a job."""
+
+    if file.size is not None and file.size > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail())
+    filename = file.filename or "upload"
+    _check_extension(filename)
+    store = _store_and_ingest_archive if is_archive(filename) else _store_and_ingest
+    return await store(filename, _upload_chunks(file), force, priority, file.size or 0)
+
+
+@router.put("/upload/{filename}")
+async def upload_document_stream(
+    filename: str, request: Request, force: bool = False, priority: Optional[int] = None
+) -> JSONResponse:
+    """Ingest a raw request body, streamed to storage without multipart buffering."""
+
+    declared = request.headers.get("content-length", "")
+    declared_bytes = int(declared) if declared.isdigit() else 0
+    if declared_bytes > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail())
+    name = Path(filename).name
+    _check_extension(name)
+    store = _store_and_ingest_archive if is_archive(name) else _store_and_ingest
+    return await store(name, request.stream(), force, priority, declared_bytes)
+
+
 @router.post("/folder")
 async def ingest_folder(request: FolderIngestionRequest) -> JSONResponse:
     folder = Path(request.folder_path)
-    if not folder.exists():
+    if not await asyncio.to_thread(folder.exists):
         raise HTTPException(status_code=404, detail=f"Folder not found: {folder}")
-    paths: List[Path] = [path for path in folder.rglob("*") if path.is_file()]
-    external_ids = await ingest_paths(paths, source="folder")
-    return JSONResponse({"ingested": external_ids})
+    listing = await _expand(await asyncio.to_thread(_folder_files, folder))
+    reservation = _admit("folder", await asyncio.to_thread(input_sizes, listing.members))
+    job_id = await job_manager.submit(
+        listing.members,
+        source="folder",
+        force=request.force,
+        priority=request.priority,
+        reservation=reservation,
+    )
+    return _job_accepted(job_id, listing.skipped)
+
+
+@router.post("/sync")
+async def sync_folder(request: FolderIngestionRequest) -> JSONResponse:
+    """Ingest new or changed files under a folder and drop documents for deleted ones.
+
+    The ingestion runs as a background job, admitted like a folder ingestion.
+    """
+
+    folder = _existing_folder(request.folder_path)
+    plan = await folder_sync_service.plan(folder)
+    reservation = _admit("sync", plan.sizes)
+    job_id = await folder_sync_service.submit(
+        plan, priority=request.priority, reservation=reservation
+    )
+    return _job_accepted(job_id)
+
+
+@router.post("/watch")
+async def start_watch(request: FolderIngestionRequest) -> JSONResponse:
+    folder = _existing_folder(request.folder_path)
+    started = folder_sync_service.start_watch(folder)
+    payload = {
+        "folder": str(folder.resolve()),
+        "started": started,
+        "watched": folder_sync_service.watched(),
+    }
+    return JSONResponse(payload, status_code=202 if started else 200)
+
+
+@router.get("/watch")
+async def list_watches() -> JSONResponse:
+    return JSONResponse({"watched": folder_sync_service.watched()})
+
+
+@router.delete("/watch")
+async def stop_watch(folder_path: str = Query(...)) -> JSONResponse:
+    stopped = await folder_sync_service.stop_watch(Path(folder_path))
+    if not stopped:
+        raise HTTPException(status_code=404, detail=f"Folder is not being watched: {folder_path}")
+    return JSONResponse({"stopped": str(Path(folder_path).resolve())})
+
+
+def _folder_files(folder: Path) -> List[Path]:
+    return [path for path in sorted(folder.rglob("*")) if path.is_file()]
+
+
+def _existing_folder(folder_path: str) -> Path:
+    folder = Path(folder_path)
+    if not folder.is_dir():
+        raise HTTPException(status_code=404, detail=f"Folder not found: {folder}")
+    return folder
+
+
+def _missing(paths: List[Path]) -> List[str]:
+    return [str(path) for path in paths if not path.exists()]
 
 
 @router.post("/trigger")
 async def trigger_ingestion(request: TriggerIngestionRequest) -> JSONResponse:
     paths = [Path(path) for path in request.documents]
-    missing = [str(path) for path in paths if not path.exists()]
+    missing = await asyncio.to_thread(_missing, paths)
     if missing:
         raise HTTPException(status_code=404, detail={"missing": missing})
-    external_ids = await ingest_paths(paths, source=request.source)
-    return JSONResponse({"ingested": external_ids})
+    listing = await _expand(paths)
+    reservation = _admit(request.source, await asyncio.to_thread(input_sizes, listing.members))
+    job_id = await job_manager.submit(
+        listing.members,
+        source=request.source,
+        force=request.force,
+        priority=request.priority,
+        reservation=reservation,
+    )
+    return _job_accepted(job_id, listing.skipped)
+
+
+@router.get("/queue")
+async def queue_status() -> JSONResponse:
+    """Queued and running documents per scheduler lane, and the admitted backlog."""
+
+    return JSONResponse(
+        {"lanes": ingestion_scheduler.snapshot(), "admission": admission_controller.snapshot()}
+    )
+
+
+@router.get("/jobs", response_model=List[IngestionJobRead])
+async def list_jobs(limit: int = Query(50, ge=1, le=500)) -> List[IngestionJobRead]:
+    return job_manager.list_jobs(limit=limit)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobRead)
+async def get_job(job_id: str) -> IngestionJobRead:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobRead)
+async def cancel_job(job_id: str) -> IngestionJobRead:
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
 
 
 @router.get("/runs", response_model=List[IngestionRunRead])
@@ -64,22 +322,65 @@ async def list_runs() -> List[IngestionRunRead]:
                 completed_at=run.completed_at,
                 duration_seconds=run.duration_seconds,
                 error_message=run.error_message,
+                mime_type=run.mime_type,
+                stage_timings=run.stage_timings or {},
             )
             for run in runs
         ]
 
 
+@router.get("/runs/stats", response_model=IngestionRunStats)
+async def run_stage_stats(
+    status: Optional[str] = Query("completed"),
+    source: Optional[str] = None,
+    limit: int = Query(10_000, ge=1, le=1_000_000),
+) -> IngestionRunStats:
+    """Percentiles of per-stage timings over the most recent runs, overall and per mime type."""
+
+    with get_session() as session:
+        query = session.query(IngestionRun.mime_type, IngestionRun.stage_timings)
+        if status:
+            query = query.filter(IngestionRun.status == status)
+        if source:
+            query = query.filter(IngestionRun.source == source)
+        rows = query.order_by(IngestionRun.id.desc()).limit(limit).all()
+    summary = summarise_stage_timings((row.mime_type, row.stage_timings) for row in rows)
+    return IngestionRunStats(
+        runs=len(rows),
+        stages=summary.pop("all", {}),
+        by_mime_type=summary,
+    )
+
+
 @router.get("/dead_letters", response_model=List[DeadLetterRead])
-async def list_dead_letters() -> List[DeadLetterRead]:
+async def list_dead_letters(status: Optional[str] = None) -> List[DeadLetterRead]:
     with get_session() as session:
-        records = session.query(DeadLetter).order_by(DeadLetter.created_at.desc()).all()
+        query = session.query(DeadLetter)
+        if status:
+            query = query.filter(DeadLetter.status == status)
+        records = query.order_by(DeadLetter.created_at.desc()).all()
         return [
             DeadLetterRead(
                 trace_id=record.trace_id,
                 payload=record.payload,
                 error_message=record.error_message,
                 stacktrace=record.stacktrace,
+                error_type=record.error_type,
+                status=record.status,
+                attempts=record.attempts,
+                next_retry_at=record.next_retry_at,
+                last_attempt_at=record.last_attempt_at,
+                resolved_external_id=record.resolved_external_id,
                 created_at=record.created_at,
             )
             for record in records
         ]
+
+
+@router.post("/dead_letters/retry", response_model=DeadLetterRetryReport)
+async def retry_dead_letters(request: DeadLetterRetryRequest) -> DeadLetterRetryReport:
+    """Re-ingest the selected (default: all pending) dead letters immediately."""
+
+    return await dead_letter_retrier.retry(
+        request.trace_ids, include_abandoned=request.include_abandoned
+    )
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,14 +26,50 @@ class Settings(BaseSettings):
         default=Path("../storage/uploads"),
         description="Directory where raw uploaded documents are stored.",
     )
+    max_upload_bytes: int = Field(
+        default=10 * 1024**3,
+        description="Largest upload, in bytes, accepted by the ingestion endpoints.",
+    )
+    upload_chunk_bytes: int = Field(
+        default=1024**2,
+        description="Chunk size used when streaming uploads to storage.",
+    )
+    archive_spool_directory: Path = Field(
+        default=Path("../storage/archive_spool"),
+        description="Directory of decompressed copies of compressed TARs being ingested.",
+    )
+    archive_spool_max_bytes: int = Field(
+        default=8 * 1024**3,
+        description="Size bound of the archive spool; larger TARs are streamed per member.",
+    )
     graph_path: Path = Field(
         default=Path("../storage/graph.gpickle"),
         description="Persistence location for the knowledge graph.",
     )
+    graph_snapshot_every: int = Field(
+        default=500,
+        description="Number of logged graph changes after which a full graph snapshot is written.",
+    )
+    graph_snapshot_seconds: float = Field(
+        default=300.0,
+        description="Maximum age of the graph snapshot, in seconds, while changes are pending.",
+    )
+    graph_log_fsync: bool = Field(
+        default=False,
+        description="fsync the graph change log after every write for power-loss durability.",
+    )
     retriever_index_path: Path = Field(
         default=Path("../storage/retriever_index"),
         description="Directory containing persisted retrieval artefacts.",
     )
+    retriever_persist_every: int = Field(
+        default=200,
+        description="Documents appended to the retrieval index between writes of its artefacts.",
+    )
+    retriever_persist_seconds: float = Field(
+        default=30.0,
+        description="Maximum age, in seconds, of retrieval index appends not yet written.",
+    )
     prefect_log_level: str = Field(
         default="INFO",
         description="Log level hint for orchestration components that honour Prefect semantics.",
@@ -42,6 +78,22 @@ class Settings(BaseSettings):
         default=True,
         description="Toggle OCR execution for image-heavy documents.",
     )
+    ocr_language: str = Field(
+        default="eng",
+        description="Tesseract language code(s) used for OCR, e.g. 'eng' or 'eng+deu'.",
+    )
+    ocr_render_scale: float = Field(
+        default=2.0,
+        description="Scale at which PDF pages are rendered for OCR; 1.0 is 72 DPI.",
+    )
+    ocr_parallel_pages: bool = Field(
+        default=True,
+        description="OCR the pages of multi-page PDFs in parallel on the stage process pool.",
+    )
+    ocr_max_pending_pages: int = Field(
+        default=0,
+        description="Rendered PDF pages awaiting OCR at once; 0 means twice the pool size.",
+    )
     agent_config_path: Path = Field(
         default=Path("../storage/agent_registry.yaml"),
         description="YAML manifest describing the agent network configuration.",
@@ -51,13 +103,210 @@ class Settings(BaseSettings):
         description="CSV export destination for generated timelines.",
     )
     allowed_extensions: List[str] = Field(
-        default_factory=lambda: [".txt", ".pdf", ".md", ".json"],
+        default_factory=lambda: [
+            ".txt",
+            ".pdf",
+            ".md",
+            ".json",
+            ".docx",
+            ".eml",
+            ".html",
+            ".htm",
+        ],
         description="Whitelisted document extensions accepted by the ingestion pipeline.",
     )
     ingestion_concurrency: int = Field(
         default=4,
         description="Maximum number of concurrent ingestion tasks processed by the pipeline.",
     )
+    ingestion_heavy_concurrency: int = Field(
+        default=1,
+        description="Workers in the heavy lane, used for large or scanned PDFs likely to need OCR.",
+    )
+    ingestion_batch_in_flight: int = Field(
+        default=256,
+        description="Items of one ingestion batch queued or running at once by default.",
+    )
+    source_priorities: Dict[str, int] = Field(
+        default_factory=lambda: {"upload": 0, "api": 10, "retry": 20, "folder": 30, "sync": 30},
+        description="Scheduling rank per ingestion source; lower ranks are processed first.",
+    )
+    default_source_priority: int = Field(
+        default=20,
+        description="Scheduling rank for sources missing from source_priorities.",
+    )
+    scheduler_heavy_bytes: int = Field(
+        default=20 * 1024**2,
+        description="PDFs at least this large are scheduled in the heavy lane.",
+    )
+    scheduler_aging_seconds: float = Field(
+        default=60.0,
+        description="Queue wait that lifts an item one rank, within its source; 0 disables it.",
+    )
+    scheduler_ocr_probe_pages: int = Field(
+        default=2,
+        description="Leading PDF pages checked for a text layer when estimating OCR need.",
+    )
+    parser_streaming_threshold: int = Field(
+        default=32 * 1024**2,
+        description="Text and JSON inputs larger than this many characters are parsed in chunks.",
+    )
+    parser_max_text_chars: int = Field(
+        default=32 * 1024**2,
+        description="Characters of text retained for storage and scoring from streamed inputs.",
+    )
+    pdf_text_engine: str = Field(
+        default="auto",
+        description="PDF text engine: 'pypdf', 'pdfium', or 'auto' to choose per document.",
+    )
+    pdf_engine_sample_pages: int = Field(
+        default=2,
+        description="Pages the 'auto' PDF engine extracts with both engines to compare them.",
+    )
+    pdf_parallel_min_pages: int = Field(
+        default=64,
+        description="PDFs with this many pages are extracted in parallel page ranges; 0 disables.",
+    )
+    pdf_pages_per_task: int = Field(
+        default=16,
+        description="PDF pages extracted per task when a PDF is split across worker processes.",
+    )
+    pdf_page_timeout_seconds: float = Field(
+        default=60.0,
+        description="Time budget for extracting the text of one PDF page; 0 disables it.",
+    )
+    parse_cache_directory: Path = Field(
+        default=Path("../storage/parse_cache"),
+        description="Directory holding compressed parse results keyed by checksum.",
+    )
+    parse_cache_max_bytes: int = Field(
+        default=2 * 1024**3,
+        description="Size bound of the parse cache directory; 0 disables the cache.",
+    )
+    date_engine: str = Field(
+        default="fast",
+        description="'fast' parses pattern-matched date spans; 'dateparser' searches all text.",
+    )
+    stage_cache_entries: int = Field(
+        default=256,
+        description="Parse, OCR and content-scoring results cached by checksum; 0 disables it.",
+    )
+    stage_cache_max_chars: int = Field(
+        default=64 * 1024**2,
+        description="Upper bound on document text characters retained by the stage cache.",
+    )
+    stage_executors: Dict[str, str] = Field(
+        default_factory=lambda: {"parse": "process", "ocr": "process", "classify": "thread"},
+        description="Execution backend ('thread' or 'process') for each CPU-bound ingestion stage.",
+    )
+    process_pool_workers: Optional[int] = Field(
+        default=None,
+        description="Worker processes for process-backed stages; defaults to the CPU count.",
+    )
+    process_pool_start_method: str = Field(
+        default="spawn",
+        description="Multiprocessing start method of the stage process pool: spawn or forkserver.",
+    )
+    process_task_timeout_seconds: float = Field(
+        default=600.0,
+        description="Longest wait for one PDF page range or OCR page on the pool; 0 disables it.",
+    )
+    ingestion_queue_mode: str = Field(
+        default="inline",
+        description="'inline' runs jobs in the API process; 'queue' enqueues them for workers.",
+    )
+    worker_processes: int = Field(
+        default=1,
+        description="Processes started by `python -m app.worker` to drain the work queue.",
+    )
+    worker_batch_size: int = Field(
+        default=8,
+        description="Work items claimed per worker round trip to the queue table.",
+    )
+    worker_lease_seconds: float = Field(
+        default=300.0,
+        description="Visibility timeout after which an unrenewed claimed item is re-queued.",
+    )
+    worker_heartbeat_seconds: float = Field(
+        default=30.0,
+        description="Interval at which workers renew the leases of items in flight.",
+    )
+    worker_poll_seconds: float = Field(
+        default=2.0,
+        description="Idle wait between work-queue polls when no items are claimable.",
+    )
+    worker_max_attempts: int = Field(
+        default=3,
+        description="Claims of a work item, e.g. after worker crashes, before it is failed.",
+    )
+    job_progress_interval_seconds: float = Field(
+        default=1.0,
+        description="Minimum interval between persisted progress updates of ingestion jobs.",
+    )
+    job_lease_seconds: float = Field(
+        default=120.0,
+        description="Lease of an API process on a running job; expired jobs are resumed elsewhere.",
+    )
+    job_heartbeat_seconds: float = Field(
+        default=30.0,
+        description="Interval at which API processes renew the leases of the jobs they run.",
+    )
+    job_checkpoint_batch_size: int = Field(
+        default=100,
+        description="Finished job items buffered before their manifest checkpoint is committed.",
+    )
+    watch_debounce_ms: int = Field(
+        default=1600,
+        description="Milliseconds over which filesystem events are batched in watch mode.",
+    )
+    watch_step_ms: int = Field(
+        default=50,
+        description="Polling step, in milliseconds, used by the watch-mode debouncer.",
+    )
+    retry_max_attempts: int = Field(
+        default=5,
+        description="Ingestion attempts, including the first, before a dead letter is abandoned.",
+    )
+    retry_initial_seconds: float = Field(
+        default=30.0,
+        description="Backoff before the first dead-letter retry; doubles with each attempt.",
+    )
+    retry_max_seconds: float = Field(
+        default=3600.0,
+        description="Upper bound, in seconds, on the backoff between dead-letter retries.",
+    )
+    retry_poll_seconds: float = Field(
+        default=60.0,
+        description="Interval at which due dead letters are retried; 0 disables the scheduler.",
+    )
+    retry_claim_seconds: float = Field(
+        default=3600.0,
+        description="Seconds after which a stale 'retrying' claim on a dead letter lapses.",
+    )
+    admission_max_queue_depth: int = Field(
+        default=10_000,
+        description="Accepted but unfinished documents above which ingestion requests get 429.",
+    )
+    admission_max_inflight_bytes: int = Field(
+        default=4 * 1024**3,
+        description="Input bytes of unfinished admitted documents above which requests get 429.",
+    )
+    admission_source_quotas: Dict[str, int] = Field(
+        default_factory=lambda: {"folder": 5_000, "sync": 5_000},
+        description="Maximum unfinished documents per ingestion source; others are unbounded.",
+    )
+    admission_retry_after_seconds: int = Field(
+        default=30,
+        description="Retry-After seconds sent with 429 responses from ingestion endpoints.",
+    )
+    db_batch_size: int = Field(
+        default=50,
+        description="Maximum number of documents written per database transaction while ingesting.",
+    )
+    db_batch_linger_ms: int = Field(
+        default=25,
+        description="Milliseconds a partially filled document batch waits for more rows.",
+    )
     reranker_alpha: float = Field(
         default=0.65,
         description="Weight applied to semantic similarity during retrieval scoring.",
@@ -4,9 +4,23 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager, contextmanager
 from datetime import UTC, datetime
-from typing import Any, AsyncIterator, Dict, Iterator, Optional
-
-from sqlalchemy import JSON, Float, ForeignKey, Integer, String, Text, create_engine
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    create_engine,
+    event,
+    inspect,
+    literal,
+)
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship, sessionmaker
 
@@ -32,7 +46,7 @@ class Document(Base):
     external_id: Mapped[str] = mapped_column(String(64), unique=True, index=True)
     source_path: Mapped[str] = mapped_column(String(1024))
     source: Mapped[str] = mapped_column(String(128))
-    checksum: Mapped[str] = mapped_column(String(128))
+    checksum: Mapped[str] = mapped_column(String(128), index=True)
     mime_type: Mapped[str] = mapped_column(String(128))
     text_content: Mapped[str] = mapped_column(Text)
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -40,9 +54,15 @@ class Document(Base):
     privilege_risk: Mapped[float] = mapped_column(Float, default=0.0)
     importance_score: Mapped[float] = mapped_column(Float, default=0.0)
     metadata_json: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    # Offsets in text_content at which pages 1, 2, ... start, for paginated formats.
+    page_offsets: Mapped[Optional[List[int]]] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=utc_now)
     updated_at: Mapped[datetime] = mapped_column(default=utc_now, onupdate=utc_now)
 
+    duplicate_of_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("documents.id"), nullable=True, index=True
+    )
+
     ingestion_run_id: Mapped[int] = mapped_column(ForeignKey("ingestion_runs.id"))
     ingestion_run: Mapped["IngestionRun"] = relationship(back_populates="documents")
     fragments: Mapped[list["MetadataFragment"]] = relationship(
@@ -64,11 +84,98 @@ class IngestionRun(Base):
     completed_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
     duration_seconds: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    job_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    mime_type: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    stage_timings: Mapped[Dict[str, float]] = mapped_column(JSON, default=dict)
     created_at: Mapped[datetime] = mapped_column(default=utc_now)
 
     documents: Mapped[list[Document]] = relationship(back_populates="ingestion_run")
 
 
+class IngestionJob(Base):
+    """Background batch ingestion request and its progress counters."""
+
+    __tablename__ = "ingestion_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_id: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    source: Mapped[str] = mapped_column(String(128))
+    status: Mapped[str] = mapped_column(String(32), default="queued")
+    force: Mapped[bool] = mapped_column(Boolean, default=False)
+    priority: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # API process running the job; its lease is renewed while it does.
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=utc_now)
+    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+
+class IngestionJobItem(Base):
+    """Checkpointed manifest entry for one path of an ingestion job."""
+
+    __tablename__ = "ingestion_job_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_id: Mapped[str] = mapped_column(ForeignKey("ingestion_jobs.job_id"), index=True)
+    position: Mapped[int] = mapped_column(Integer)
+    path: Mapped[str] = mapped_column(String(1024))
+    # Name the file was uploaded under, when ``path`` is content-addressed storage.
+    original_filename: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True)
+    status: Mapped[str] = mapped_column(String(32), default="pending", index=True)
+    checksum: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    external_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(default=utc_now, onupdate=utc_now)
+
+
+class WorkItem(Base):
+    """Durable ingestion queue entry, claimed by worker processes under a renewable lease."""
+
+    __tablename__ = "work_items"
+    __table_args__ = (Index("ix_work_items_claim", "status", "priority", "id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    job_item_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    path: Mapped[str] = mapped_column(String(1024))
+    original_filename: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True)
+    source: Mapped[str] = mapped_column(String(128))
+    force: Mapped[bool] = mapped_column(Boolean, default=False)
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    status: Mapped[str] = mapped_column(String(32), default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    lease_token: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    external_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=utc_now)
+    updated_at: Mapped[datetime] = mapped_column(default=utc_now, onupdate=utc_now)
+
+
+class FileManifestEntry(Base):
+    """Last synchronised state of a file under a watched folder."""
+
+    __tablename__ = "file_manifest"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    root: Mapped[str] = mapped_column(String(1024), index=True)
+    path: Mapped[str] = mapped_column(String(1024), unique=True, index=True)
+    size: Mapped[int] = mapped_column(Integer)
+    mtime: Mapped[float] = mapped_column(Float)
+    checksum: Mapped[str] = mapped_column(String(128))
+    external_id: Mapped[str] = mapped_column(String(64))
+    updated_at: Mapped[datetime] = mapped_column(default=utc_now, onupdate=utc_now)
+
+
 class MetadataFragment(Base):
     """Metadata extracted from a document such as entities or dates."""
 
@@ -93,6 +200,12 @@ class DeadLetter(Base):
     payload: Mapped[Dict[str, Any]] = mapped_column(JSON)
     error_message: Mapped[str] = mapped_column(Text)
     stacktrace: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error_type: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    status: Mapped[str] = mapped_column(String(32), default="pending", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=1)
+    next_retry_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, index=True)
+    last_attempt_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    resolved_external_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=utc_now)
 
 
@@ -117,6 +230,17 @@ sync_url = settings.database_url.replace("+aiosqlite", "")
 sync_engine = create_engine(sync_url, future=True, echo=False)
 SessionMaker = sessionmaker(sync_engine, expire_on_commit=False)
 
+if sync_engine.dialect.name == "sqlite":
+
+    @event.listens_for(sync_engine, "connect")
+    def _sqlite_concurrency(dbapi_connection: Any, _: Any) -> None:
+        # Worker processes share the database file: WAL lets readers proceed during writes
+        # and the busy timeout makes competing writers wait instead of failing.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
 
 @asynccontextmanager
 async def get_async_session() -> AsyncIterator[AsyncSession]:
@@ -141,10 +265,43 @@ def get_session() -> Iterator[Session]:
         session.close()
 
 
-def init_db() -> None:
-    """Create all tables if they do not already exist."""
-
-    Base.metadata.create_all(sync_engine)
+def _add_missing_columns(connection: Connection) -> None:
+    """Add columns and indexes that models gained after an existing database was created.
+
+    ``create_all`` only creates missing tables, so new columns of existing tables are added
+    with ``ALTER TABLE``. Existing rows take the column's scalar default, if it has one.
+    """
+
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    quote = connection.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            ddl = (
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                f"{column.type.compile(dialect=connection.dialect)}"
+            )
+            if column.default is not None and column.default.is_scalar:
+                value = literal(column.default.arg, column.type).compile(
+                    dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+                )
+                ddl += f" DEFAULT {value}"
+            connection.exec_driver_sql(ddl)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def init_db(engine: Engine | None = None) -> None:
+    """Create missing tables and add columns missing from existing ones."""
+
+    with (engine or sync_engine).begin() as connection:
+        Base.metadata.create_all(connection)
+        _add_missing_columns(connection)
 
 
 init_db()
@@ -154,8 +311,12 @@ __all__ = [
     "ConversationMemory",
     "DeadLetter",
     "Document",
+    "FileManifestEntry",
+    "IngestionJob",
+    "IngestionJobItem",
     "IngestionRun",
     "MetadataFragment",
+    "WorkItem",
     "get_async_session",
     "get_session",
     "init_db",
@@ -2,16 +2,38 @@
 
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api.routes import agents, ingestion, retrieval
 from .config import settings
 from .database import init_db
+from .services.dead_letters import dead_letter_retrier
+from .services.ingestion import ingestion_scheduler
+from .services.jobs import job_manager
+from .services.metrics import CONTENT_TYPE_LATEST, render_metrics
+from .services.retrieval import retriever_service
+from .services.sync import folder_sync_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    job_manager.start()
+    dead_letter_retrier.start()
+    yield
+    await dead_letter_retrier.shutdown()
+    await folder_sync_service.shutdown()
+    await job_manager.shutdown()
+    await ingestion_scheduler.shutdown()
+    await asyncio.to_thread(retriever_service.flush)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Automated Legal Discovery Backend", version="0.1.0")
+    app = FastAPI(title="Automated Legal Discovery Backend", version="0.1.0", lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -30,6 +52,10 @@ def create_app() -> FastAPI:
     async def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
     return app
 
 
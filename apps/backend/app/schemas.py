@@ -34,6 +34,41 @@ class IngestionRunRead(BaseModel):
     completed_at: Optional[datetime] = None
     duration_seconds: Optional[float] = None
     error_message: Optional[str] = None
+    mime_type: Optional[str] = None
+    stage_timings: Dict[str, float] = Field(default_factory=dict)
+
+
+class StageTimingStats(BaseModel):
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+    max: float
+
+
+class IngestionRunStats(BaseModel):
+    runs: int
+    stages: Dict[str, StageTimingStats] = Field(default_factory=dict)
+    by_mime_type: Dict[str, Dict[str, StageTimingStats]] = Field(default_factory=dict)
+
+
+class IngestionJobRead(BaseModel):
+    job_id: str
+    source: str
+    status: str
+    total: int
+    processed: int
+    failed: int
+    remaining: int
+    throughput_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    cancel_requested: bool = False
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
 
 
 class DeadLetterRead(BaseModel):
@@ -41,9 +76,27 @@ class DeadLetterRead(BaseModel):
     payload: Dict[str, Any]
     error_message: str
     stacktrace: Optional[str] = None
+    error_type: Optional[str] = None
+    status: str = "pending"
+    attempts: int = 1
+    next_retry_at: Optional[datetime] = None
+    last_attempt_at: Optional[datetime] = None
+    resolved_external_id: Optional[str] = None
     created_at: datetime
 
 
+class DeadLetterRetryRequest(BaseModel):
+    trace_ids: Optional[List[str]] = None
+    include_abandoned: bool = False
+
+
+class DeadLetterRetryReport(BaseModel):
+    attempted: int = 0
+    resolved: List[str] = Field(default_factory=list)
+    rescheduled: List[str] = Field(default_factory=list)
+    abandoned: List[str] = Field(default_factory=list)
+
+
 class DocumentRead(BaseModel):
     external_id: str
     document_type: Optional[str]
@@ -57,6 +110,8 @@ class SearchResult(BaseModel):
     document_id: str
     score: float
     snippet: str
+    # 1-based page of the snippet, for documents with page provenance (PDFs).
+    page: Optional[int] = None
     highlights: Dict[str, List[str]] = Field(default_factory=dict)
     trace_id: str
 
@@ -80,8 +135,12 @@ class SearchRequest(BaseModel):
 
 class FolderIngestionRequest(BaseModel):
     folder_path: str
+    force: bool = False
+    priority: Optional[int] = None
 
 
 class TriggerIngestionRequest(BaseModel):
     documents: List[str]
     source: str = "api"
+    force: bool = False
+    priority: Optional[int] = None
@@ -1,5 +1,5 @@
 """Service layer exports."""
 
-from .ingestion import ingest_document_flow, ingest_paths
+from .ingestion import IngestionOutcome, ingest_document_flow, ingest_many, ingest_paths
 
-__all__ = ["ingest_document_flow", "ingest_paths"]
+__all__ = ["IngestionOutcome", "ingest_document_flow", "ingest_many", "ingest_paths"]
@@ -0,0 +1,172 @@
+"""Admission control for ingestion requests.
+
+Accepted work is tracked from the moment an endpoint admits it until each document has been
+ingested (or its job ends). New requests are rejected while the accepted backlog exceeds the
+configured queue depth, in-flight input bytes or the per-source quota, so a burst of bulk
+triggers is pushed back to the caller instead of piling up in memory and threads.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from ..config import settings
+from .archives import split_locator
+from .work_queue import work_queue
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when admitting a request would exceed a configured limit."""
+
+    def __init__(self, reason: str, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def input_sizes(locations: Iterable[str]) -> Dict[str, int]:
+    """On-disk bytes per location; archive members share their container's size evenly.
+
+    Member sizes are apportioned rather than read from the archive index so admitting a
+    large listing costs one ``stat`` per file instead of one archive scan per member.
+    """
+
+    plain: Dict[str, int] = {}
+    members: Dict[Path, List[str]] = defaultdict(list)
+    for location in locations:
+        member = split_locator(location)
+        if member is None:
+            plain[location] = _stat_size(Path(location))
+        else:
+            members[member[0]].append(location)
+    for archive, group in members.items():
+        share = _stat_size(archive) // len(group)
+        plain.update(dict.fromkeys(group, share))
+    return plain
+
+
+def _stat_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+@dataclass
+class Reservation:
+    """Capacity held for one admitted request; released per document as it finishes."""
+
+    controller: AdmissionController
+    source: str
+    sizes: Dict[str, int] = field(default_factory=dict)
+
+    def extend(self, sizes: Mapping[str, int]) -> None:
+        """Add already-accepted work to the reservation without re-checking limits."""
+
+        added = {location: size for location, size in sizes.items() if location not in self.sizes}
+        self.sizes.update(added)
+        self.controller._acquire(self.source, len(added), sum(added.values()))
+
+    def settle(self, location: str) -> None:
+        size = self.sizes.pop(location, None)
+        if size is not None:
+            self.controller._release(self.source, 1, size)
+
+    def release(self) -> None:
+        sizes, self.sizes = self.sizes, {}
+        self.controller._release(self.source, len(sizes), sum(sizes.values()))
+
+
+class AdmissionController:
+    """Bound the ingestion backlog by document count, input bytes and source.
+
+    A request that alone exceeds a limit is still admitted when nothing else is in flight
+    (for source quotas: nothing else from that source), so large backfills make progress
+    one at a time instead of being rejected forever. In queue mode the unfinished items of
+    the durable work queue count towards the document limits as well.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._items = 0
+        self._bytes = 0
+        self._by_source: Counter[str] = Counter()
+        self._admitted: Counter[str] = Counter()
+        self._rejected: Counter[Tuple[str, str]] = Counter()
+
+    def admit(self, source: str, sizes: Mapping[str, int]) -> Reservation:
+        """Reserve capacity for ``sizes`` (location -> bytes) or raise ``AdmissionRejected``."""
+
+        items, size = len(sizes), sum(sizes.values())
+        with self._lock:
+            rejection = self._check(source, items, size)
+            if rejection is not None:
+                reason, detail = rejection
+                self._rejected[(source, reason)] += 1
+                raise AdmissionRejected(reason, detail, settings.admission_retry_after_seconds)
+            self._admitted[source] += items
+            reservation = Reservation(self, source)
+            reservation.extend(sizes)
+        return reservation
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "queue_depth": self._items,
+                "inflight_bytes": self._bytes,
+                "by_source": dict(+self._by_source),
+                "admitted": dict(self._admitted),
+                "rejected": [
+                    {"source": source, "reason": reason, "count": count}
+                    for (source, reason), count in sorted(self._rejected.items())
+                ],
+            }
+
+    def _check(self, source: str, items: int, size: int) -> Tuple[str, str] | None:
+        queued = settings.ingestion_queue_mode == "queue"
+        depth = self._items + (work_queue.pending_count() if queued else 0)
+        depth_limit = settings.admission_max_queue_depth
+        if depth and depth + items > depth_limit:
+            return "queue_depth", f"Ingestion queue is full ({depth}/{depth_limit} documents)"
+        bytes_limit = settings.admission_max_inflight_bytes
+        if self._bytes and self._bytes + size > bytes_limit:
+            return "inflight_bytes", (
+                f"Too much ingestion input in flight ({self._bytes}/{bytes_limit} bytes)"
+            )
+        quota = settings.admission_source_quotas.get(source)
+        pending = self._by_source[source]
+        if queued and quota is not None:
+            pending += work_queue.pending_count(source)
+        if quota is not None and pending and pending + items > quota:
+            return "source_quota", (
+                f"Ingestion quota for source '{source}' exhausted ({pending}/{quota} documents)"
+            )
+        return None
+
+    def _acquire(self, source: str, items: int, size: int) -> None:
+        with self._lock:
+            self._items += items
+            self._bytes += size
+            self._by_source[source] += items
+
+    def _release(self, source: str, items: int, size: int) -> None:
+        with self._lock:
+            self._items = max(self._items - items, 0)
+            self._bytes = max(self._bytes - size, 0)
+            self._by_source[source] = max(self._by_source[source] - items, 0)
+
+
+admission_controller = AdmissionController()
+
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejected",
+    "Reservation",
+    "admission_controller",
+    "input_sizes",
+]
@@ -0,0 +1,237 @@
+"""Single-pass lexical analysis of document text.
+
+Metadata extraction used to run one regular expression per metadata kind over the whole
+text. ``METADATA_PATTERN`` finds all of them in one traversal: it only engages at word
+starts (or ``$``), where zero-width lookaheads capture the date, entity, email or amount
+beginning there, so the text is scanned once whatever the number of kinds. Matches are
+identical to those of the individual patterns in :mod:`app.services.parser`, including
+their leftmost, non-overlapping semantics within each kind.
+
+Tokens, token counts, the lower-cased text and a hashed term vector are derived lazily from
+the same :class:`TextAnalysis` and cached on it, so the parser, classifier and retrieval
+index share one tokenisation. :class:`TermMatrix` weights such vectors by TF-IDF against a
+corpus that grows one document at a time.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+
+METADATA_PATTERN = re.compile(
+    r"\$(?=\s?(?P<money>[\d,]+(?:\.\d{2})?))"
+    r"|(?<!\w)(?:"
+    r"(?=(?P<date>\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})\b)"
+    r"(?:(?=(?P<date_email>[\w.+-]++@[\w.-]+)))?"
+    r"|(?=(?P<entity>[A-Z][a-z]++\s+[A-Z][a-z]++)\b)"
+    r"|(?<![.+-])(?=(?P<email>[\w.+-]++@[\w.-]+))"
+    r")"
+)
+TOKEN_PATTERN = re.compile(r"\b\w+\b")
+# Terms are hashed into this many dimensions, so vectors of different corpora are comparable
+# without a fitted vocabulary; collisions are negligible at this size.
+FEATURE_DIMENSIONS = 2**20
+_HASHER = FeatureHasher(n_features=FEATURE_DIMENSIONS, input_type="dict", alternate_sign=False)
+# Rows a TermMatrix buffers before stacking them onto its matrix in one copy.
+_STACK_ROWS = 256
+
+# Metadata kind reported for each named group of METADATA_PATTERN.
+METADATA_KINDS = {
+    "date": "dates",
+    "money": "monetary_amounts",
+    "email": "emails",
+    "entity": "entities",
+}
+# Groups captured by one match: only a date and an email can begin at the same position.
+_MATCH_GROUPS = {group: (group,) for group in METADATA_KINDS}
+_MATCH_GROUPS["date_email"] = ("date", "date_email")
+_GROUP_KINDS = {**METADATA_KINDS, "date_email": "emails"}
+
+Span = Tuple[str, int, int]
+
+
+def _empty_matches() -> Dict[str, List[Span]]:
+    return {kind: [] for kind in METADATA_KINDS.values()}
+
+
+@dataclass
+class TextAnalysis:
+    """Metadata matches of one text, plus its lower-cased form and tokens on demand.
+
+    ``matches`` maps each metadata kind to ``(value, start, end)`` tuples in text order,
+    the offsets locating the value in ``text``.
+    """
+
+    text: str
+    matches: Dict[str, List[Span]] = field(default_factory=_empty_matches)
+
+    @classmethod
+    def scan(cls, text: str) -> TextAnalysis:
+        matches, _ = scan_metadata(text)
+        return cls(text, matches)
+
+    def values(self, kind: str) -> List[str]:
+        return [value for value, _, _ in self.matches[kind]]
+
+    @cached_property
+    def lowered(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        return TOKEN_PATTERN.findall(self.lowered)
+
+    @cached_property
+    def counts(self) -> Counter[str]:
+        return Counter(self.tokens)
+
+    @cached_property
+    def terms(self) -> Counter[str]:
+        """Unigram and bigram counts as a stop-word filtering ``TfidfVectorizer`` finds them.
+
+        Single characters and stop words are dropped before bigrams are formed.
+        """
+
+        words = [
+            token for token in self.tokens if len(token) > 1 and token not in ENGLISH_STOP_WORDS
+        ]
+        terms = Counter(words)
+        terms.update(f"{first} {second}" for first, second in zip(words, words[1:], strict=False))
+        return terms
+
+    @cached_property
+    def vector(self) -> csr_matrix:
+        """``terms`` as a ``1 x FEATURE_DIMENSIONS`` sparse row of hashed term counts."""
+
+        vector = _HASHER.transform([self.terms])
+        vector.sum_duplicates()
+        return vector
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Derived forms are cheaper to recompute in a worker process than to pickle.
+        return {"text": self.text, "matches": self.matches}
+
+
+class TermMatrix:
+    """Hashed term counts of a corpus, weighted by TF-IDF on demand.
+
+    Similarities equal those of a ``TfidfVectorizer`` (smoothed IDF, L2 norm) refitted on the
+    corpus, but adding a document only appends its vector instead of re-analysing every text.
+    Appended rows are buffered and stacked onto the matrix ``_STACK_ROWS`` at a time, and
+    similarities are sparse products with the raw counts, so neither appending nor a change
+    of IDF weights copies the whole matrix.
+    """
+
+    def __init__(self, counts: Optional[csr_matrix] = None) -> None:
+        self._counts = csr_matrix((0, FEATURE_DIMENSIONS)) if counts is None else counts
+        self._squares = self._counts.multiply(self._counts).tocsr()
+        self._pending: List[csr_matrix] = []
+        self.document_frequency = np.bincount(self._counts.indices, minlength=FEATURE_DIMENSIONS)
+        self._idf: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self._counts.shape[0] + len(self._pending)
+
+    @property
+    def counts(self) -> csr_matrix:
+        """Term counts with one row per document, in the order they were appended."""
+
+        self._stack()
+        return self._counts
+
+    def append(self, vector: csr_matrix) -> None:
+        self._pending.append(vector)
+        self.document_frequency[vector.indices] += 1
+        self._idf = None
+        if len(self._pending) >= _STACK_ROWS:
+            self._stack()
+
+    def _stack(self) -> None:
+        if self._pending:
+            block = vstack(self._pending, format="csr")
+            self._counts = vstack([self._counts, block], format="csr")
+            self._squares = vstack([self._squares, block.multiply(block)], format="csr")
+            self._pending = []
+
+    def _blocks(self) -> List[Tuple[csr_matrix, csr_matrix]]:
+        """``(counts, squared counts)`` of the stacked rows and of the buffered ones."""
+
+        blocks = [(self._counts, self._squares)]
+        if self._pending:
+            block = vstack(self._pending, format="csr")
+            blocks.append((block, block.multiply(block).tocsr()))
+        return blocks
+
+    def _weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._idf is None:
+            idf = np.log((1 + len(self)) / (1 + self.document_frequency)) + 1
+            self._idf = idf, idf**2
+        return self._idf
+
+    def similarities(self, vector: csr_matrix) -> np.ndarray:
+        """Cosine similarity of ``vector`` to every document, in TF-IDF space."""
+
+        if not len(self):
+            return np.zeros(0)
+        idf, idf_squared = self._weights()
+        query = vector.astype(np.float64)
+        # Like a fitted vocabulary, terms absent from the corpus do not count towards the norm.
+        query.data *= idf[query.indices] * (self.document_frequency[query.indices] > 0)
+        query = normalize(query)
+        # Weighting the query once more stands in for weighting every document row.
+        query.data *= idf[query.indices]
+        scores = []
+        for counts, squares in self._blocks():
+            norms = np.sqrt(squares @ idf_squared)
+            dots = (counts @ query.T).toarray().ravel()
+            scores.append(np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0))
+        return np.concatenate(scores)
+
+
+def scan_metadata(
+    text: str, *, until: Optional[int] = None, skip: Optional[Mapping[str, int]] = None
+) -> Tuple[Dict[str, List[Span]], Dict[str, int]]:
+    """Find every metadata match in ``text`` in a single pass.
+
+    Matches starting at or after ``until`` are ignored, and matches of a kind must not
+    start before ``skip[kind]``; chunked scans use both to re-read the end of each window.
+    Returns the matches and, per kind, by how far its last match extends past ``until``.
+    """
+
+    limit = len(text) if until is None else until
+    matches = _empty_matches()
+    resume = {kind: (skip or {}).get(kind, 0) for kind in matches}
+    overhang = dict.fromkeys(matches, 0)
+    for match in METADATA_PATTERN.finditer(text):
+        start = match.start()
+        if start >= limit:
+            break
+        for group in _MATCH_GROUPS[match.lastgroup]:
+            kind = _GROUP_KINDS[group]
+            if start < resume[kind]:
+                continue  # overlaps the previous match of this kind
+            end = match.end(group)
+            matches[kind].append((match.group(group), match.start(group), end))
+            resume[kind] = end
+            overhang[kind] = max(end - limit, 0)
+    return matches, overhang
+
+
+__all__ = [
+    "FEATURE_DIMENSIONS",
+    "METADATA_KINDS",
+    "METADATA_PATTERN",
+    "TOKEN_PATTERN",
+    "TermMatrix",
+    "TextAnalysis",
+    "scan_metadata",
+]
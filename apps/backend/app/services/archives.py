@@ -0,0 +1,445 @@
+"""Read documents straight out of ZIP, TAR and mbox containers without extracting them.
+
+Archive members are addressed by a locator string ``<archive path>!/<member name>``. The
+locator is what ingestion stores as ``Document.source_path``, so provenance records both the
+container and the member, and it is a plain string that can be queued in job manifests and
+sent to worker processes. Member listings are read from the container's index (the ZIP
+central directory, TAR headers, the mbox message table) so unsupported members are skipped
+without their content being read.
+"""
+
+from __future__ import annotations
+
+import bz2
+import email
+import gzip
+import hashlib
+import io
+import logging
+import lzma
+import mimetypes
+import os
+import shutil
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email import policy
+from email.message import EmailMessage
+from mailbox import mbox
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from ..config import settings
+from .locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+MEMBER_SEPARATOR = "!/"
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MBOX_SUFFIXES = (".mbox",)
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES + MBOX_SUFFIXES
+# Openers of the decompressed stream of each compressed TAR suffix.
+_TAR_DECOMPRESSORS: Dict[str, Callable[[Path], BinaryIO]] = {
+    ".tgz": gzip.open,
+    ".tar.gz": gzip.open,
+    ".tar.bz2": bz2.open,
+    ".tbz2": bz2.open,
+    ".tar.xz": lzma.open,
+    ".txz": lzma.open,
+}
+# Open ZIP files kept per process; each holds a file descriptor.
+_MAX_OPEN_ZIPS = 32
+
+ArchiveKey = Tuple[str, int, float]
+
+
+def is_archive(path: Path | str) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_locator(archive: Path, member: str) -> str:
+    return f"{archive}{MEMBER_SEPARATOR}{member}"
+
+
+def split_locator(location: str) -> Optional[Tuple[Path, str]]:
+    """Return ``(archive, member)`` for a member locator, or ``None`` for a plain path."""
+
+    start = 0
+    while (index := location.find(MEMBER_SEPARATOR, start)) != -1:
+        container = location[:index]
+        if is_archive(container):
+            return Path(container), location[index + len(MEMBER_SEPARATOR) :]
+        start = index + 1
+    return None
+
+
+@dataclass(frozen=True)
+class ArchiveListing:
+    """Locators of supported documents and of those that were skipped without reading."""
+
+    members: List[str]
+    skipped: List[str]
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read ``size`` bytes of ``file`` starting at ``offset`` (a plain TAR member)."""
+
+    def __init__(self, file: BinaryIO, offset: int, size: int) -> None:
+        self._file = file
+        self._start = offset
+        self._size = size
+        self._position = 0
+        file.seek(offset)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence]
+        self._position = min(max(base + offset, 0), self._size)
+        self._file.seek(self._start + self._position)
+        return self._position
+
+    def readinto(self, buffer: bytearray) -> int:  # type: ignore[override]
+        remaining = self._size - self._position
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[: min(len(buffer), remaining)]
+        read = self._file.readinto(view)  # type: ignore[attr-defined]
+        self._position += read or 0
+        return read or 0
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class ArchiveReader:
+    """List and open archive members, caching each container's index per process.
+
+    The ZIP central directory, TAR member offsets and the mbox message table are read once
+    per archive (keyed by path, size and mtime), so opening a member of a ZIP or plain TAR
+    is a seek. A compressed TAR is indexed in one streaming pass. Its members are ingested
+    in scheduling order rather than archive order, so they need random access: the archive
+    is decompressed once into the spool, ``settings.archive_spool_directory``, which all
+    processes share and which is bounded by ``archive_spool_max_bytes`` (least recently used
+    copies are deleted). An archive too large for the spool is not copied; each member is
+    then read by streaming the archive up to it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tar_indexes: Dict[ArchiveKey, Dict[str, Tuple[int, int]]] = {}
+        self._zips: OrderedDict[ArchiveKey, zipfile.ZipFile] = OrderedDict()
+        self._mailboxes: Dict[ArchiveKey, mbox] = {}
+
+    def list_members(self, archive: Path, allowed_extensions: Iterable[str]) -> ArchiveListing:
+        allowed = {extension.lower() for extension in allowed_extensions}
+        archive = archive.resolve()
+        members: List[str] = []
+        skipped: List[str] = []
+        for name in self._names(archive):
+            target = members if Path(name).suffix.lower() in allowed else skipped
+            target.append(member_locator(archive, name))
+        return ArchiveListing(members=members, skipped=skipped)
+
+    def expand(self, paths: Iterable[Path], allowed_extensions: Iterable[str]) -> ArchiveListing:
+        """Split ``paths`` into ingestible locations, replacing archives by their members."""
+
+        allowed = {extension.lower() for extension in allowed_extensions}
+        members: List[str] = []
+        skipped: List[str] = []
+        for path in paths:
+            if is_archive(path):
+                listing = self.list_members(path, allowed)
+                members.extend(listing.members)
+                skipped.extend(listing.skipped)
+            elif path.suffix.lower() in allowed:
+                members.append(str(path))
+            else:
+                skipped.append(str(path))
+        return ArchiveListing(members=members, skipped=skipped)
+
+    def exists(self, archive: Path, member: str) -> bool:
+        if not archive.is_file():
+            return False
+        lowered = str(archive).lower()
+        if lowered.endswith(ZIP_SUFFIXES):
+            return member in self._zip(archive).NameToInfo
+        if lowered.endswith(TAR_SUFFIXES):
+            return member in self._tar_index(archive)
+        try:
+            self._mbox_member(archive, member)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @contextmanager
+    def open(self, archive: Path, member: str) -> Iterator[BinaryIO]:
+        """Yield a seekable binary stream of ``member``."""
+
+        lowered = str(archive).lower()
+        if lowered.endswith(ZIP_SUFFIXES):
+            container = self._zip(archive)
+            try:
+                info = container.getinfo(member)
+            except KeyError:
+                raise FileNotFoundError(f"Archive member not found: {member}") from None
+            with container.open(info) as stream:
+                yield stream  # type: ignore[misc]
+            return
+        if lowered.endswith(TAR_SUFFIXES):
+            index = self._tar_index(archive)
+            offset, size = index.get(member, (-1, -1))
+            if offset < 0:
+                raise FileNotFoundError(f"Archive member not found: {member}")
+            plain = self._plain_tar(archive, index)
+            if plain is None:
+                with self._scan_tar(archive, member) as stream:
+                    yield stream
+                return
+            with io.BufferedReader(_BoundedReader(plain.open("rb"), offset, size)) as stream:
+                yield stream  # type: ignore[misc]
+            return
+        if lowered.endswith(MBOX_SUFFIXES):
+            yield io.BytesIO(self._mbox_member(archive, member))
+            return
+        raise ValueError(f"Unsupported archive type: {archive.name}")
+
+    def checksum(self, archive: Path, member: str, chunk_size: int = 1024**2) -> str:
+        hasher = hashlib.sha256()
+        with self.open(archive, member) as stream:
+            while chunk := stream.read(chunk_size):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def size(self, archive: Path, member: str) -> int:
+        """Uncompressed size of ``member`` in bytes, without reading its content."""
+
+        lowered = str(archive).lower()
+        if lowered.endswith(ZIP_SUFFIXES):
+            info = self._zip(archive).NameToInfo.get(member)
+            if info is None:
+                raise FileNotFoundError(f"Archive member not found: {member}")
+            return info.file_size
+        if lowered.endswith(TAR_SUFFIXES):
+            _, size = self._tar_index(archive).get(member, (-1, -1))
+            if size < 0:
+                raise FileNotFoundError(f"Archive member not found: {member}")
+            return size
+        return len(self._mbox_member(archive, member))
+
+    @staticmethod
+    def mime_type(member: str) -> str:
+        mime_type, _ = mimetypes.guess_type(Path(member).name)
+        return mime_type or "application/octet-stream"
+
+    def _names(self, archive: Path) -> List[str]:
+        lowered = str(archive).lower()
+        if lowered.endswith(ZIP_SUFFIXES):
+            return [info.filename for info in self._zip(archive).infolist() if not info.is_dir()]
+        if lowered.endswith(TAR_SUFFIXES):
+            return list(self._tar_index(archive))
+        if lowered.endswith(MBOX_SUFFIXES):
+            return self._mbox_names(archive)
+        raise ValueError(f"Unsupported archive type: {archive.name}")
+
+    @staticmethod
+    def _key(archive: Path) -> ArchiveKey:
+        stat = archive.stat()
+        return str(archive.resolve()), stat.st_size, stat.st_mtime
+
+    def _zip(self, archive: Path) -> zipfile.ZipFile:
+        """The open ZIP file, whose central directory is parsed once."""
+
+        key = self._key(archive)
+        with self._lock:
+            container = self._zips.get(key)
+            if container is not None:
+                self._zips.move_to_end(key)
+                return container
+            container = zipfile.ZipFile(archive)
+            self._zips[key] = container
+            while len(self._zips) > _MAX_OPEN_ZIPS:
+                # Member streams still reading an evicted file keep it open until they close.
+                self._zips.popitem(last=False)[1].close()
+            return container
+
+    def _tar_index(self, archive: Path) -> Dict[str, Tuple[int, int]]:
+        """Member name to ``(offset, size)`` in the archive's uncompressed TAR stream."""
+
+        key = self._key(archive)
+        with self._lock:
+            index = self._tar_indexes.get(key)
+        if index is None:
+            # Stream mode reads headers in one forward pass, decompressing as it goes.
+            with tarfile.open(archive, mode="r|*") as tar:
+                index = {info.name: (info.offset_data, info.size) for info in tar if info.isfile()}
+            with self._lock:
+                self._tar_indexes[key] = index
+        return index
+
+    @contextmanager
+    def _scan_tar(self, archive: Path, member: str) -> Iterator[BinaryIO]:
+        """Stream ``archive`` up to ``member`` and yield its content."""
+
+        with tarfile.open(archive, mode="r|*") as tar:
+            for info in tar:
+                if info.name == member and info.isfile():
+                    extracted = tar.extractfile(info)
+                    if extracted is None:  # pragma: no cover - regular files always extract
+                        break
+                    with extracted:
+                        yield extracted  # type: ignore[misc]
+                    return
+        raise FileNotFoundError(f"Archive member not found: {member}")
+
+    def _plain_tar(self, archive: Path, index: Dict[str, Tuple[int, int]]) -> Optional[Path]:
+        """A seekable uncompressed copy of ``archive``, or ``None`` if it exceeds the spool.
+
+        A plain TAR is its own copy. Compressed ones are decompressed into the spool on first
+        use, under a lock so that concurrent processes make one copy between them.
+        """
+
+        opener = next(
+            (
+                opener
+                for suffix, opener in _TAR_DECOMPRESSORS.items()
+                if archive.name.lower().endswith(suffix)
+            ),
+            None,
+        )
+        if opener is None:
+            return archive
+        # Data ends at the last member; the two end-of-archive blocks are not needed.
+        needed = max((offset + size for offset, size in index.values()), default=0)
+        limit = settings.archive_spool_max_bytes
+        if needed > limit:
+            return None
+        directory = settings.archive_spool_directory
+        digest = hashlib.sha256(repr(self._key(archive)).encode("utf-8")).hexdigest()[:32]
+        spooled = directory / f"{digest}.tar"
+        with file_lock(directory / "spool.lock"):
+            try:
+                os.utime(spooled)  # the modification time orders copies for LRU eviction
+                return spooled
+            except FileNotFoundError:
+                pass
+            _evict_spool(directory, limit - needed)
+            temporary = spooled.with_name(f"{spooled.name}.{uuid4().hex}.tmp")
+            try:
+                with opener(archive) as source, temporary.open("wb") as target:
+                    shutil.copyfileobj(source, target, 1024**2)
+                os.replace(temporary, spooled)
+            finally:
+                temporary.unlink(missing_ok=True)
+        logger.info("Decompressed %s into the archive spool", archive.name)
+        return spooled
+
+    def _mailbox(self, archive: Path) -> mbox:
+        key = self._key(archive)
+        with self._lock:
+            box = self._mailboxes.get(key)
+            if box is None:
+                box = mbox(archive, create=False)
+                self._mailboxes[key] = box
+            return box
+
+    def _mbox_messages(self, archive: Path) -> Iterable[Tuple[str, EmailMessage]]:
+        box = self._mailbox(archive)
+        with self._lock:
+            keys = sorted(box.keys())
+        for key in keys:
+            with self._lock:
+                raw = box.get_bytes(key)
+            message = email.message_from_bytes(raw, policy=policy.default)
+            yield f"message-{key:06d}", message
+
+    def _mbox_names(self, archive: Path) -> List[str]:
+        names: List[str] = []
+        for stem, message in self._mbox_messages(archive):
+            names.append(f"{stem}.txt")
+            names.extend(
+                f"{stem}/{attachment.get_filename()}"
+                for attachment in message.iter_attachments()
+                if attachment.get_filename()
+            )
+        return names
+
+    def _mbox_member(self, archive: Path, member: str) -> bytes:
+        stem, _, attachment_name = member.partition("/")
+        stem = stem.removesuffix(".txt")
+        try:
+            key = int(stem.removeprefix("message-"))
+        except ValueError:
+            raise FileNotFoundError(f"Archive member not found: {member}") from None
+        box = self._mailbox(archive)
+        with self._lock:
+            try:
+                raw = box.get_bytes(key)
+            except KeyError:
+                raise FileNotFoundError(f"Archive member not found: {member}") from None
+        message = email.message_from_bytes(raw, policy=policy.default)
+        if not attachment_name:
+            return _render_message(message).encode("utf-8")
+        for attachment in message.iter_attachments():
+            if attachment.get_filename() == attachment_name:
+                return attachment.get_payload(decode=True) or b""
+        raise FileNotFoundError(f"Archive member not found: {member}")
+
+
+def _evict_spool(directory: Path, budget: int) -> None:
+    """Delete the least recently used spooled TARs until at most ``budget`` bytes remain.
+
+    A copy another process still reads stays readable through its open file until closed.
+    """
+
+    copies = []
+    for path in directory.glob("*.tar"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        copies.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in copies)
+    for _, size, path in sorted(copies):
+        if total <= budget:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _render_message(message: EmailMessage) -> str:
+    headers = [
+        f"{name}: {message[name]}"
+        for name in ("From", "To", "Cc", "Date", "Subject")
+        if message[name]
+    ]
+    body = message.get_body(preferencelist=("plain", "html"))
+    content = body.get_content() if body is not None else ""
+    return "\n".join(headers) + "\n\n" + content
+
+
+archive_reader = ArchiveReader()
+
+
+__all__ = [
+    "ARCHIVE_SUFFIXES",
+    "ArchiveListing",
+    "ArchiveReader",
+    "archive_reader",
+    "is_archive",
+    "member_locator",
+    "split_locator",
+]
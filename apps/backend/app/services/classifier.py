@@ -2,14 +2,14 @@
 
 from __future__ import annotations
 
+import threading
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 from rapidfuzz import fuzz
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-from .parser import parser_service
+from .analysis import TermMatrix, TextAnalysis
 
 
 @dataclass
@@ -21,23 +21,28 @@ class DocumentClassification:
     importance_score: float
 
 
+@dataclass
+class ContentScores:
+    """Corpus-independent scores derived purely from a document's text."""
+
+    document_type: str
+    privilege_risk: float
+    token_count: int
+
+
 class CorpusStatistics:
-    """Maintain TF-IDF centroid for importance scoring."""
+    """Maintain TF-IDF term statistics of the classified corpus for importance scoring."""
 
     def __init__(self) -> None:
-        self.vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2))
-        self.document_vectors = None
-        self.documents: List[str] = []
+        self.terms = TermMatrix()
 
-    def add_document(self, text: str) -> None:
-        self.documents.append(text)
-        self.document_vectors = self.vectorizer.fit_transform(self.documents)
+    def add_document(self, analysis: TextAnalysis) -> None:
+        self.terms.append(analysis.vector)
 
-    def novelty(self, text: str) -> float:
-        if not self.documents:
+    def novelty(self, analysis: TextAnalysis) -> float:
+        if not len(self.terms):
             return 1.0
-        vector = self.vectorizer.transform([text])
-        similarities = cosine_similarity(vector, self.document_vectors)[0]
+        similarities = self.terms.similarities(analysis.vector)
         novelty_score = 1.0 - float(similarities.max(initial=0.0))
         return max(novelty_score, 0.0)
 
@@ -62,20 +67,47 @@ class DocumentClassifier:
             "do not disclose",
         ]
         self.corpus_lengths: List[int] = []
-
-    def classify(self, text: str, metadata: Dict[str, List[str]]) -> DocumentClassification:
-        tokens = parser_service.tokenize(text)
-        document_type = self._infer_document_type(tokens, text)
-        privilege_risk = self._score_privilege(tokens)
-        importance_score = self._estimate_importance(text, metadata)
-        self.corpus_lengths.append(len(tokens))
-        self.corpus.add_document(text)
-        return DocumentClassification(document_type, privilege_risk, importance_score)
-
-    def _infer_document_type(self, tokens: List[str], raw_text: str) -> str:
+        self._lock = threading.Lock()
+
+    def classify(
+        self,
+        text: str,
+        metadata: Dict[str, List[str]],
+        scores: ContentScores | None = None,
+        analysis: Optional[TextAnalysis] = None,
+    ) -> DocumentClassification:
+        """Classify ``text`` and fold it into the corpus statistics.
+
+        ``scores`` may be precomputed with :meth:`score_content`, e.g. in a worker process,
+        and ``analysis`` shared with the other ingestion stages.
+        """
+
+        analysis = analysis or TextAnalysis(text)
+        scores = scores or self.score_content(text, analysis)
+        # Documents classified from several threads are compared to and added to the corpus
+        # one at a time.
+        with self._lock:
+            importance_score = self._estimate_importance(text, metadata, analysis)
+            self.corpus_lengths.append(scores.token_count)
+            self.corpus.add_document(analysis)
+        return DocumentClassification(scores.document_type, scores.privilege_risk, importance_score)
+
+    def score_content(self, text: str, analysis: Optional[TextAnalysis] = None) -> ContentScores:
+        """Compute the stateless type and privilege scores for ``text``.
+
+        ``analysis`` may be a :class:`TextAnalysis` of ``text`` whose tokens and lower-cased
+        form have already been derived.
+        """
+
+        analysis = analysis or TextAnalysis(text)
+        tokens = analysis.tokens
+        document_type = self._infer_document_type(tokens, analysis.lowered)
+        privilege_risk = self._score_privilege(analysis.counts, len(tokens))
+        return ContentScores(document_type, privilege_risk, len(tokens))
+
+    def _infer_document_type(self, tokens: List[str], lowered: str) -> str:
         if not tokens:
             return "unknown"
-        lowered = raw_text.lower()
         best_type = "unknown"
         best_score = -1.0
         for candidate, keywords in self.type_keywords.items():
@@ -89,20 +121,26 @@ class DocumentClassifier:
                 best_type = candidate
         return best_type
 
-    def _score_privilege(self, tokens: List[str]) -> float:
-        if not tokens:
+    def _score_privilege(self, counts: Counter[str], token_count: int) -> float:
+        if not token_count:
             return 0.0
-        tokenized = " ".join(tokens)
-        hits = sum(tokenized.count(keyword.replace(" ", "")) for keyword in self.privilege_keywords)
-        density = hits / max(len(tokens), 1)
+        # Keywords are matched inside single tokens, so each distinct token is searched once.
+        hits = sum(
+            count * token.count(keyword.replace(" ", ""))
+            for token, count in counts.items()
+            for keyword in self.privilege_keywords
+        )
+        density = hits / max(token_count, 1)
         signal = min(1.0, hits * 0.2 + density * 10)
         return round(signal, 3)
 
-    def _estimate_importance(self, text: str, metadata: Dict[str, List[str]]) -> float:
+    def _estimate_importance(
+        self, text: str, metadata: Dict[str, List[str]], analysis: TextAnalysis
+    ) -> float:
         length_factor = min(len(text) / 5000, 1.0)
         entity_bonus = min(len(metadata.get("entities", [])) / 10, 1.0)
         date_bonus = min(len(metadata.get("dates", [])) / 5, 1.0)
-        novelty = self.corpus.novelty(text)
+        novelty = self.corpus.novelty(analysis)
         importance = 0.3 * length_factor + 0.25 * entity_bonus + 0.25 * date_bonus + 0.2 * novelty
         return round(min(max(importance, 0.0), 1.0), 3)
 
@@ -0,0 +1,256 @@
+"""Fast extraction of natural-language dates from document text.
+
+``dateparser.search_dates`` tokenises and tries to parse every stretch of the text, which
+costs seconds on long documents. :class:`DateExtractor` instead finds candidate spans with
+compiled patterns (month-name dates, ordinal dates, dotted and year-first numeric dates,
+and relative forms such as "3 weeks ago" or "next Tuesday") and hands only those short spans
+to ``dateparser.parse``, memoising the results. Candidates are English, like the patterns in
+:mod:`app.services.parser`; ``settings.date_engine = "dateparser"`` restores whole-text
+search.
+
+Run ``python -m app.services.dates FILE...`` to compare recall and throughput of both
+engines on a corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set
+
+import dateparser
+from dateparser.search import search_dates
+
+from ..config import settings
+
+_MONTH = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_DAY = r"(?:[12]\d|3[01]|0?[1-9])(?:st|nd|rd|th)?"
+_YEAR = r"\d{4}"
+_WEEKDAY = r"(?:mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?"
+_COUNT = r"(?:\d+|an?|one|two|three|four|five|six|seven|eight|nine|ten|twelve)"
+_UNIT = r"(?:day|week|fortnight|month|year)s?"
+
+CANDIDATE_PATTERN = re.compile(
+    rf"""\b(?:
+        {_MONTH}\s+{_DAY}(?:,?\s+{_YEAR})?             # January 5, 2023 / Sept 9th
+      | {_DAY}(?:\s+of)?\s+{_MONTH}(?:,?\s+{_YEAR})?   # 5th of March 2021 / 12 Feb
+      | {_MONTH},?\s+{_YEAR}                           # May 2020
+      | \d{{1,2}}\.\d{{1,2}}\.\d{{2,4}}                # 15.02.2022
+      | \d{{4}}[/.]\d{{1,2}}[/.]\d{{1,2}}              # 2022/02/15
+      | (?:today|tomorrow|yesterday)
+      | {_COUNT}\s+{_UNIT}\s+ago
+      | in\s+{_COUNT}\s+{_UNIT}
+      | (?:next|last|this)\s+(?:{_WEEKDAY}|week|month|year)
+    )\b""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_WEEKDAY_PATTERN = re.compile(rf"(next|last|this)\s+({_WEEKDAY})", re.IGNORECASE)
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@lru_cache(maxsize=None)
+def _parse_settings(base: date) -> dict:
+    return {
+        "RETURN_AS_TIMEZONE_AWARE": False,
+        "RELATIVE_BASE": datetime.combine(base, datetime.min.time()),
+        # "May 2020" names a month; without this it takes the base date's day of month.
+        "PREFER_DAY_OF_MONTH": "first",
+    }
+
+
+def _resolve_weekday(span: str, base: date) -> Optional[date]:
+    # dateparser does not understand "next Tuesday"; resolve weekday forms directly.
+    match = _WEEKDAY_PATTERN.fullmatch(span)
+    if match is None:
+        return None
+    which, weekday = match.group(1).lower(), _WEEKDAYS.index(match.group(2)[:3].lower())
+    offset = weekday - base.weekday()
+    if which == "next":
+        offset = offset if offset > 0 else offset + 7
+    elif which == "last":
+        offset = offset if offset < 0 else offset - 7
+    return base + timedelta(days=offset)
+
+
+@lru_cache(maxsize=4096)
+def _parse_span(span: str, base: date) -> Optional[str]:
+    resolved = _resolve_weekday(span, base)
+    if resolved is None:
+        parsed = dateparser.parse(span, languages=["en"], settings=_parse_settings(base))
+        if parsed is None:
+            return None
+        resolved = parsed.date()
+    return resolved.isoformat()
+
+
+class DateExtractor:
+    """Find natural-language dates by parsing pattern-matched candidate spans only."""
+
+    def extract(self, text: str, base: Optional[date] = None) -> List[str]:
+        """ISO dates mentioned in ``text``; relative forms resolve against ``base`` (today)."""
+
+        base = base or date.today()
+        found: Set[str] = set()
+        for match in CANDIDATE_PATTERN.finditer(text):
+            # Normalise case and spacing so equivalent spans share one cache entry.
+            span = " ".join(match.group().lower().split())
+            parsed = _parse_span(span, base)
+            if parsed is not None:
+                found.add(parsed)
+        return sorted(found)
+
+
+def search_all_dates(text: str) -> List[str]:
+    """The original engine: ``dateparser.search_dates`` over the whole text."""
+
+    results = search_dates(text, settings={"RETURN_AS_TIMEZONE_AWARE": False}) or []
+    return sorted({result.date().isoformat() for _, result in results})
+
+
+def extract_dates(text: str) -> List[str]:
+    """Natural-language dates in ``text`` using the engine selected in settings."""
+
+    if settings.date_engine == "dateparser":
+        return search_all_dates(text)
+    return date_extractor.extract(text)
+
+
+@dataclass
+class DateBenchmark:
+    """Recall and throughput of the fast engine relative to whole-text search.
+
+    ``dateparser.search_dates`` resolves relative and partial mentions (a bare weekday or
+    month) against the previous date it found and emits fragments such as "Feb" or "of one
+    year", so its output is not a reliable ground truth for those. Recall is therefore
+    reported separately for complete dates, whose span carries a day, month and year.
+    """
+
+    documents: int = 0
+    characters: int = 0
+    baseline_seconds: float = 0.0
+    fast_seconds: float = 0.0
+    baseline_dates: int = 0
+    fast_dates: int = 0
+    matched_dates: int = 0
+    complete_dates: int = 0
+    matched_complete_dates: int = 0
+    missed: List[str] = field(default_factory=list)
+
+    @property
+    def recall(self) -> float:
+        return self.matched_dates / self.baseline_dates if self.baseline_dates else 1.0
+
+    @property
+    def complete_recall(self) -> float:
+        if not self.complete_dates:
+            return 1.0
+        return self.matched_complete_dates / self.complete_dates
+
+    @property
+    def speedup(self) -> float:
+        return self.baseline_seconds / self.fast_seconds if self.fast_seconds else float("inf")
+
+    def summary(self) -> str:
+        def rate(seconds: float) -> float:
+            return self.characters / seconds / 1024 if seconds else float("inf")
+
+        return "\n".join(
+            [
+                f"documents:       {self.documents} ({self.characters} characters)",
+                f"dateparser:      {self.baseline_seconds:.2f}s, "
+                f"{rate(self.baseline_seconds):.1f} KiB/s, {self.baseline_dates} dates",
+                f"fast:            {self.fast_seconds:.2f}s, {rate(self.fast_seconds):.1f} KiB/s, "
+                f"{self.fast_dates} dates",
+                f"complete recall: {self.complete_recall:.1%} of {self.complete_dates} dates",
+                f"overall recall:  {self.recall:.1%} of dateparser's dates",
+                f"speedup:         {self.speedup:.1f}x",
+            ]
+        )
+
+
+_COMPLETE_SPAN = re.compile(r"\d{4}\D+\d|\d\D+\d{4}")
+
+
+def benchmark(texts: Iterable[str], extractor: Optional[DateExtractor] = None) -> DateBenchmark:
+    """Run both engines over ``texts`` and compare the dates each finds per document.
+
+    Explicit numeric dates found by the parser's regular expression are excluded from both
+    sides, since they are extracted regardless of the engine.
+    """
+
+    from .parser import DATE_PATTERN, parser_service
+
+    extractor = extractor or DateExtractor()
+    report = DateBenchmark()
+    for text in texts:
+        explicit = set(parser_service._normalize_dates(DATE_PATTERN.findall(text)))
+        started = time.perf_counter()
+        mentions = search_dates(text, settings={"RETURN_AS_TIMEZONE_AWARE": False}) or []
+        report.baseline_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        fast = set(extractor.extract(text)) - explicit
+        report.fast_seconds += time.perf_counter() - started
+        baseline = {found.date().isoformat() for _, found in mentions} - explicit
+        complete = {
+            found.date().isoformat() for span, found in mentions if _COMPLETE_SPAN.search(span)
+        } - explicit
+        report.documents += 1
+        report.characters += len(text)
+        report.baseline_dates += len(baseline)
+        report.fast_dates += len(fast)
+        report.matched_dates += len(baseline & fast)
+        report.complete_dates += len(complete)
+        report.matched_complete_dates += len(complete & fast)
+        report.missed.extend(sorted(complete - fast))
+    return report
+
+
+def _read_text(path: Path) -> str:
+    from .formats import format_registry
+
+    with path.open("rb") as stream:
+        return "".join(format_registry.handler(path.suffix).iter_text(stream))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the fast date engine with dateparser.search_dates."
+    )
+    parser.add_argument("paths", nargs="+", type=Path, help="documents of any supported format")
+    args = parser.parse_args(argv)
+    files = [
+        candidate
+        for path in args.paths
+        for candidate in (sorted(path.rglob("*")) if path.is_dir() else [path])
+        if candidate.is_file()
+    ]
+    report = benchmark(_read_text(path) for path in files)
+    print(report.summary())
+    if report.missed:
+        print(f"missed:          {', '.join(report.missed[:20])}")
+
+
+date_extractor = DateExtractor()
+
+
+__all__ = [
+    "CANDIDATE_PATTERN",
+    "DateBenchmark",
+    "DateExtractor",
+    "benchmark",
+    "date_extractor",
+    "extract_dates",
+    "search_all_dates",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Re-processing of dead-lettered ingestions with bounded, backed-off retries."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import ColumnElement, Select, and_, or_, select, update
+
+from ..config import settings
+from ..database import DeadLetter, get_session, utc_now
+from ..schemas import DeadLetterRetryReport
+from .ingestion import IngestionOutcome, ingest_many
+from .retry import RetryPolicy, retry_policy
+from .scheduler import source_rank
+
+logger = logging.getLogger(__name__)
+
+
+class DeadLetterRetrier:
+    """Retry failed ingestions through the concurrent pipeline.
+
+    Each dead letter tracks its attempt count and the next time it is due. A transient
+    failure is rescheduled with exponential backoff and jitter; a permanent failure, or one
+    that reaches ``settings.retry_max_attempts``, is marked ``abandoned`` so poison documents
+    stop consuming pipeline capacity. Successful retries are marked ``resolved``.
+
+    Records are claimed by setting them to ``retrying`` with a conditional ``UPDATE`` before
+    they are re-ingested, so API replicas retrying at the same time never process the same
+    record twice. Records a stopped process left ``retrying`` are claimable again after
+    ``settings.retry_claim_seconds``.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None) -> None:
+        self.policy = policy or retry_policy
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    async def retry(
+        self,
+        trace_ids: Optional[Sequence[str]] = None,
+        *,
+        include_abandoned: bool = False,
+        due_only: bool = False,
+    ) -> DeadLetterRetryReport:
+        """Re-ingest pending dead letters, optionally restricted to ``trace_ids``.
+
+        ``include_abandoned`` also re-queues records that were given up on, e.g. after the
+        underlying cause was fixed. ``due_only`` restricts the batch to records whose
+        backoff has elapsed, which is how the background scheduler calls it.
+        """
+
+        statuses = ["pending", "abandoned"] if include_abandoned else ["pending"]
+        now = utc_now()
+        claimable = or_(
+            DeadLetter.status.in_(statuses),
+            and_(
+                DeadLetter.status == "retrying",
+                DeadLetter.last_attempt_at < now - timedelta(seconds=settings.retry_claim_seconds),
+            ),
+        )
+        query = select(DeadLetter).where(claimable)
+        if trace_ids is not None:
+            query = query.where(DeadLetter.trace_id.in_(list(trace_ids)))
+        if due_only:
+            query = query.where(DeadLetter.next_retry_at <= now)
+        async with self._lock:
+            records = await asyncio.to_thread(self._claim, query, claimable)
+            report = DeadLetterRetryReport(attempted=len(records))
+            by_source: Dict[str, List[DeadLetter]] = defaultdict(list)
+            for record in records:
+                by_source[record.payload.get("source", "retry")].append(record)
+            for source, group in by_source.items():
+                outcomes: List[Optional[IngestionOutcome]] = [None] * len(group)
+                try:
+                    await ingest_many(
+                        [record.payload["path"] for record in group],
+                        source=source,
+                        dead_letter=False,
+                        priority=source_rank("retry"),
+                        on_outcome=outcomes.__setitem__,
+                    )
+                finally:
+                    # Records without an outcome (e.g. cancelled at shutdown) are released.
+                    for record, outcome in zip(group, outcomes, strict=True):
+                        if outcome is None:
+                            await asyncio.to_thread(self._release, record)
+                        else:
+                            await asyncio.to_thread(self._update, record, outcome, report)
+        return report
+
+    @staticmethod
+    def _claim(
+        query: Select[Tuple[DeadLetter]], claimable: ColumnElement[bool]
+    ) -> List[DeadLetter]:
+        """Mark the records ``query`` selects as ``retrying`` and return those this call won."""
+
+        with get_session() as session:
+            candidates = list(session.scalars(query.order_by(DeadLetter.id)))
+            if not candidates:
+                return []
+            # Re-checking the claim condition makes the update a compare-and-set: records
+            # another process claimed since the select are left alone.
+            claimed = set(
+                session.scalars(
+                    update(DeadLetter)
+                    .where(DeadLetter.id.in_([record.id for record in candidates]), claimable)
+                    .values(status="retrying", last_attempt_at=utc_now())
+                    .returning(DeadLetter.id)
+                    .execution_options(synchronize_session=False)
+                )
+            )
+        return [record for record in candidates if record.id in claimed]
+
+    @staticmethod
+    def _release(record: DeadLetter) -> None:
+        status = "pending" if record.status == "retrying" else record.status
+        with get_session() as session:
+            session.execute(
+                update(DeadLetter)
+                .where(DeadLetter.id == record.id, DeadLetter.status == "retrying")
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+
+    def start(self) -> None:
+        """Retry due dead letters every ``settings.retry_poll_seconds`` in the background."""
+
+        if self._task is not None or settings.retry_poll_seconds <= 0:
+            return
+        self._stop = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._poll(self._stop))
+
+    async def shutdown(self) -> None:
+        if self._task is None or self._stop is None:
+            return
+        self._stop.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stop = None
+
+    async def _poll(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                report = await self.retry(due_only=True)
+            except Exception:  # pragma: no cover - keep the scheduler alive
+                logger.exception("Dead-letter retry pass failed")
+            else:
+                if report.attempted:
+                    logger.info(
+                        "Retried %d dead letters: %d resolved, %d rescheduled, %d abandoned",
+                        report.attempted,
+                        len(report.resolved),
+                        len(report.rescheduled),
+                        len(report.abandoned),
+                    )
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.retry_poll_seconds)
+            except asyncio.TimeoutError:
+                continue
+
+    def _update(
+        self, record: DeadLetter, outcome: IngestionOutcome, report: DeadLetterRetryReport
+    ) -> None:
+        now = utc_now()
+        with get_session() as session:
+            stored = session.get(DeadLetter, record.id)
+            if stored is None:
+                return
+            stored.attempts += 1
+            stored.last_attempt_at = now
+            if outcome.succeeded:
+                stored.status = "resolved"
+                stored.next_retry_at = None
+                stored.resolved_external_id = outcome.external_id
+                report.resolved.append(stored.trace_id)
+                return
+            exc = outcome.exception or RuntimeError(outcome.error or "unknown error")
+            decision = self.policy.decide(exc, stored.attempts, now=now)
+            stored.error_message = str(exc)
+            stored.error_type = type(exc).__name__
+            stored.stacktrace = "".join(traceback.format_exception(exc))
+            stored.next_retry_at = decision.next_retry_at
+            if decision.retry:
+                stored.status = "pending"
+                report.rescheduled.append(stored.trace_id)
+            else:
+                stored.status = "abandoned"
+                report.abandoned.append(stored.trace_id)
+
+
+dead_letter_retrier = DeadLetterRetrier()
+
+
+__all__ = ["DeadLetterRetrier", "dead_letter_retrier"]
@@ -0,0 +1,167 @@
+"""Execution backends for CPU-bound ingestion stages.
+
+Parsing, OCR and content scoring are dominated by pure-Python work (pypdf, dateparser,
+regular expressions, rapidfuzz) that holds the GIL, so offloading them to threads keeps the
+event loop responsive but adds no parallelism. Parse and OCR therefore run on a pool of warm
+worker processes by default; classification stays on a thread, as its scoring is short next
+to the cost of shipping the text analysis to a worker. Stage callables live at module level so they can be pickled by
+reference and resolve the worker's own long-lived service singletons.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Mapping, Optional, TypeVar
+
+from ..config import settings
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .analysis import TextAnalysis
+    from .classifier import ContentScores
+    from .ocr import OCRResult
+    from .parser import ParsedDocument
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STAGE_BACKENDS = {"thread", "process"}
+
+
+_in_pool_worker = False
+
+
+def in_pool_worker() -> bool:
+    """Whether this process is a worker of a stage process pool."""
+
+    return _in_pool_worker
+
+
+def _warm_worker() -> None:
+    """Initialise a worker process so the first task does not pay import and cache costs."""
+
+    global _in_pool_worker
+    _in_pool_worker = True
+    from .classifier import classifier_service
+    from .parser import parser_service
+
+    # dateparser lazily loads its language data on first use; prime it once per worker.
+    sample = "Agreement signed by Alice Smith on January 5, 2023 for $1,000."
+    parser_service._extract_metadata(sample)
+    classifier_service.score_content(sample)
+
+
+def parse_document(path: str) -> ParsedDocument:
+    """Parse a document, or an archive member locator, with the executing process's parser."""
+
+    from .archives import archive_reader, split_locator
+    from .parser import parser_service
+
+    member = split_locator(path)
+    if member is None:
+        return parser_service.parse(Path(path))
+    archive, name = member
+    with archive_reader.open(archive, name) as stream:
+        return parser_service.parse_stream(stream, name)
+
+
+def run_ocr(path: str) -> OCRResult:
+    """OCR a document, or an archive member locator, with the executing process's engine."""
+
+    from .archives import archive_reader, split_locator
+    from .ocr import ocr_engine
+
+    member = split_locator(path)
+    if member is None:
+        return ocr_engine.extract_text(Path(path))
+    archive, name = member
+    with archive_reader.open(archive, name) as stream:
+        return ocr_engine.extract_text(Path(name), content=stream.read())
+
+
+def score_content(analysis: TextAnalysis) -> ContentScores:
+    """Compute the stateless classifier scores for the text of ``analysis``.
+
+    In a worker process the analysis arrives without its derived forms and tokenises there.
+    """
+
+    from .classifier import classifier_service
+
+    return classifier_service.score_content(analysis.text, analysis)
+
+
+class StageExecutor:
+    """Dispatch ingestion stages to a thread or a shared pool of worker processes."""
+
+    def __init__(
+        self,
+        backends: Mapping[str, str] | None = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        configured = backends if backends is not None else settings.stage_executors
+        self.backends: Dict[str, str] = {}
+        for stage, backend in configured.items():
+            if backend not in STAGE_BACKENDS:
+                raise ValueError(f"Unknown executor backend {backend!r} for stage {stage!r}")
+            self.backends[stage] = backend
+        self.max_workers = max_workers or settings.process_pool_workers or os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def backend_for(self, stage: str) -> str:
+        return self.backends.get(stage, "thread")
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        """Return the shared worker pool, starting it on first use."""
+
+        with self._lock:
+            if self._pool is None:
+                logger.info("Starting ingestion process pool with %d workers", self.max_workers)
+                # Forking a process whose threads hold locks (the event loop's executors,
+                # PDFium) can deadlock the child, so workers start from a fresh interpreter.
+                context = multiprocessing.get_context(settings.process_pool_start_method)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context, initializer=_warm_worker
+                )
+            return self._pool
+
+    async def run(self, stage: str, func: Callable[..., T], *args: object) -> T:
+        """Execute ``func(*args)`` on the backend configured for ``stage``."""
+
+        if self.backend_for(stage) == "process":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.process_pool(), func, *args)
+        return await asyncio.to_thread(func, *args)
+
+    @staticmethod
+    def task_timeout() -> Optional[float]:
+        """Seconds to wait for one task submitted to the pool, or ``None`` to wait indefinitely."""
+
+        return settings.process_task_timeout_seconds or None
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+stage_executor = StageExecutor()
+atexit.register(stage_executor.shutdown)
+
+
+__all__ = [
+    "StageExecutor",
+    "in_pool_worker",
+    "parse_document",
+    "run_ocr",
+    "score_content",
+    "stage_executor",
+]
@@ -0,0 +1,135 @@
+"""Registry of document format handlers, imported lazily on first use.
+
+A handler turns the bytes of one document format into text, yielded in pieces so large
+documents need not be held in memory twice. :class:`~app.services.parser.DocumentParser`
+dispatches every document to the handler of its extension and, by default, extracts metadata
+from the pieces as they arrive; formats that need more, such as JSON rendering or PDF page
+offsets, override :meth:`FormatHandler.parse`. The registry only records where each handler
+lives, so the libraries behind a format are imported when a document of that format is first
+parsed rather than at startup. Handlers whose optional dependency is missing are left out of
+:meth:`FormatRegistry.extensions`.
+
+Each handler also declares whether a document of its format that yields no text is likely
+an image (a scanned PDF) and should go to OCR, or is simply empty.
+"""
+
+from __future__ import annotations
+
+import abc
+import importlib
+import importlib.util
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, ClassVar, Dict, Iterator, Optional, Set, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from ..parser import DocumentParser, ParsedDocument
+
+
+@contextmanager
+def open_source(source: Path | BinaryIO) -> Iterator[BinaryIO]:
+    """Yield ``source`` as a binary stream, opening (and then closing) it if it is a path."""
+
+    if isinstance(source, Path):
+        with source.open("rb") as stream:
+            yield stream
+    else:
+        yield source
+
+
+class FormatHandler(abc.ABC):
+    """Extract the text of documents of one format."""
+
+    # Whether a document of this format without extractable text should be OCRed.
+    needs_ocr_fallback: ClassVar[bool] = False
+
+    @abc.abstractmethod
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        """Yield the text of the document read from ``stream`` in order, in pieces."""
+
+    def parse(self, parser: DocumentParser, source: Path | BinaryIO) -> ParsedDocument:
+        """Parse a document given as a path or a stream into text and metadata."""
+
+        with open_source(source) as stream:
+            return parser.parse_pieces(self.iter_text(stream))
+
+
+@dataclass(frozen=True)
+class FormatSpec:
+    """Where the handler of a format lives, as ``"module:attribute"``."""
+
+    extensions: Tuple[str, ...]
+    handler: str
+    # Optional top-level module the handler imports; the format is offered only if present.
+    requires: Optional[str] = None
+
+    def available(self) -> bool:
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+
+class FormatRegistry:
+    """Map file extensions to format handlers, importing each handler on first use."""
+
+    def __init__(self) -> None:
+        self._specs: Dict[str, FormatSpec] = {}
+        self._handlers: Dict[str, FormatHandler] = {}
+        self._available: Dict[FormatSpec, bool] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, extensions: Tuple[str, ...], handler: str, requires: Optional[str] = None
+    ) -> None:
+        spec = FormatSpec(tuple(extension.lower() for extension in extensions), handler, requires)
+        with self._lock:
+            for extension in spec.extensions:
+                self._specs[extension] = spec
+                self._handlers.pop(extension, None)
+
+    def _is_available(self, spec: FormatSpec) -> bool:
+        if spec not in self._available:
+            self._available[spec] = spec.available()
+        return self._available[spec]
+
+    def extensions(self) -> Set[str]:
+        """Extensions whose handler can be loaded in this environment."""
+
+        with self._lock:
+            return {ext for ext, spec in self._specs.items() if self._is_available(spec)}
+
+    def handler(self, extension: str) -> FormatHandler:
+        """The handler for ``extension``; raises ``ValueError`` for unsupported formats."""
+
+        extension = extension.lower()
+        with self._lock:
+            handler = self._handlers.get(extension)
+            if handler is not None:
+                return handler
+            spec = self._specs.get(extension)
+            if spec is None or not self._is_available(spec):
+                raise ValueError(f"Unsupported extension: {extension}")
+            module, _, attribute = spec.handler.partition(":")
+            handler = getattr(importlib.import_module(module), attribute)()
+            for registered in spec.extensions:
+                self._handlers[registered] = handler
+            return handler
+
+    def needs_ocr_fallback(self, extension: str) -> bool:
+        try:
+            return self.handler(extension).needs_ocr_fallback
+        except ValueError:
+            return False
+
+
+format_registry = FormatRegistry()
+format_registry.register((".txt", ".md"), "app.services.formats.text:TextHandler")
+format_registry.register((".json",), "app.services.formats.text:JsonHandler")
+format_registry.register((".pdf",), "app.services.formats.pdf:PdfHandler")
+format_registry.register((".docx",), "app.services.formats.docx:DocxHandler")
+format_registry.register((".eml",), "app.services.formats.eml:EmailHandler")
+format_registry.register((".html", ".htm"), "app.services.formats.html:HtmlHandler")
+format_registry.register((".msg",), "app.services.formats.msg:OutlookHandler", "extract_msg")
+
+
+__all__ = ["FormatHandler", "FormatRegistry", "FormatSpec", "format_registry", "open_source"]
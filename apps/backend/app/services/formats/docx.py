@@ -0,0 +1,58 @@
+"""Word documents (Office Open XML), read with the standard library only.
+
+The main document part is parsed incrementally, one paragraph at a time, so memory stays
+bounded by the largest paragraph rather than the document. Paragraphs, including those in
+table cells, become lines; tabs and line breaks are preserved. Headers, footers, comments
+and embedded objects are not extracted.
+"""
+
+from __future__ import annotations
+
+import zipfile
+from typing import BinaryIO, Iterator, List
+from xml.etree.ElementTree import iterparse
+
+from . import FormatHandler
+
+DOCUMENT_PART = "word/document.xml"
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Paragraph text is yielded in batches of roughly this many characters.
+BATCH_CHARS = 64 * 1024
+
+_TEXT = f"{WORD_NAMESPACE}t"
+_TAB = f"{WORD_NAMESPACE}tab"
+_BREAKS = {f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"}
+_PARAGRAPH = f"{WORD_NAMESPACE}p"
+
+
+class DocxHandler(FormatHandler):
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile as exc:
+            raise ValueError(f"Not a DOCX document: {exc}") from exc
+        with archive:
+            if DOCUMENT_PART not in archive.namelist():
+                raise ValueError(f"DOCX document has no {DOCUMENT_PART}")
+            with archive.open(DOCUMENT_PART) as part:
+                batch: List[str] = []
+                size = 0
+                for _, element in iterparse(part, events=("end",)):
+                    tag = element.tag
+                    if tag == _TEXT:
+                        piece = element.text or ""
+                    elif tag == _TAB:
+                        piece = "\t"
+                    elif tag in _BREAKS or tag == _PARAGRAPH:
+                        piece = "\n"
+                    else:
+                        continue
+                    batch.append(piece)
+                    size += len(piece)
+                    if tag == _PARAGRAPH:
+                        element.clear()
+                        if size >= BATCH_CHARS:
+                            yield "".join(batch)
+                            batch, size = [], 0
+                if batch:
+                    yield "".join(batch)
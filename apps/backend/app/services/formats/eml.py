@@ -0,0 +1,41 @@
+"""RFC 822 e-mail messages (``.eml``), parsed with the standard library.
+
+The text is the main headers followed by the plain-text body, or the HTML body converted to
+text when there is no plain-text alternative. Attachments are listed by file name only.
+"""
+
+from __future__ import annotations
+
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from typing import BinaryIO, Iterator
+
+from . import FormatHandler
+from .html import html_to_text
+
+HEADERS = ("From", "To", "Cc", "Date", "Subject")
+
+
+def message_headers(message: EmailMessage) -> Iterator[str]:
+    for header in HEADERS:
+        value = message.get(header)
+        if value:
+            yield f"{header}: {value}\n"
+
+
+class EmailHandler(FormatHandler):
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        message = BytesParser(policy=policy.default).parse(stream)
+        yield from message_headers(message)
+        body = message.get_body(preferencelist=("plain", "html"))
+        if body is not None:
+            content = body.get_content()
+            yield "\n"
+            if body.get_content_subtype() == "html":
+                yield from html_to_text([content])
+            else:
+                yield content
+        names = [part.get_filename() for part in message.iter_attachments()]
+        for name in filter(None, names):
+            yield f"\nAttachment: {name}"
@@ -0,0 +1,91 @@
+"""HTML pages, converted to text with the standard library's incremental parser.
+
+Markup is fed to the parser chunk by chunk and text is yielded as it is recognised. Script,
+style and template contents are dropped, whitespace is collapsed outside ``<pre>``, and
+block-level elements start new lines. Documents are decoded as UTF-8, like text files.
+"""
+
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from . import FormatHandler
+from .text import read_text_chunks
+
+SKIPPED_ELEMENTS = {"script", "style", "template", "noscript", "svg"}
+BLOCK_ELEMENTS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "title",
+    "tr", "ul",
+}  # fmt: skip
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.pieces: List[str] = []
+        self._skipping: Optional[str] = None
+        self._preformatted = 0
+        self._at_line_start = True
+
+    def _newline(self) -> None:
+        if not self._at_line_start:
+            self.pieces.append("\n")
+            self._at_line_start = True
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._skipping is not None:
+            return
+        if tag in SKIPPED_ELEMENTS:
+            self._skipping = tag
+        elif tag in BLOCK_ELEMENTS:
+            self._newline()
+            self._preformatted += tag == "pre"
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._skipping is None and tag in BLOCK_ELEMENTS:
+            self._newline()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skipping is not None:
+            if tag == self._skipping:
+                self._skipping = None
+            return
+        if tag in BLOCK_ELEMENTS:
+            self._newline()
+            if tag == "pre" and self._preformatted:
+                self._preformatted -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._skipping is not None:
+            return
+        if not self._preformatted:
+            data = _WHITESPACE.sub(" ", data)
+            if self._at_line_start:
+                data = data.lstrip()
+        if data:
+            self.pieces.append(data)
+            self._at_line_start = data.endswith("\n")
+
+
+def html_to_text(chunks: Iterable[str]) -> Iterator[str]:
+    """Convert HTML delivered in ``chunks`` to text, yielding it as it is parsed."""
+
+    extractor = _TextExtractor()
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.pieces:
+            yield "".join(extractor.pieces)
+            extractor.pieces.clear()
+    extractor.close()
+    if extractor.pieces:
+        yield "".join(extractor.pieces)
+
+
+class HtmlHandler(FormatHandler):
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        return html_to_text(read_text_chunks(stream))
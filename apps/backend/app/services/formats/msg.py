@@ -0,0 +1,39 @@
+"""Outlook messages (``.msg``), read with the optional ``extract-msg`` package.
+
+The format is only offered when ``extract_msg`` is installed; its text mirrors that of
+``.eml`` messages.
+"""
+
+from __future__ import annotations
+
+from typing import BinaryIO, Iterator
+
+import extract_msg
+
+from . import FormatHandler
+
+
+class OutlookHandler(FormatHandler):
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        message = extract_msg.openMsg(stream.read())
+        try:
+            for header, value in (
+                ("From", message.sender),
+                ("To", message.to),
+                ("Cc", message.cc),
+                ("Date", message.date),
+                ("Subject", message.subject),
+            ):
+                if value:
+                    yield f"{header}: {value}\n"
+            if message.body:
+                yield "\n"
+                yield message.body
+            for attachment in message.attachments:
+                name = getattr(attachment, "longFilename", None) or getattr(
+                    attachment, "shortFilename", None
+                )
+                if name:
+                    yield f"\nAttachment: {name}"
+        finally:
+            message.close()
@@ -0,0 +1,186 @@
+"""PDF text layers, extracted page by page with the configured PDF text engine.
+
+Pages are extracted serially, or for long PDFs on disk in ranges on the stage executor's
+process pool, each page within a time budget. Pages that fail or overrun yield no text, with
+a warning recorded in the parse metadata.
+"""
+
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Deque, Iterator, List, Optional, Tuple
+
+from ...config import settings
+from ..pdf_text import PdfText, open_pdf_text
+from . import FormatHandler
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from ..parser import DocumentParser, ParsedDocument
+
+logger = logging.getLogger(__name__)
+
+
+class PdfHandler(FormatHandler):
+    """Yield the text of each page, pages separated by a newline.
+
+    A PDF without a text layer is usually a scan, so empty results go to OCR.
+    """
+
+    needs_ocr_fallback = True
+
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        warnings: List[str] = []
+        for number, page in enumerate(pdf_pages(stream, warnings)):
+            yield page if number == 0 else "\n" + page
+
+    def parse(self, parser: DocumentParser, source: Path | BinaryIO) -> ParsedDocument:
+        """Parse a PDF page by page, recording where each page starts in the text."""
+
+        warnings: List[str] = []
+        offsets: List[int] = []
+
+        def pieces() -> Iterator[str]:
+            position = 0
+            for number, page in enumerate(pdf_pages(source, warnings)):
+                piece = page if number == 0 else "\n" + page
+                offsets.append(position + len(piece) - len(page))
+                position += len(piece)
+                yield piece
+
+        parsed = parser.parse_pieces(pieces())
+        parsed.page_offsets = offsets
+        if warnings:
+            parsed.metadata.setdefault("parse_warnings", []).extend(warnings)
+        return parsed
+
+
+def pdf_pages(source: Path | BinaryIO, warnings: List[str]) -> Iterator[str]:
+    """Yield the text of every page in order; failed or timed-out pages yield ``""``."""
+
+    document = open_pdf_text(source)
+    try:
+        count = len(document)
+        parallel = isinstance(source, Path) and _parallel_pages_allowed(count)
+        if not parallel:
+            timeout = settings.pdf_page_timeout_seconds
+            for index in range(count):
+                text, warning = _extract_page(document, index, timeout)
+                if warning:
+                    warnings.append(warning)
+                yield text
+            return
+    finally:
+        document.close()  # workers open the file themselves
+    # Workers use the engine chosen here rather than each sampling the document again.
+    yield from _parallel_pdf_pages(source, count, warnings, document.engine)
+
+
+def _parallel_pdf_pages(path: Path, count: int, warnings: List[str], engine: str) -> Iterator[str]:
+    from ..executors import stage_executor
+
+    pool = stage_executor.process_pool()
+    step = max(settings.pdf_pages_per_task, 1)
+    ranges = deque((start, min(start + step, count)) for start in range(0, count, step))
+    # Bound the ranges in flight so finished pages waiting for earlier ones stay few.
+    window = max(stage_executor.max_workers * 2, 1)
+    pending: Deque[Tuple[Future, int, int]] = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < window:
+                start, stop = ranges.popleft()
+                future = pool.submit(
+                    extract_pdf_pages,
+                    str(path),
+                    start,
+                    stop,
+                    settings.pdf_page_timeout_seconds,
+                    engine,
+                )
+                pending.append((future, start, stop))
+            future, start, stop = pending.popleft()
+            try:
+                pages = future.result(timeout=stage_executor.task_timeout())
+            except FutureTimeoutError:
+                # A wedged worker must not hold up the document: skip its pages.
+                future.cancel()
+                logger.warning("Pages %d-%d of %s timed out in the pool", start + 1, stop, path)
+                pages = [
+                    ("", f"Page {index + 1} skipped: text extraction timed out in the pool.")
+                    for index in range(start, stop)
+                ]
+            for text, warning in pages:
+                if warning:
+                    warnings.append(warning)
+                yield text
+    finally:
+        for future, _, _ in pending:
+            future.cancel()
+
+
+class PageTimeout(Exception):
+    """Raised inside a worker when extracting one PDF page exceeds its time budget."""
+
+
+@contextmanager
+def _page_deadline(seconds: float) -> Iterator[None]:
+    # SIGALRM can only interrupt the main thread, which is where pool workers run tasks;
+    # pages extracted on other threads run without a deadline. Native PDFium calls cannot be
+    # interrupted; a page overrunning there is only abandoned once the call returns.
+    if (
+        seconds <= 0
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def _expire(signum: int, frame: object) -> None:
+        raise PageTimeout
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page(document: PdfText, index: int, timeout: float) -> Tuple[str, Optional[str]]:
+    number = index + 1
+    try:
+        with _page_deadline(timeout):
+            return document.page_text(index), None
+    except PageTimeout:
+        logger.warning("Text extraction of page %d timed out after %ss", number, timeout)
+        return "", f"Page {number} skipped: text extraction timed out after {timeout}s."
+    except Exception as exc:  # pragma: no cover - PyPDF variability
+        logger.warning("Failed to extract text from page %d due to %s", number, exc)
+        return "", None
+
+
+def extract_pdf_pages(
+    path: str, start: int, stop: int, timeout: float, engine: str = "pypdf"
+) -> List[Tuple[str, Optional[str]]]:
+    """Extract pages ``start`` to ``stop`` (0-based, exclusive) of a PDF, in a pool worker.
+
+    Returns ``(text, warning)`` per page.
+    """
+
+    with open_pdf_text(Path(path), engine) as document:
+        return [_extract_page(document, index, timeout) for index in range(start, stop)]
+
+
+def _parallel_pages_allowed(count: int) -> bool:
+    from ..executors import in_pool_worker
+
+    threshold = settings.pdf_parallel_min_pages
+    # A pool worker parsing a document must not submit work to a pool of its own.
+    return 0 < threshold <= count and not in_pool_worker()
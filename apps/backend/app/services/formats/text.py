@@ -0,0 +1,123 @@
+"""Plain text, Markdown and JSON, decoded as UTF-8 in chunks.
+
+JSON up to the parser's streaming threshold is re-serialised with sorted keys and
+indentation. Larger documents are tokenised incrementally and rendered as ``key: value``
+lines in document order, so memory does not grow with the input.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, List, Optional
+
+from . import FormatHandler, open_source
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from ..parser import DocumentParser, ParsedDocument
+
+STREAM_CHUNK_CHARS = 1024**2
+JSON_TOKEN_PATTERN = re.compile(
+    r'\s+|"(?:[^"\\]|\\.)*"|[{}\[\],:]|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null'
+)
+
+
+def read_text_chunks(stream: BinaryIO, encoding: str = "utf-8") -> Iterator[str]:
+    """Decode ``stream`` in chunks of ``STREAM_CHUNK_CHARS`` characters, ignoring bad bytes."""
+
+    reader = io.TextIOWrapper(stream, encoding=encoding, errors="ignore")
+    try:
+        yield from iter(lambda: reader.read(STREAM_CHUNK_CHARS), "")
+    finally:
+        reader.detach()
+
+
+class TextHandler(FormatHandler):
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        return read_text_chunks(stream)
+
+
+class JsonHandler(FormatHandler):
+    """Render JSON scalars as ``key: value`` lines."""
+
+    def iter_text(self, stream: BinaryIO) -> Iterator[str]:
+        return render_json_stream(read_text_chunks(stream))
+
+    def parse(self, parser: DocumentParser, source: Path | BinaryIO) -> ParsedDocument:
+        with open_source(source) as stream:
+            reader = io.TextIOWrapper(stream, encoding="utf-8", errors="ignore")
+            try:
+                head = reader.read(parser.streaming_threshold + 1)
+                if len(head) <= parser.streaming_threshold:
+                    return parser.parse_text(json.dumps(json.loads(head), indent=2, sort_keys=True))
+                rest = iter(lambda: reader.read(STREAM_CHUNK_CHARS), "")
+                return parser.parse_pieces(render_json_stream(chain([head], rest)))
+            finally:
+                reader.detach()
+
+
+def render_json_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """Tokenise JSON incrementally and yield its scalars as ``key: value`` lines.
+
+    Only the current token and a stack of open containers are held in memory, so the
+    document may be arbitrarily large; keys are reported as they appear instead of sorted.
+    Raises ``ValueError`` on malformed input.
+    """
+
+    buffer = ""
+    offset = 0
+    stack: List[str] = []
+    expecting_key = False
+    key: Optional[str] = None
+    lines: List[str] = []
+    size = 0
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        buffer += chunk or ""
+        position = 0
+        while position < len(buffer):
+            match = JSON_TOKEN_PATTERN.match(buffer, position)
+            if match is None or (match.end() == len(buffer) and not final):
+                if final:
+                    raise ValueError(f"Malformed JSON near offset {offset + position}")
+                if len(buffer) - position > STREAM_CHUNK_CHARS * 4:
+                    raise ValueError(f"Oversized JSON token near offset {offset + position}")
+                break
+            token = match.group()
+            position = match.end()
+            first = token[0]
+            if first.isspace() or first == ":":
+                expecting_key = False if first == ":" else expecting_key
+                continue
+            if first in "{[":
+                stack.append(first)
+                expecting_key = first == "{"
+                key = None
+                continue
+            if first in "}]":
+                if not stack:
+                    raise ValueError(f"Malformed JSON near offset {offset + position}")
+                stack.pop()
+                continue
+            if first == ",":
+                expecting_key = bool(stack) and stack[-1] == "{"
+                continue
+            value = json.loads(token) if first == '"' else token
+            if expecting_key:
+                key = value
+                continue
+            line = f"{key}: {value}\n" if stack and stack[-1] == "{" and key else f"{value}\n"
+            lines.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_CHARS:
+                yield "".join(lines)
+                lines, size = [], 0
+        offset += position
+        buffer = buffer[position:]
+    if stack:
+        raise ValueError("Malformed JSON: unexpected end of document")
+    if lines:
+        yield "".join(lines)
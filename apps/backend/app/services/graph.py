@@ -2,41 +2,179 @@
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import os
 import pickle
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Any, Dict, List, Set
+from uuid import uuid4
 
 import networkx as nx
 
 from ..config import settings
+from .locks import file_lock
 
 logger = logging.getLogger(__name__)
 
 
 class GraphManager:
-    """Persist a NetworkX-backed knowledge graph to disk."""
+    """Persist a NetworkX-backed knowledge graph to disk.
 
-    def __init__(self, path: Path | None = None) -> None:
+    Mutations are applied in memory and appended to a JSON-lines change log next to the
+    snapshot. The full graph is only pickled when enough changes have accumulated (or enough
+    time has passed), written to a temporary file and atomically renamed over the previous
+    snapshot, after which the log is truncated. On startup the snapshot is loaded and the log
+    replayed, so a crash loses at most a torn final log line. Writers hold a file lock and
+    first catch up with entries other processes appended, so API and worker processes can
+    share one graph.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        snapshot_every: int | None = None,
+        snapshot_seconds: float | None = None,
+    ) -> None:
         self.path = path or settings.graph_path
-        if self.path.exists():
+        self.log_path = self.path.with_name(f"{self.path.name}.log")
+        self.snapshot_every = snapshot_every or settings.graph_snapshot_every
+        self.snapshot_seconds = (
+            snapshot_seconds if snapshot_seconds is not None else settings.graph_snapshot_seconds
+        )
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self.generation_path = self.path.with_name(f"{self.path.name}.generation")
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._pending_changes = 0
+        self._last_snapshot = time.monotonic()
+        self._log_offset = 0
+        self._generation = self._read_generation()
+        self.graph = self._load_snapshot()
+        self._sync()
+
+    def _load_snapshot(self) -> nx.MultiDiGraph:
+        if not self.path.exists():
+            return nx.MultiDiGraph()
+        try:
+            with self.path.open("rb") as handle:
+                graph = pickle.load(handle)
+        except Exception as exc:  # pragma: no cover - corruption guard
+            logger.warning("Failed to load graph from %s due to %s; starting fresh", self.path, exc)
+            return nx.MultiDiGraph()
+        _key_edges_by_relation(graph)
+        return graph
+
+    def _read_generation(self) -> str | None:
+        try:
+            return self.generation_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _sync(self) -> None:
+        """Catch up with snapshots and log entries written by other processes."""
+
+        try:
+            log_size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            log_size = 0
+        generation = self._read_generation()
+        if generation != self._generation or log_size < self._log_offset:
+            # Another process snapshotted (and truncated the log) since we last looked.
+            self.graph = self._load_snapshot()
+            self._generation = generation
+            self._log_offset = 0
+            self._pending_changes = 0
+            self._dirty.clear()
+        if log_size <= self._log_offset:
+            return
+        with self.log_path.open("rb") as handle:
+            handle.seek(self._log_offset)
+            data = handle.read(log_size - self._log_offset)
+        # Only complete lines are consumed; a trailing fragment is either still being written
+        # or torn by a crash, in which case the next writer terminates it.
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
             try:
-                with self.path.open("rb") as handle:
-                    self.graph = pickle.load(handle)
-            except Exception as exc:  # pragma: no cover - corruption guard
-                logger.warning("Failed to load graph from %s due to %s; starting fresh", self.path, exc)
-                self.graph = nx.MultiDiGraph()
-        else:
-            self.graph = nx.MultiDiGraph()
+                change = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.warning("Ignoring torn graph log entry in %s", self.log_path)
+                continue
+            self._apply(change)
+            self._pending_changes += 1
+        self._log_offset += len(complete)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the in-memory graph has changes not yet captured in a snapshot."""
+
+        return bool(self._dirty) or self._pending_changes > 0
 
     def persist(self) -> None:
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("wb") as handle:
-            pickle.dump(self.graph, handle)
+        """Write an atomic snapshot of the graph and truncate the change log."""
+
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(f"{self.path.name}.tmp")
+            with temporary.open("wb") as handle:
+                pickle.dump(self.graph, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, self.path)
+            self.log_path.unlink(missing_ok=True)
+            # A fresh token per snapshot tells other processes to reload it; file stamps are
+            # unreliable because inode numbers are recycled between atomic renames.
+            self._generation = uuid4().hex
+            self.generation_path.write_text(self._generation, encoding="utf-8")
+            self._log_offset = 0
+            self._dirty.clear()
+            self._pending_changes = 0
+            self._last_snapshot = time.monotonic()
+
+    def flush(self) -> None:
+        """Snapshot the graph if it has unsnapshotted changes."""
+
+        with self._lock:
+            if self.dirty:
+                self.persist()
 
     def upsert_document(self, external_id: str, metadata: Dict[str, List[str]]) -> None:
         """Insert or update document node with metadata edges."""
 
+        change = {"op": "upsert", "id": external_id, "metadata": metadata}
+        self._record(change)
+
+    def remove_document(self, external_id: str) -> None:
+        """Remove a document node and any metadata nodes it alone referenced."""
+
+        change = {"op": "remove", "id": external_id}
+        self._record(change)
+
+    def neighbors(self, external_id: str) -> List[str]:
+        with self._lock:
+            self._sync()
+            if external_id not in self.graph:
+                return []
+            neighbor_nodes = set(self.graph.neighbors(external_id))
+            neighbor_nodes.update(self.graph.predecessors(external_id))
+        return sorted(neighbor_nodes)
+
+    def _apply(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "remove":
+            self._remove(change["id"])
+            return
+        if change["op"] != "upsert":
+            logger.warning("Skipping unknown graph change %r", change["op"])
+            return
+        external_id = change["id"]
+        metadata = change["metadata"]
         self.graph.add_node(external_id, type="document")
         for date in metadata.get("dates", []):
             self._link(external_id, f"date::{date}", relation="occurs_on")
@@ -46,18 +184,60 @@ class GraphManager:
             self._link(external_id, f"email::{email}", relation="involves")
         for amount in metadata.get("monetary_amounts", []):
             self._link(external_id, f"amount::{amount}", relation="values")
-        self.persist()
+        self._dirty.add(external_id)
 
-    def neighbors(self, external_id: str) -> List[str]:
+    def _record(self, change: Dict[str, Any]) -> None:
+        # Holding the file lock while catching up, applying and appending keeps the log a
+        # single ordered history when several processes (API and workers) share the graph.
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            self._apply(change)
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("ab") as handle:
+                if handle.tell() > self._log_offset:
+                    handle.write(b"\n")  # terminate a fragment torn by a crashed writer
+                handle.write(json.dumps(change, separators=(",", ":")).encode("utf-8") + b"\n")
+                handle.flush()
+                if settings.graph_log_fsync:
+                    os.fsync(handle.fileno())
+                self._log_offset = handle.tell()
+            self._pending_changes += 1
+            elapsed = time.monotonic() - self._last_snapshot
+            if self._pending_changes >= self.snapshot_every or elapsed >= self.snapshot_seconds:
+                self.persist()
+
+    def _remove(self, external_id: str) -> None:
         if external_id not in self.graph:
-            return []
-        neighbor_nodes = set(self.graph.neighbors(external_id))
-        neighbor_nodes.update(self.graph.predecessors(external_id))
-        return sorted(neighbor_nodes)
+            return
+        linked = set(self.graph.successors(external_id))
+        self.graph.remove_node(external_id)
+        self.graph.remove_nodes_from([node for node in linked if self.graph.degree(node) == 0])
+        self._dirty.add(external_id)
 
     def _link(self, source: str, target: str, relation: str) -> None:
         self.graph.add_node(target, type=relation)
-        self.graph.add_edge(source, target, relation=relation)
+        # Keying edges by relation keeps re-applied changes (log replay, re-ingest) idempotent.
+        self.graph.add_edge(source, target, key=relation, relation=relation)
+
+
+def _key_edges_by_relation(graph: nx.MultiDiGraph) -> None:
+    """Re-key edges of snapshots written before edges were keyed by relation.
+
+    Such edges carry integer keys, so replaying a change for the same document would add a
+    parallel edge next to each of them instead of overwriting it.
+    """
+
+    stale = [
+        (source, target, key, data)
+        for source, target, key, data in graph.edges(keys=True, data=True)
+        if key != data.get("relation", key)
+    ]
+    for source, target, key, data in stale:
+        graph.remove_edge(source, target, key=key)
+        graph.add_edge(source, target, key=data["relation"], **data)
+    if stale:
+        logger.info("Re-keyed %d graph edges by relation", len(stale))
 
 
 graph_manager = GraphManager()
+atexit.register(graph_manager.flush)
@@ -4,132 +4,586 @@ from __future__ import annotations
 
 import asyncio
 import traceback
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
 from uuid import uuid4
 
 from ..config import settings
-from ..database import DeadLetter, Document, IngestionRun, MetadataFragment, get_session, utc_now
-from .classifier import classifier_service
+from ..database import DeadLetter, Document, get_session, utc_now
+from . import executors
+from .analysis import TextAnalysis
+from .archives import archive_reader, member_locator, split_locator
+from .classifier import ContentScores, DocumentClassification, classifier_service
+from .executors import stage_executor
+from .formats import format_registry
 from .graph import graph_manager
-from .ocr import OCRResult, ocr_engine
-from .parser import ParsedDocument, parser_service
+from .ocr import OCRResult
+from .parse_cache import parse_cache
+from .parser import ParsedDocument
+from .persistence import DocumentRecord, ingestion_store
+from .pipeline import Stage, StageGraph
 from .retrieval import retriever_service
+from .retry import retry_policy
+from .scheduler import IngestionScheduler
 from .storage import storage_service
+from .timing import StageTimer
 
 
-async def _compute_checksum(path: Path) -> str:
-    return await asyncio.to_thread(storage_service.compute_checksum, path)
+def _resolve_location(path: str) -> str:
+    """Absolute form of a filesystem path or an archive member locator."""
 
+    member = split_locator(path)
+    if member is None:
+        return str(Path(path).resolve())
+    archive, name = member
+    return member_locator(archive.resolve(), name)
 
-async def _detect_mime_type(path: Path) -> str:
-    return await asyncio.to_thread(storage_service.detect_mime_type, path)
 
+def _validate_location(location: str) -> None:
+    member = split_locator(location)
+    if member is None:
+        exists = Path(location).exists()
+        suffix = Path(location).suffix
+    else:
+        archive, name = member
+        exists = archive_reader.exists(archive, name)
+        suffix = Path(name).suffix
+    if not exists:
+        raise FileNotFoundError(f"Document not found: {location}")
+    if suffix.lower() not in settings.allowed_extensions:
+        raise ValueError(f"Unsupported extension for ingestion: {suffix}")
 
-async def _parse_document(path: Path) -> ParsedDocument:
-    return await asyncio.to_thread(parser_service.parse, path)
 
+def _checksum(location: str) -> str:
+    member = split_locator(location)
+    if member is None:
+        return storage_service.compute_checksum(Path(location))
+    return archive_reader.checksum(*member)
 
-async def _run_ocr(path: Path) -> OCRResult:
-    return await asyncio.to_thread(ocr_engine.extract_text, path)
 
+def _mime_type(location: str) -> str:
+    member = split_locator(location)
+    if member is None:
+        return storage_service.detect_mime_type(Path(location))
+    return archive_reader.mime_type(member[1])
 
-async def ingest_document_flow(path: str, source: str = "upload") -> str:
-    """Ingest a single document and return its external identifier."""
 
-    absolute_path = Path(path).resolve()
-    if not absolute_path.exists():
-        raise FileNotFoundError(f"Document not found: {absolute_path}")
-    if absolute_path.suffix.lower() not in settings.allowed_extensions:
-        raise ValueError(f"Unsupported extension for ingestion: {absolute_path.suffix}")
+async def _compute_checksum(location: str) -> str:
+    return await asyncio.to_thread(_checksum, location)
+
+
+async def _detect_mime_type(location: str) -> str:
+    return await asyncio.to_thread(_mime_type, location)
+
+
+async def _parse_document(location: str) -> ParsedDocument:
+    return await stage_executor.run("parse", executors.parse_document, location)
+
+
+async def _run_ocr(location: str) -> OCRResult:
+    return await stage_executor.run("ocr", executors.run_ocr, location)
+
+
+async def _score_content(analysis: TextAnalysis) -> ContentScores:
+    return await stage_executor.run("classify", executors.score_content, analysis)
+
+
+def _content(context: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Document text and metadata from the parse result, replaced by OCR output if it ran."""
+
+    parsed: ParsedDocument = context["parse"]
+    metadata = dict(parsed.metadata)
+    ocr_result: Optional[OCRResult] = context["ocr"]
+    if ocr_result is None:
+        return parsed.text, metadata
+    if ocr_result.warnings:
+        metadata.setdefault("ocr_warnings", ocr_result.warnings)
+    return ocr_result.text, metadata
+
+
+def _parse_variant(location: str) -> str:
+    member = split_locator(location)
+    return Path(member[1] if member is not None else location).suffix.lower()
+
+
+async def _parse_stage(context: Dict[str, Any]) -> ParsedDocument:
+    # The persistent cache is keyed by parser version as well, so unlike the in-memory
+    # stage cache it is consulted on forced re-ingests too.
+    checksum, variant = context["checksum"], _parse_variant(context["location"])
+    parsed = await asyncio.to_thread(parse_cache.get, checksum, variant)
+    if parsed is None:
+        parsed = await _parse_document(context["location"])
+        await asyncio.to_thread(parse_cache.put, checksum, variant, parsed)
+    return parsed
+
+
+def _needs_ocr(context: Dict[str, Any]) -> bool:
+    # Only formats that may hold images of text (scanned PDFs) are worth OCRing when empty.
+    return (
+        settings.enable_ocr
+        and not context["parse"].text.strip()
+        and format_registry.needs_ocr_fallback(_parse_variant(context["location"]))
+    )
+
+
+async def _ocr_stage(context: Dict[str, Any]) -> OCRResult:
+    # Persisted next to the parse under the same checksum and parser version.
+    checksum, variant = context["checksum"], _parse_variant(context["location"])
+    result = await asyncio.to_thread(parse_cache.get_ocr, checksum, variant)
+    if result is None:
+        result = await _run_ocr(context["location"])
+        await asyncio.to_thread(parse_cache.put_ocr, checksum, variant, result)
+    return result
+
+
+def _analyse(text: str, parsed: ParsedDocument, ocr_ran: bool) -> TextAnalysis:
+    # Reuse the parser's metadata matches, but derive tokens and vectors on a fresh object
+    # so they are not retained with the parse result in the stage cache.
+    matches = parsed.analysis.matches if parsed.analysis is not None and not ocr_ran else None
+    analysis = TextAnalysis(text, matches) if matches is not None else TextAnalysis(text)
+    _ = analysis.vector  # lower-case, tokenise and vectorise once, off the event loop
+    return analysis
+
+
+async def _analyse_stage(context: Dict[str, Any]) -> TextAnalysis:
+    """The document's shared lexical analysis: lower-cased text, tokens, counts and vector."""
+
+    text, _ = _content(context)
+    return await asyncio.to_thread(_analyse, text, context["parse"], context["ocr"] is not None)
+
+
+async def _score_stage(context: Dict[str, Any]) -> ContentScores:
+    return await _score_content(context["analyse"])
+
+
+async def _classify_stage(context: Dict[str, Any]) -> DocumentClassification:
+    # Not cached: classification also folds the document into the corpus statistics, which
+    # live in this process, so it runs in a thread rather than on the stage process pool.
+    text, metadata = _content(context)
+    return await asyncio.to_thread(
+        classifier_service.classify, text, metadata, context["score"], context["analyse"]
+    )
+
+
+async def _graph_stage(context: Dict[str, Any]) -> None:
+    _, metadata = _content(context)
+    await asyncio.to_thread(graph_manager.upsert_document, context["external_id"], metadata)
+
+
+def _with_filename(metadata: Dict[str, Any], filename: Optional[str]) -> Dict[str, Any]:
+    metadata = {key: value for key, value in metadata.items() if key != "original_filename"}
+    if filename:
+        metadata["original_filename"] = filename
+    return metadata
+
+
+async def _db_stage(context: Dict[str, Any]) -> None:
+    text, metadata = _content(context)
+    classification: DocumentClassification = context["classify"]
+    await ingestion_store.add_document(
+        DocumentRecord(
+            external_id=context["external_id"],
+            source_path=context["location"],
+            source=context["source"],
+            checksum=context["checksum"],
+            mime_type=context["mime_type"],
+            text_content=text,
+            summary=text[:500],
+            document_type=classification.document_type,
+            privilege_risk=classification.privilege_risk,
+            importance_score=classification.importance_score,
+            metadata_json=_with_filename(metadata, context["filename"]),
+            # Page offsets locate pages in the parsed text, not in OCR output replacing it.
+            page_offsets=context["parse"].page_offsets if context["ocr"] is None else None,
+            ingestion_run_id=context["run_id"],
+        )
+    )
+
+
+async def _index_stage(context: Dict[str, Any]) -> None:
+    _, metadata = _content(context)
+    await asyncio.to_thread(
+        retriever_service.add_document,
+        context["external_id"],
+        context["analyse"],
+        metadata,
+        context["parse"].page_offsets if context["ocr"] is None else None,
+    )
+
+
+# The graph only needs the parsed metadata, so it is updated while the document is being
+# analysed, classified and written. The document joins the retrieval index once it is
+# stored, so a concurrent rebuild from the database cannot miss it.
+ingestion_dag = StageGraph(
+    [
+        Stage("parse", _parse_stage, cached=True),
+        Stage("ocr", _ocr_stage, after=("parse",), when=_needs_ocr, cached=True),
+        Stage("analyse", _analyse_stage, after=("parse", "ocr")),
+        Stage("score", _score_stage, after=("analyse",), cached=True),
+        Stage("classify", _classify_stage, after=("score", "analyse")),
+        Stage("graph", _graph_stage, after=("parse", "ocr")),
+        Stage("db", _db_stage, after=("classify",)),
+        Stage("index", _index_stage, after=("db", "analyse")),
+    ]
+)
+
+
+@dataclass
+class IngestionOutcome:
+    """Per-item result of a batch ingestion request."""
+
+    path: str
+    external_id: Optional[str] = None
+    error: Optional[str] = None
+    exception: Optional[BaseException] = field(default=None, repr=False, compare=False)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.external_id is not None
+
+
+def _record_dead_letter(trace_id: str, location: str, source: str, exc: BaseException) -> None:
+    now = utc_now()
+    decision = retry_policy.decide(exc, attempts=1, now=now)
+    with get_session() as session:
+        session.add(
+            DeadLetter(
+                trace_id=trace_id,
+                payload={"path": location, "source": source},
+                error_message=str(exc),
+                stacktrace="".join(traceback.format_exception(exc)),
+                error_type=type(exc).__name__,
+                status="pending" if decision.retry else "abandoned",
+                attempts=1,
+                next_retry_at=decision.next_retry_at,
+                last_attempt_at=now,
+            )
+        )
+
+
+def _find_existing(checksum: str, source_path: str) -> Optional[Document]:
+    """Return the indexed document matching ``checksum``, preferring one at ``source_path``.
+
+    Aliases are never returned for a different path; callers link new aliases to the
+    canonical (fully processed) document instead.
+    """
 
-    trace_id = uuid4().hex
     with get_session() as session:
-        run = IngestionRun(trace_id=trace_id, source=source, status="running")
-        session.add(run)
+        same_path = (
+            session.query(Document)
+            .filter(Document.checksum == checksum, Document.source_path == source_path)
+            .order_by(Document.id)
+            .first()
+        )
+        if same_path is not None:
+            return same_path
+        return (
+            session.query(Document)
+            .filter(Document.checksum == checksum, Document.duplicate_of_id.is_(None))
+            .order_by(Document.id)
+            .first()
+        )
+
+
+# Locks of the checksums being ingested in this process, with the number of ingestions using
+# each: a copy of content that is still being processed waits for it to be stored and then
+# becomes an alias, instead of being parsed and classified a second time.
+_checksum_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
 
+
+@asynccontextmanager
+async def _coalesce(checksum: str) -> AsyncIterator[None]:
+    """Serialise ingestions of the same content from the duplicate check until it is stored."""
+
+    lock, users = _checksum_locks.get(checksum, (None, 0))
+    lock = lock or asyncio.Lock()
+    _checksum_locks[checksum] = (lock, users + 1)
     try:
-        checksum, mime_type, parsed = await asyncio.gather(
-            _compute_checksum(absolute_path),
-            _detect_mime_type(absolute_path),
-            _parse_document(absolute_path),
+        async with lock:
+            yield
+    finally:
+        lock, users = _checksum_locks[checksum]
+        if users == 1:
+            del _checksum_locks[checksum]
+        else:
+            _checksum_locks[checksum] = (lock, users - 1)
+
+
+def _alias_record(
+    canonical: Document,
+    run_id: int,
+    source_path: str,
+    source: str,
+    filename: Optional[str] = None,
+) -> DocumentRecord:
+    """Build a duplicate that reuses the canonical document's parse and classification."""
+
+    return DocumentRecord(
+        external_id=f"doc-{uuid4().hex[:12]}",
+        source_path=source_path,
+        source=source,
+        checksum=canonical.checksum,
+        mime_type=canonical.mime_type,
+        text_content="",
+        summary=canonical.summary,
+        document_type=canonical.document_type,
+        privilege_risk=canonical.privilege_risk,
+        importance_score=canonical.importance_score,
+        metadata_json=_with_filename(canonical.metadata_json or {}, filename),
+        ingestion_run_id=run_id,
+        duplicate_of_id=canonical.id,
+        index_fragments=False,
+    )
+
+
+async def ingest_document_flow(
+    path: str,
+    source: str = "upload",
+    *,
+    force: bool = False,
+    checksum: Optional[str] = None,
+    job_id: Optional[str] = None,
+    dead_letter: bool = True,
+    filename: Optional[str] = None,
+) -> str:
+    """Ingest a single document and return its external identifier.
+
+    ``path`` is a filesystem path or an archive member locator (``archive.zip!/member``);
+    members are streamed out of their container and the locator is kept as provenance.
+    Files whose SHA-256 checksum is already indexed are not re-processed: re-ingesting the
+    same path returns the existing identifier and a copy at a new path becomes an alias of
+    the canonical document. Copies ingested concurrently wait for the first to be stored
+    rather than all being processed. ``force`` bypasses the check and processes the bytes
+    again. Callers that already hashed the file (e.g. streaming uploads) pass ``checksum``
+    to avoid reading it twice. ``job_id`` links the run to a background ingestion job.
+    ``filename`` is the name an upload was made under, as content-addressed storage does
+    not keep it; it is stored as ``metadata_json["original_filename"]``.
+
+    After the checksum and duplicate check, the remaining stages run on ``ingestion_dag``:
+    each starts as soon as the stages it depends on have finished, and parse, OCR and
+    scoring results are reused for identical content unless ``force`` is set. Parse results
+    are also kept in the persistent ``parse_cache``, which is consulted even when ``force``
+    is set because its entries are keyed by parser version. The text is lower-cased,
+    tokenised and vectorised once, in the ``analyse`` stage, for the scoring, classification
+    and index stages. Wall-clock time per stage (checksum, parse, ocr, analyse, score,
+    classify, db, graph, index) is stored in ``IngestionRun.stage_timings`` for completed
+    and failed runs alike; stages that run concurrently overlap, so the timings may add up
+    to more than the run. Failures are
+    recorded as a ``DeadLetter`` unless ``dead_letter`` is false, which the dead-letter
+    retrier uses to update the existing record instead.
+    """
+
+    location = _resolve_location(path)
+    trace_id = uuid4().hex
+    try:
+        _validate_location(location)
+    except (FileNotFoundError, ValueError) as exc:
+        if dead_letter:
+            await asyncio.to_thread(_record_dead_letter, trace_id, location, source, exc)
+        raise
+
+    run_id = await ingestion_store.start_run(trace_id, source, job_id=job_id)
+    timer = StageTimer()
+    mime_type: Optional[str] = None
+
+    async def _finish(status: str, error_message: Optional[str] = None) -> None:
+        await ingestion_store.finish_run(
+            trace_id,
+            status,
+            error_message,
+            mime_type=mime_type,
+            stage_timings=timer.timings,
         )
-        text = parsed.text
-        metadata = dict(parsed.metadata)
-        ocr_warnings: List[str] = []
-        if settings.enable_ocr and not text.strip():
-            ocr_result = await _run_ocr(absolute_path)
-            text = ocr_result.text
-            ocr_warnings = ocr_result.warnings
-            if ocr_warnings:
-                metadata.setdefault("ocr_warnings", ocr_warnings)
-        classification = classifier_service.classify(text, metadata)
-        external_id = f"doc-{uuid4().hex[:12]}"
-        with get_session() as session:
-            run = session.query(IngestionRun).filter_by(trace_id=trace_id).one()
-            document = Document(
-                external_id=external_id,
-                source_path=str(absolute_path),
-                source=source,
-                checksum=checksum,
-                mime_type=mime_type,
-                text_content=text,
-                summary=text[:500],
-                document_type=classification.document_type,
-                privilege_risk=classification.privilege_risk,
-                importance_score=classification.importance_score,
-                metadata_json=metadata,
-                ingestion_run=run,
-            )
-            session.add(document)
-            session.flush()
-            for fragment_type, values in metadata.items():
-                if not isinstance(values, list):
-                    continue
-                for value in values:
-                    session.add(
-                        MetadataFragment(
-                            document=document,
-                            fragment_type=fragment_type,
-                            fragment_value=value,
-                            confidence=1.0,
-                        )
-                    )
-        graph_manager.upsert_document(external_id, metadata)
-        retriever_service.update_with_document()
-        with get_session() as session:
-            run = session.query(IngestionRun).filter_by(trace_id=trace_id).one()
-            run.status = "completed"
-            run.completed_at = utc_now()
-            run.duration_seconds = (run.completed_at - run.started_at).total_seconds()
-            run.error_message = None
+
+    try:
+        with timer.stage("checksum"):
+            if checksum is None:
+                checksum = await _compute_checksum(location)
+            mime_type = await _detect_mime_type(location)
+        async with _coalesce(checksum):
+            if not force:
+                existing = await asyncio.to_thread(_find_existing, checksum, location)
+                if existing is not None:
+                    if existing.source_path == location:
+                        external_id = existing.external_id
+                    else:
+                        alias = _alias_record(existing, run_id, location, source, filename)
+                        with timer.stage("db"):
+                            await ingestion_store.add_document(alias)
+                        external_id = alias.external_id
+                    await _finish("deduplicated")
+                    return external_id
+            context: Dict[str, Any] = {
+                "location": location,
+                "source": source,
+                "checksum": checksum,
+                "mime_type": mime_type,
+                "run_id": run_id,
+                "filename": filename,
+                "external_id": f"doc-{uuid4().hex[:12]}",
+            }
+            try:
+                await ingestion_dag.run(
+                    context, timer=timer, cache_key=f"{checksum}:{mime_type}", refresh=force
+                )
+            except BaseException:
+                if "graph" in context and "db" not in context:
+                    # Do not leave a graph node behind for a document that was never stored.
+                    await asyncio.to_thread(graph_manager.remove_document, context["external_id"])
+                raise
+        external_id = context["external_id"]
+        await _finish("completed")
         return external_id
     except Exception as exc:  # pragma: no cover - guarded by tests
-        tb = traceback.format_exc()
-        with get_session() as session:
-            run = session.query(IngestionRun).filter_by(trace_id=trace_id).one()
-            run.status = "failed"
-            run.completed_at = utc_now()
-            run.error_message = str(exc)
-            session.add(
-                DeadLetter(
-                    trace_id=trace_id,
-                    payload={"path": str(absolute_path), "source": source},
-                    error_message=str(exc),
-                    stacktrace=tb,
-                )
-            )
+        await _finish("failed", error_message=str(exc))
+        if dead_letter:
+            await asyncio.to_thread(_record_dead_letter, trace_id, location, source, exc)
         raise
 
 
-async def ingest_paths(paths: List[Path], source: str = "upload") -> List[str]:
-    """Convenience helper to run ingestion sequentially for tests and batch jobs."""
+def remove_documents(external_ids: Sequence[str]) -> List[str]:
+    """Delete documents from the database, graph and retrieval index.
+
+    When a removed document is the canonical copy for aliases, the oldest alias is promoted
+    to canonical: it inherits the text and metadata fragments and the other aliases are
+    re-pointed to it. Returns the identifiers that were actually removed.
+    """
+
+    removed: List[str] = []
+    promoted: List[Document] = []
+    with get_session() as session:
+        documents = session.query(Document).filter(Document.external_id.in_(external_ids)).all()
+        for document in documents:
+            aliases = (
+                session.query(Document)
+                .filter(Document.duplicate_of_id == document.id)
+                .order_by(Document.id)
+                .all()
+            )
+            if aliases:
+                heir, others = aliases[0], aliases[1:]
+                heir.duplicate_of_id = None
+                heir.text_content = document.text_content
+                heir.page_offsets = document.page_offsets
+                for fragment in list(document.fragments):
+                    fragment.document = heir
+                for alias in others:
+                    alias.duplicate_of_id = heir.id
+                session.flush()
+                promoted.append(heir)
+            removed.append(document.external_id)
+            session.delete(document)
+    for external_id in removed:
+        graph_manager.remove_document(external_id)
+    for heir in promoted:
+        graph_manager.upsert_document(heir.external_id, heir.metadata_json or {})
+    if removed:
+        retriever_service.update_with_document()
+    return removed
+
+
+async def ingest_many(
+    paths: Sequence[Path | str],
+    source: str = "upload",
+    *,
+    concurrency: Optional[int] = None,
+    force: bool = False,
+    job_id: Optional[str] = None,
+    on_outcome: Optional[Callable[[int, IngestionOutcome], None]] = None,
+    stop: Optional[asyncio.Event] = None,
+    dead_letter: bool = True,
+    priority: Optional[int] = None,
+    filenames: Optional[Sequence[Optional[str]]] = None,
+) -> List[IngestionOutcome]:
+    """Ingest documents through the priority scheduler, reporting one outcome per input path.
+
+    Every path is queued on ``ingestion_scheduler``, which orders work by ``priority``
+    (default: the rank of ``source``) and then by size, and runs it on the light or heavy
+    lane. At most ``concurrency`` (default: ``settings.ingestion_batch_in_flight``) of this
+    batch's documents are queued or running at once, so a large folder does not queue
+    everything up front. Outcomes preserve the order of ``paths``; a failing item, including
+    one that could not be queued, is recorded as a ``DeadLetter`` (unless ``dead_letter`` is
+    false) and does not abort the rest of the batch. ``on_outcome`` is called with the input
+    index and outcome as each item finishes. Once ``stop`` is set no new items are started;
+    in-flight items complete and the untouched paths are omitted from the result.
+    ``filenames`` optionally gives the upload name of each path.
+    """
+
+    outcomes: List[Optional[IngestionOutcome]] = [None] * len(paths)
+    pending = iter(enumerate(paths))
+
+    async def _ingest(index: int, path: Path | str) -> Optional[IngestionOutcome]:
+        try:
+            future = await ingestion_scheduler.submit(
+                str(path),
+                source=source,
+                priority=priority,
+                stop=stop,
+                force=force,
+                job_id=job_id,
+                dead_letter=dead_letter,
+                filename=filenames[index] if filenames else None,
+            )
+        except Exception as exc:
+            # The flow records its own failures; this item never reached it.
+            if dead_letter:
+                await asyncio.to_thread(_record_dead_letter, uuid4().hex, str(path), source, exc)
+            return IngestionOutcome(path=str(path), error=str(exc), exception=exc)
+        await asyncio.wait([future])
+        if future.cancelled():
+            return None
+        exc = future.exception()
+        if exc is not None:
+            return IngestionOutcome(path=str(path), error=str(exc), exception=exc)
+        return IngestionOutcome(path=str(path), external_id=future.result())
+
+    async def _worker() -> None:
+        for index, path in pending:
+            if stop is not None and stop.is_set():
+                return
+            outcome = await _ingest(index, path)
+            if outcome is None:
+                continue
+            outcomes[index] = outcome
+            if on_outcome is not None:
+                on_outcome(index, outcome)
+
+    workers = max(concurrency or settings.ingestion_batch_in_flight, 1)
+    await asyncio.gather(*(_worker() for _ in range(min(workers, len(paths)))))
+    return [outcome for outcome in outcomes if outcome is not None]
+
+
+async def ingest_paths(
+    paths: Sequence[Path | str],
+    source: str = "upload",
+    *,
+    concurrency: Optional[int] = None,
+    force: bool = False,
+) -> List[str]:
+    """Ingest ``paths`` concurrently and return their external identifiers in input order.
+
+    Every document is attempted; if any failed, the first failure is re-raised once the
+    batch has finished.
+    """
+
+    outcomes = await ingest_many(paths, source=source, concurrency=concurrency, force=force)
+    for outcome in outcomes:
+        if outcome.exception is not None:
+            raise outcome.exception
+    return [outcome.external_id for outcome in outcomes if outcome.external_id is not None]
+
 
-    results: List[str] = []
-    for path in paths:
-        external_id = await ingest_document_flow(path=str(path), source=source)
-        results.append(external_id)
-    return results
+ingestion_scheduler = IngestionScheduler(ingest_document_flow)
 
 
-__all__ = ["ingest_document_flow", "ingest_paths"]
+__all__ = [
+    "IngestionOutcome",
+    "ingest_document_flow",
+    "ingest_many",
+    "ingest_paths",
+    "ingestion_dag",
+    "ingestion_scheduler",
+    "remove_documents",
+]
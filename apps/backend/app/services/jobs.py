@@ -0,0 +1,499 @@
+"""Background ingestion jobs with checkpointed progress and cooperative cancellation."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from sqlalchemy import ColumnElement, Row, insert, or_, select, update
+
+from ..config import settings
+from ..database import Document, IngestionJob, IngestionJobItem, get_session, utc_now
+from ..schemas import IngestionJobRead
+from .admission import Reservation
+from .ingestion import IngestionOutcome, ingest_many
+from .work_queue import work_queue
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class IngestionJobManager:
+    """Run batch ingestion requests in the background of the API process.
+
+    Jobs are persisted in ``ingestion_jobs`` with one ``ingestion_job_items`` manifest row per
+    path. Finished items are checkpointed in batches, so a job interrupted by a crash or
+    restart resumes with only the items that were still pending. When
+    ``settings.ingestion_queue_mode`` is ``"queue"`` the manifest is handed to the durable
+    work queue instead and worker processes (``python -m app.worker``) run the job.
+
+    Several API processes may share the database. A process runs a job under a lease that it
+    renews every ``settings.job_heartbeat_seconds``; jobs left queued or running are resumed
+    only once their lease has expired, by whichever process claims them first.
+    """
+
+    def __init__(self, owner: Optional[str] = None) -> None:
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self._tasks: Dict[str, asyncio.Task[None]] = {}
+        self._stops: Dict[str, asyncio.Event] = {}
+        self._reservations: Dict[str, Reservation] = {}
+        self._sweeper: Optional[asyncio.Task[None]] = None
+
+    async def submit(
+        self,
+        paths: Sequence[Path | str],
+        source: str,
+        *,
+        force: bool = False,
+        priority: Optional[int] = None,
+        reservation: Optional[Reservation] = None,
+        filenames: Optional[Mapping[str, str]] = None,
+    ) -> str:
+        """Persist a new job and start it on the running event loop; return its id.
+
+        ``priority`` overrides the scheduling rank of ``source`` for the job's documents.
+        ``reservation`` is the admission capacity held for the job; it is settled per
+        document as items finish and released in full when the job stops. In queue mode it
+        is released once the items are enqueued, as the backlog is then measured from the
+        work queue. ``filenames`` maps stored paths to the names they were uploaded under.
+        """
+
+        job_id = f"job-{uuid4().hex[:12]}"
+        queued = _queued()
+        await asyncio.to_thread(
+            self._persist, job_id, paths, source, force, priority, filenames or {}, queued
+        )
+        if queued:
+            if reservation is not None:
+                reservation.release()
+            return job_id
+        if reservation is not None:
+            self._reservations[job_id] = reservation
+        self._start(job_id)
+        return job_id
+
+    def _persist(
+        self,
+        job_id: str,
+        paths: Sequence[Path | str],
+        source: str,
+        force: bool,
+        priority: Optional[int],
+        filenames: Mapping[str, str],
+        queued: bool,
+    ) -> None:
+        """Insert the job, its manifest and, in queue mode, its work items in one transaction."""
+
+        now = utc_now()
+        with get_session() as session:
+            session.add(
+                IngestionJob(
+                    job_id=job_id,
+                    source=source,
+                    status="queued" if paths or not queued else "completed",
+                    force=force,
+                    priority=priority,
+                    total=len(paths),
+                    completed_at=None if paths or not queued else now,
+                    **({} if queued else self._lease(now)),
+                )
+            )
+            session.flush()
+            if paths:
+                session.execute(
+                    insert(IngestionJobItem),
+                    [
+                        {
+                            "job_id": job_id,
+                            "position": position,
+                            "path": str(path),
+                            "original_filename": filenames.get(str(path)),
+                        }
+                        for position, path in enumerate(paths)
+                    ],
+                )
+            if queued:
+                work_queue.enqueue_job(
+                    session, job_id, source=source, force=force, priority=priority
+                )
+
+    def get(self, job_id: str) -> Optional[IngestionJobRead]:
+        with get_session() as session:
+            job = session.query(IngestionJob).filter_by(job_id=job_id).one_or_none()
+            return _to_read(job) if job else None
+
+    def list_jobs(self, limit: int = 50) -> List[IngestionJobRead]:
+        with get_session() as session:
+            jobs = (
+                session.query(IngestionJob)
+                .order_by(IngestionJob.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+            return [_to_read(job) for job in jobs]
+
+    def cancel(self, job_id: str) -> Optional[IngestionJobRead]:
+        """Request cancellation; in-flight documents finish, no new ones are started."""
+
+        with get_session() as session:
+            job = session.query(IngestionJob).filter_by(job_id=job_id).one_or_none()
+            if job is None:
+                return None
+            if job.status in ACTIVE_STATUSES:
+                job.cancel_requested = True
+                # Queued jobs are closed by the work queue once in-flight items finish, and
+                # jobs another process holds a lease on by that process.
+                leased = job.lease_owner is not None and job.lease_expires_at > utc_now()
+                if job_id not in self._tasks and not _queued() and not leased:
+                    job.status = "cancelled"
+                    job.completed_at = utc_now()
+        stop = self._stops.get(job_id)
+        if stop is not None:
+            stop.set()
+        if _queued():
+            work_queue.cancel_job(job_id)
+        return self.get(job_id)
+
+    async def wait(self, job_id: str) -> Optional[IngestionJobRead]:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self.get(job_id)
+
+    def start(self) -> None:
+        """Resume orphaned jobs now and every ``settings.job_lease_seconds`` afterwards.
+
+        The periodic sweep takes over the jobs of a process that stopped renewing its leases.
+        """
+
+        self.resume_incomplete()
+        if self._sweeper is None and not _queued():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    def resume_incomplete(self) -> List[str]:
+        """Restart jobs left queued or running whose lease has expired; return their ids.
+
+        Nothing is restarted in queue mode: the work queue itself is durable.
+        """
+
+        if _queued():
+            return []
+        job_ids = self._claim_orphans()
+        for job_id in job_ids:
+            logger.info("Resuming ingestion job %s", job_id)
+            self._start(job_id)
+        return job_ids
+
+    async def shutdown(self) -> None:
+        """Stop scheduling new documents and wait for in-flight ones to finish."""
+
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for stop in self._stops.values():
+            stop.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _lease(self, now: datetime) -> Dict[str, object]:
+        expires = now + timedelta(seconds=settings.job_lease_seconds)
+        return {"lease_owner": self.owner, "lease_expires_at": expires, "heartbeat_at": now}
+
+    def _claim_orphans(self) -> List[str]:
+        """Lease the active jobs no live process holds, with a compare-and-set per job."""
+
+        now = utc_now()
+        claimed: List[str] = []
+        with get_session() as session:
+            candidates = session.scalars(
+                select(IngestionJob.job_id)
+                .where(IngestionJob.status.in_(ACTIVE_STATUSES), _lease_free(now))
+                .order_by(IngestionJob.id)
+            ).all()
+            for job_id in candidates:
+                if job_id in self._tasks:
+                    continue
+                result = session.execute(
+                    update(IngestionJob)
+                    .where(
+                        IngestionJob.job_id == job_id,
+                        IngestionJob.status.in_(ACTIVE_STATUSES),
+                        _lease_free(now),
+                    )
+                    .values(**self._lease(now))
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    claimed.append(job_id)
+        return claimed
+
+    def _renew(self, job_id: str) -> bool:
+        """Extend the lease on ``job_id``; false if another process has taken the job over."""
+
+        with get_session() as session:
+            result = session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.job_id == job_id, IngestionJob.lease_owner == self.owner)
+                .values(**self._lease(utc_now()))
+                .execution_options(synchronize_session=False)
+            )
+            return bool(result.rowcount)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(settings.job_lease_seconds)
+            try:
+                job_ids = await asyncio.to_thread(self._claim_orphans)
+            except Exception:  # pragma: no cover - keep the sweep alive
+                logger.exception("Could not claim orphaned ingestion jobs")
+                continue
+            for job_id in job_ids:
+                logger.info("Taking over ingestion job %s", job_id)
+                self._start(job_id)
+
+    def _start(self, job_id: str) -> None:
+        stop = asyncio.Event()
+        task = asyncio.get_running_loop().create_task(self._run(job_id, stop))
+        self._tasks[job_id] = task
+        self._stops[job_id] = stop
+        task.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str) -> None:
+        self._tasks.pop(job_id, None)
+        self._stops.pop(job_id, None)
+        reservation = self._reservations.pop(job_id, None)
+        if reservation is not None:
+            reservation.release()
+
+    async def _run(self, job_id: str, stop: asyncio.Event) -> None:
+        cancel_requested, source, force, priority, pending = await asyncio.to_thread(_begin, job_id)
+        if cancel_requested:
+            stop.set()
+        item_ids = [row.id for row in pending]
+        paths = [row.path for row in pending]
+        filenames = [row.original_filename for row in pending]
+        progress = _Checkpointer(job_id, self.owner)
+        reservation = self._reservations.get(job_id)
+
+        def _on_outcome(index: int, outcome: IngestionOutcome) -> None:
+            progress.record(item_ids[index], outcome)
+            if reservation is not None:
+                reservation.settle(paths[index])
+
+        watcher = asyncio.get_running_loop().create_task(self._watch(job_id, stop))
+        try:
+            await ingest_many(
+                paths,
+                source=source,
+                force=force,
+                job_id=job_id,
+                priority=priority,
+                on_outcome=_on_outcome,
+                stop=stop,
+                filenames=filenames,
+            )
+        except Exception as exc:  # pragma: no cover - ingest_many isolates per-item failures
+            logger.exception("Ingestion job %s failed", job_id)
+            await progress.finish("failed", error_message=str(exc))
+            return
+        finally:
+            watcher.cancel()
+        if stop.is_set():
+            cancelled = await asyncio.to_thread(_cancel_requested, job_id)
+            await progress.finish("cancelled" if cancelled else "queued")
+        else:
+            await progress.finish("completed")
+
+    async def _watch(self, job_id: str, stop: asyncio.Event) -> None:
+        """Renew the job's lease, and set ``stop`` once the job is cancelled or the lease lost.
+
+        Cancellation is read from the database, so a cancel made through another API replica
+        is noticed too.
+        """
+
+        renewed = time.monotonic()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), settings.job_progress_interval_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() - renewed >= settings.job_heartbeat_seconds:
+                if not await asyncio.to_thread(self._renew, job_id):
+                    logger.warning("Lease on ingestion job %s was lost", job_id)
+                    stop.set()
+                    return
+                renewed = time.monotonic()
+            if await asyncio.to_thread(_cancel_requested, job_id):
+                stop.set()
+
+
+class _Checkpointer:
+    """Buffer finished manifest items and commit them with the job counters in batches.
+
+    Commits run on a worker thread, one at a time and in order, so the event loop never
+    waits on the database; items finishing meanwhile go into the next batch.
+    """
+
+    def __init__(self, job_id: str, owner: str) -> None:
+        self.job_id = job_id
+        self.owner = owner
+        self._finished: List[Tuple[int, IngestionOutcome]] = []
+        self._last_flush = time.monotonic()
+        self._flushing: Optional[asyncio.Task[None]] = None
+
+    def record(self, item_id: int, outcome: IngestionOutcome) -> None:
+        self._finished.append((item_id, outcome))
+        if self._flushing is not None and not self._flushing.done():
+            return
+        due = time.monotonic() - self._last_flush >= settings.job_progress_interval_seconds
+        if due or len(self._finished) >= settings.job_checkpoint_batch_size:
+            self._flushing = asyncio.get_running_loop().create_task(self._checkpoint())
+
+    async def finish(self, status: str, error_message: Optional[str] = None) -> None:
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        finished, self._finished = self._finished, []
+        await asyncio.to_thread(self._flush, finished, status, error_message)
+
+    async def _checkpoint(self) -> None:
+        finished, self._finished = self._finished, []
+        try:
+            await asyncio.to_thread(self._flush, finished)
+        except Exception:  # pragma: no cover - the items are committed at the next checkpoint
+            logger.exception("Could not checkpoint ingestion job %s", self.job_id)
+            self._finished[:0] = finished
+
+    def _flush(
+        self,
+        finished: List[Tuple[int, IngestionOutcome]],
+        status: Optional[str] = None,
+        error_message: Optional[str] = None,
+    ) -> None:
+        with get_session() as session:
+            external_ids = [outcome.external_id for _, outcome in finished if outcome.succeeded]
+            checksums = dict(
+                session.execute(
+                    select(Document.external_id, Document.checksum).where(
+                        Document.external_id.in_(external_ids)
+                    )
+                ).all()
+            )
+            if finished:
+                session.execute(
+                    update(IngestionJobItem),
+                    [
+                        {
+                            "id": item_id,
+                            "status": "done" if outcome.succeeded else "failed",
+                            "external_id": outcome.external_id,
+                            "checksum": checksums.get(outcome.external_id or ""),
+                            "error_message": outcome.error,
+                            "updated_at": utc_now(),
+                        }
+                        for item_id, outcome in finished
+                    ],
+                )
+            succeeded = sum(1 for _, outcome in finished if outcome.succeeded)
+            session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.job_id == self.job_id)
+                .values(
+                    processed=IngestionJob.processed + succeeded,
+                    failed=IngestionJob.failed + len(finished) - succeeded,
+                )
+            )
+            if status is not None:
+                values = {
+                    "status": status,
+                    "error_message": error_message,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                }
+                if status != "queued":
+                    values["completed_at"] = utc_now()
+                # A job already closed as cancelled (by ``cancel`` while no process was
+                # running it), or taken over by another process, is left alone.
+                session.execute(
+                    update(IngestionJob)
+                    .where(
+                        IngestionJob.job_id == self.job_id,
+                        IngestionJob.status != "cancelled",
+                        IngestionJob.lease_owner == self.owner,
+                    )
+                    .values(**values)
+                )
+        self._last_flush = time.monotonic()
+
+
+def _begin(job_id: str) -> Tuple[bool, str, bool, Optional[int], Sequence[Row]]:
+    """Mark the job running; return whether it was cancelled, its options and pending items."""
+
+    with get_session() as session:
+        job = session.query(IngestionJob).filter_by(job_id=job_id).one()
+        job.status = "running"
+        job.started_at = job.started_at or utc_now()
+        pending = session.execute(
+            select(IngestionJobItem.id, IngestionJobItem.path, IngestionJobItem.original_filename)
+            .where(IngestionJobItem.job_id == job_id, IngestionJobItem.status == "pending")
+            .order_by(IngestionJobItem.position)
+        ).all()
+        return job.cancel_requested, job.source, job.force, job.priority, pending
+
+
+def _lease_free(now: datetime) -> ColumnElement[bool]:
+    return or_(IngestionJob.lease_owner.is_(None), IngestionJob.lease_expires_at < now)
+
+
+def _queued() -> bool:
+    return settings.ingestion_queue_mode == "queue"
+
+
+def _cancel_requested(job_id: str) -> bool:
+    with get_session() as session:
+        job = session.query(IngestionJob).filter_by(job_id=job_id).one()
+        return job.cancel_requested
+
+
+def _to_read(job: IngestionJob) -> IngestionJobRead:
+    remaining = max(job.total - job.processed - job.failed, 0)
+    throughput: Optional[float] = None
+    eta: Optional[float] = None
+    if job.started_at is not None:
+        finished_at = job.completed_at or utc_now()
+        elapsed = (finished_at - job.started_at).total_seconds()
+        done = job.processed + job.failed
+        if elapsed > 0 and done:
+            throughput = done / elapsed
+            if job.status in ACTIVE_STATUSES:
+                eta = remaining / throughput
+    return IngestionJobRead(
+        job_id=job.job_id,
+        source=job.source,
+        status=job.status,
+        total=job.total,
+        processed=job.processed,
+        failed=job.failed,
+        remaining=remaining,
+        throughput_per_second=throughput,
+        eta_seconds=eta,
+        cancel_requested=job.cancel_requested,
+        error_message=job.error_message,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+    )
+
+
+job_manager = IngestionJobManager()
+
+
+__all__ = ["IngestionJobManager", "job_manager"]
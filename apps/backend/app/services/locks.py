@@ -0,0 +1,54 @@
+"""Advisory file locks serialising writers of shared on-disk state across processes."""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: only threads in one process are serialised
+    fcntl = None  # type: ignore[assignment]
+
+
+class _ProcessLock:
+    def __init__(self) -> None:
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+
+
+_locks: Dict[str, _ProcessLock] = {}
+_registry_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` (created if missing) for the duration of the block.
+
+    The lock excludes other threads of this process as well as other processes, e.g. ingestion
+    workers sharing the graph log and retrieval artefacts with the API. It is re-entrant
+    within a thread.
+    """
+
+    with _registry_lock:
+        lock = _locks.setdefault(str(path), _ProcessLock())
+    with lock.thread_lock:
+        lock.depth += 1
+        try:
+            if fcntl is None or lock.depth > 1:
+                yield
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a+b") as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            lock.depth -= 1
+
+
+__all__ = ["file_lock"]
@@ -0,0 +1,89 @@
+"""Prometheus exposition of ingestion backlog and admission metrics.
+
+Values are read from the admission controller and the scheduler at scrape time, so the
+registry holds no state of its own and nothing has to be updated on the hot path.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+
+class IngestionCollector(Collector):
+    """Collect queue depth, in-flight bytes, lane occupancy and admission decisions."""
+
+    def collect(self) -> Iterator[Metric]:
+        # Resolved per scrape so reloaded service modules are picked up.
+        from . import admission, ingestion, work_queue
+
+        state = admission.admission_controller.snapshot()
+        yield GaugeMetricFamily(
+            "discovery_ingest_queue_depth",
+            "Admitted ingestion documents that have not finished yet.",
+            value=state["queue_depth"],
+        )
+        yield GaugeMetricFamily(
+            "discovery_ingest_inflight_bytes",
+            "Input bytes of admitted ingestion documents that have not finished yet.",
+            value=state["inflight_bytes"],
+        )
+        by_source = GaugeMetricFamily(
+            "discovery_ingest_source_queue_depth",
+            "Unfinished admitted documents per ingestion source.",
+            labels=["source"],
+        )
+        for source, count in sorted(state["by_source"].items()):
+            by_source.add_metric([source], count)
+        yield by_source
+
+        lanes = ingestion.ingestion_scheduler.snapshot()
+        for name, help_text in [
+            ("queued", "Documents waiting for a scheduler worker, per lane."),
+            ("running", "Documents being ingested by scheduler workers, per lane."),
+            ("workers", "Configured scheduler workers, per lane."),
+        ]:
+            family = GaugeMetricFamily(f"discovery_ingest_lane_{name}", help_text, labels=["lane"])
+            for lane, counts in lanes.items():
+                family.add_metric([lane], counts[name])
+            yield family
+
+        items = GaugeMetricFamily(
+            "discovery_ingest_work_items",
+            "Rows of the durable ingestion work queue by status.",
+            labels=["status"],
+        )
+        for status, count in sorted(work_queue.work_queue.stats().items()):
+            items.add_metric([status], count)
+        yield items
+
+        admitted = CounterMetricFamily(
+            "discovery_ingest_admitted_documents",
+            "Documents accepted by ingestion admission control.",
+            labels=["source"],
+        )
+        for source, count in sorted(state["admitted"].items()):
+            admitted.add_metric([source], count)
+        yield admitted
+        rejected = CounterMetricFamily(
+            "discovery_ingest_admission_rejections",
+            "Ingestion requests rejected with 429 by admission control.",
+            labels=["source", "reason"],
+        )
+        for entry in state["rejected"]:
+            rejected.add_metric([entry["source"], entry["reason"]], entry["count"])
+        yield rejected
+
+
+registry = CollectorRegistry(auto_describe=False)
+registry.register(IngestionCollector())
+
+
+def render_metrics() -> bytes:
+    return generate_latest(registry)
+
+
+__all__ = ["CONTENT_TYPE_LATEST", "IngestionCollector", "registry", "render_metrics"]
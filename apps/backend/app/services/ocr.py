@@ -1,17 +1,32 @@
-"""OCR microservice integration using Tesseract via pytesseract."""
+"""OCR microservice integration using Tesseract via pytesseract.
+
+Pages of multi-page PDFs are OCRed in parallel: they are rendered one at a time and sent to
+the long-lived workers of the stage process pool, with at most ``ocr_max_pending_pages``
+rendered images queued, and their results are gathered in page order. When the optional
+``tesserocr`` binding is installed, each worker keeps one Tesseract instance loaded instead
+of starting a ``tesseract`` process per page.
+"""
 
 from __future__ import annotations
 
+import io
 import logging
 import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 from PIL import Image
 from pypdfium2 import PdfDocument
 
+from ..config import settings
+from .pdf_text import PDFIUM_LOCK
+
 try:
     import pytesseract
 except ImportError as exc:  # pragma: no cover - import guard
@@ -19,9 +34,22 @@ except ImportError as exc:  # pragma: no cover - import guard
         "pytesseract must be installed to use the OCR engine. Ensure dependencies from pyproject are installed."
     ) from exc
 
+try:  # pragma: no cover - optional native binding
+    import tesserocr
+except ImportError:  # pragma: no cover - pytesseract runs the tesseract executable instead
+    tesserocr = None
+
 logger = logging.getLogger(__name__)
 
 
+class TesseractUnavailable(RuntimeError):
+    """Raised when the Tesseract executable cannot be found.
+
+    Replaces pytesseract's ``TesseractNotFoundError``, which cannot be unpickled and would
+    break the process pool it was raised in.
+    """
+
+
 @dataclass
 class OCRResult:
     """Structured OCR output including quality metrics."""
@@ -29,22 +57,44 @@ class OCRResult:
     text: str
     mean_confidence: float
     warnings: List[str]
+    # False when pages were skipped, e.g. after timing out; such results are not persisted.
+    complete: bool = True
 
 
 class OCREngine:
     """OCR engine backed by the Tesseract command line tool."""
 
     def __init__(self) -> None:
-        if shutil.which("tesseract") is None:  # pragma: no cover - environment check
+        if tesserocr is None and shutil.which("tesseract") is None:  # pragma: no cover
             logger.warning("Tesseract executable not found in PATH; OCR requests will fail until installed.")
-        self.ocr_lang = "eng"
+        self.ocr_lang = settings.ocr_language
+        self._local = threading.local()
+
+    def _recognise(self, image: Image.Image) -> Tuple[List[str], List[float]]:
+        """Return the recognised words of ``image`` and their confidences."""
+
+        if tesserocr is not None:  # pragma: no cover - optional native binding
+            # A Tesseract instance is not thread-safe; keep one per thread of this process.
+            api = getattr(self._local, "api", None)
+            if api is None:
+                api = self._local.api = tesserocr.PyTessBaseAPI(lang=self.ocr_lang)
+            api.SetImage(image)
+            return api.GetUTF8Text().split(), [float(conf) for conf in api.AllWordConfidences()]
+        try:
+            data = pytesseract.image_to_data(
+                image, lang=self.ocr_lang, output_type=pytesseract.Output.DICT
+            )
+        except pytesseract.TesseractNotFoundError as exc:
+            raise TesseractUnavailable(str(exc)) from None
+        words = [word for word in data["text"] if word.strip()]
+        return words, [float(conf) for conf in data["conf"] if str(conf) not in {"-1", "-1.0"}]
 
     def _run_ocr(self, image: Image.Image) -> OCRResult:
         """Execute OCR on a PIL image and compute quality metrics."""
 
-        data = pytesseract.image_to_data(image, lang=self.ocr_lang, output_type=pytesseract.Output.DICT)
-        text = " ".join([word for word in data["text"] if word.strip()])
-        confidences = np.array([float(conf) for conf in data["conf"] if conf not in {"-1", "-1.0"}], dtype=float)
+        words, page_confidences = self._recognise(image)
+        text = " ".join(words)
+        confidences = np.array(page_confidences, dtype=float)
         mean_confidence = float(confidences.mean()) if confidences.size else 0.0
         warnings: List[str] = []
         if mean_confidence < 65:
@@ -53,35 +103,106 @@ class OCREngine:
             warnings.append("OCR output is sparse; input might require better scanning resolution.")
         return OCRResult(text=text.strip(), mean_confidence=mean_confidence, warnings=warnings)
 
-    def _pdf_pages(self, path: Path) -> Iterable[Image.Image]:
-        """Render PDF pages to PIL images for OCR."""
+    def _pdf_pages(self, source: Path | bytes) -> Iterable[Image.Image]:
+        """Render PDF pages to greyscale PIL images for OCR, one page at a time."""
 
-        document = PdfDocument(path)
+        with PDFIUM_LOCK:
+            document = PdfDocument(str(source) if isinstance(source, Path) else source)
         try:
-            for page in document:
-                pil_image = page.render(scale=2).to_pil()
+            for index in range(len(document)):
+                with PDFIUM_LOCK:
+                    page = document[index]
+                    try:
+                        # Tesseract binarises greyscale anyway; colour would triple the bytes
+                        # held in memory and sent to workers.
+                        pil_image = page.render(
+                            scale=settings.ocr_render_scale, grayscale=True
+                        ).to_pil()
+                    finally:
+                        page.close()
                 yield pil_image
         finally:
-            document.close()
+            with PDFIUM_LOCK:
+                document.close()
+
+    def _ocr_pages(self, images: Iterator[Image.Image]) -> Iterator[OCRResult]:
+        """OCR ``images`` on the stage process pool, yielding results in order.
+
+        Rendering stays at most ``ocr_max_pending_pages`` images ahead of the results being
+        collected, so memory does not grow with the page count.
+        """
+
+        from .executors import in_pool_worker, stage_executor
+
+        # A pool worker OCRing a document must not submit work to a pool of its own.
+        if not settings.ocr_parallel_pages or in_pool_worker():
+            for image in images:
+                yield self._run_ocr(image)
+            return
+        pool = stage_executor.process_pool()
+        window = settings.ocr_max_pending_pages or stage_executor.max_workers * 2
+        timeout = stage_executor.task_timeout()
+        pending: Deque[Future] = deque()
+        collected = 0
+
+        def result() -> OCRResult:
+            nonlocal collected
+            future = pending.popleft()
+            collected += 1
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning("OCR of page %d timed out after %ss", collected, timeout)
+                return OCRResult(
+                    text="",
+                    mean_confidence=0.0,
+                    warnings=[f"Page {collected} skipped: OCR timed out after {timeout}s."],
+                    complete=False,
+                )
 
-    def extract_text(self, path: Path) -> OCRResult:
-        """Extract text from the provided document via OCR."""
+        try:
+            for image in images:
+                pending.append(pool.submit(ocr_image, image))
+                del image  # the pool holds the only reference until the page is sent
+                if len(pending) >= window:
+                    yield result()
+            while pending:
+                yield result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def extract_text(self, path: Path, content: Optional[bytes] = None) -> OCRResult:
+        """Extract text from the provided document via OCR.
+
+        ``content`` supplies the document bytes when ``path`` only names the document, as
+        for archive members that are not extracted to disk.
+        """
 
         suffix = path.suffix.lower()
         if suffix in {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}:
-            image = Image.open(path)
+            image = Image.open(path if content is None else io.BytesIO(content))
             return self._run_ocr(image)
         if suffix == ".pdf":
-            results: List[OCRResult] = []
-            for page_image in self._pdf_pages(path):
-                results.append(self._run_ocr(page_image))
+            pages = iter(self._pdf_pages(path if content is None else content))
+            results: List[OCRResult] = list(self._ocr_pages(pages))
             if not results:
                 return OCRResult(text="", mean_confidence=0.0, warnings=["PDF rendered zero pages for OCR."])
             text = "\n".join(result.text for result in results)
             mean_conf = float(np.mean([result.mean_confidence for result in results]))
             warnings = [msg for result in results for msg in result.warnings]
-            return OCRResult(text=text, mean_confidence=mean_conf, warnings=warnings)
+            complete = all(result.complete for result in results)
+            return OCRResult(
+                text=text, mean_confidence=mean_conf, warnings=warnings, complete=complete
+            )
         raise ValueError(f"Unsupported file type for OCR: {suffix}")
 
 
+def ocr_image(image: Image.Image) -> OCRResult:
+    """OCR one page image with the executing process's engine, e.g. in a pool worker."""
+
+    return ocr_engine._run_ocr(image)
+
+
 ocr_engine = OCREngine()
@@ -0,0 +1,201 @@
+"""Persistent cache of parse results keyed by content checksum and parser version.
+
+Re-ingesting unchanged bytes, e.g. after a schema change or for re-classification
+experiments, would otherwise repeat the most expensive work of ingestion: extracting text
+from large PDFs and scanning it for metadata, or OCRing scanned ones, whose results are kept
+next to their parse under the same key. Entries are compressed JSON files stored
+under a directory per parser version, so a parser upgrade simply stops finding the old
+entries, which then age out. The directory is bounded by ``settings.parse_cache_max_bytes``;
+when it grows past the bound the least recently used entries are deleted. Files are
+written atomically, so several processes may share the cache.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from ..config import settings
+from .analysis import TextAnalysis
+from .ocr import OCRResult
+from .parser import ParsedDocument, parser_service
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 3
+ENTRY_SUFFIX = ".json.z"
+# Eviction deletes down to this fraction of the bound so that it does not run on every put.
+EVICTION_TARGET = 0.9
+
+
+class ParseCache:
+    """Size-bounded on-disk store of ``ParsedDocument`` and ``OCRResult`` results."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        self.directory = directory or settings.parse_cache_directory
+        self.max_bytes = settings.parse_cache_max_bytes if max_bytes is None else max_bytes
+        self._version = version
+        self._lock = threading.Lock()
+        self._usage: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def version(self) -> str:
+        return self._version or parser_service.version
+
+    def get(self, checksum: str, variant: str) -> Optional[ParsedDocument]:
+        """Return the cached parse of ``checksum`` for the ``variant`` (file suffix), if any."""
+
+        path = self._path(checksum, variant)
+        entry = self._read(path)
+        if entry is None:
+            return None
+        try:
+            matches = {
+                kind: [tuple(match) for match in found] for kind, found in entry["matches"].items()
+            }
+            analysis = TextAnalysis(entry["text"], matches) if entry["analysed"] else None
+            return ParsedDocument(
+                entry["text"], entry["metadata"], analysis, entry.get("page_offsets")
+            )
+        except (ValueError, KeyError, TypeError) as exc:
+            self._discard(path, exc)
+            return None
+
+    def put(self, checksum: str, variant: str, parsed: ParsedDocument) -> None:
+        """Store ``parsed`` for ``checksum``; entries larger than the whole cache are skipped."""
+
+        analysis = parsed.analysis
+        entry = {
+            "text": parsed.text,
+            "metadata": parsed.metadata,
+            "analysed": analysis is not None,
+            "matches": analysis.matches if analysis is not None else {},
+            "page_offsets": parsed.page_offsets,
+        }
+        self._write(self._path(checksum, variant), entry)
+
+    def get_ocr(self, checksum: str, variant: str) -> Optional[OCRResult]:
+        """Return the cached OCR output of ``checksum`` for the ``variant``, if any."""
+
+        path = self._path(checksum, variant, kind="ocr")
+        entry = self._read(path)
+        if entry is None:
+            return None
+        try:
+            return OCRResult(entry["text"], float(entry["mean_confidence"]), entry["warnings"])
+        except (ValueError, KeyError, TypeError) as exc:
+            self._discard(path, exc)
+            return None
+
+    def put_ocr(self, checksum: str, variant: str, result: OCRResult) -> None:
+        """Store ``result`` for ``checksum`` unless pages were skipped while producing it."""
+
+        if not result.complete:
+            return
+        entry = {
+            "text": result.text,
+            "mean_confidence": result.mean_confidence,
+            "warnings": result.warnings,
+        }
+        self._write(self._path(checksum, variant, kind="ocr"), entry)
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            payload = path.read_bytes()
+            os.utime(path)  # the modification time orders entries for LRU eviction
+        except FileNotFoundError:
+            return None
+        try:
+            return json.loads(zlib.decompress(payload))
+        except (zlib.error, ValueError) as exc:
+            self._discard(path, exc)
+            return None
+
+    @staticmethod
+    def _discard(path: Path, exc: Exception) -> None:
+        logger.warning("Discarding unreadable parse cache entry %s: %s", path, exc)
+        path.unlink(missing_ok=True)
+
+    def _write(self, path: Path, entry: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        payload = zlib.compress(json.dumps(entry).encode("utf-8"), COMPRESSION_LEVEL)
+        if len(payload) > self.max_bytes:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+        temporary.write_bytes(payload)
+        os.replace(temporary, path)
+        with self._lock:
+            if self._usage is None:
+                self._usage = self._measure()
+            else:
+                self._usage += len(payload)
+            if self._usage > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+            self._usage = 0
+
+    def _path(self, checksum: str, variant: str, kind: str = "") -> Path:
+        qualifier = f".{kind}" if kind else ""
+        name = f"{checksum}{variant.lower() or '.bin'}{qualifier}{ENTRY_SUFFIX}"
+        return self.directory / self.version / checksum[:2] / name
+
+    def _entries(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return [path for path in self.directory.rglob(f"*{ENTRY_SUFFIX}") if path.is_file()]
+
+    def _measure(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:  # evicted by another process meanwhile
+                continue
+        return total
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._usage = total
+
+
+parse_cache = ParseCache()
+
+
+__all__ = ["ParseCache", "parse_cache"]
@@ -2,24 +2,34 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
-import logging
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from itertools import chain
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set
 
-from dateparser.search import search_dates
 from dateutil import parser as date_parser
-from pypdf import PdfReader
 
-logger = logging.getLogger(__name__)
+from ..config import settings
+from .analysis import METADATA_KINDS, TOKEN_PATTERN, Span, TextAnalysis, scan_metadata
+from .dates import extract_dates
+from .formats import format_registry
 
 DATE_PATTERN = re.compile(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})\b")
 MONEY_PATTERN = re.compile(r"\$\s?([\d,]+(?:\.\d{2})?)")
 EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w.-]+", re.IGNORECASE)
 ENTITY_PATTERN = re.compile(r"\b([A-Z][a-z]+\s+[A-Z][a-z]+)\b")
-TOKEN_PATTERN = re.compile(r"\b\w+\b")
+
+# Bump whenever a change to parsing alters the text or metadata produced for the same bytes;
+# persisted parse results of other versions are then ignored.
+PARSER_VERSION = 2
+
+# Longest metadata match that may straddle two chunks; the scan re-reads this much context.
+METADATA_OVERLAP_CHARS = 256
+# Text without any sentence or line break is cut at a word boundary once a window is this long.
+METADATA_MAX_WINDOW_CHARS = 64 * 1024
 
 
 @dataclass
@@ -28,62 +38,123 @@ class ParsedDocument:
 
     text: str
     metadata: Dict[str, List[str]]
+    # Lexical analysis of ``text`` for later stages; absent for truncated streamed inputs.
+    analysis: Optional[TextAnalysis] = field(default=None, repr=False, compare=False)
+    # For paginated formats, the offset in ``text`` at which each page (1, 2, ...) starts.
+    page_offsets: Optional[List[int]] = None
 
 
 class DocumentParser:
     """Parse supported files and derive structured metadata."""
 
-    def __init__(self) -> None:
-        self.supported_extensions = {".txt", ".md", ".json", ".pdf"}
+    def __init__(
+        self, streaming_threshold: Optional[int] = None, max_text_chars: Optional[int] = None
+    ) -> None:
+        self.streaming_threshold = streaming_threshold or settings.parser_streaming_threshold
+        self.max_text_chars = max_text_chars or settings.parser_max_text_chars
+
+    @property
+    def supported_extensions(self) -> Set[str]:
+        """Extensions with a format handler available in this environment."""
+
+        return format_registry.extensions()
+
+    @property
+    def version(self) -> str:
+        """``PARSER_VERSION`` qualified by the settings that shape parse and OCR results."""
+
+        options = [
+            self.streaming_threshold,
+            self.max_text_chars,
+            settings.date_engine,
+            settings.pdf_text_engine,
+            # OCR output replacing empty parses is persisted under the same version.
+            settings.ocr_language,
+            settings.ocr_render_scale,
+        ]
+        digest = hashlib.sha256(json.dumps(options).encode("utf-8")).hexdigest()[:8]
+        return f"{PARSER_VERSION}-{digest}"
 
     def parse(self, path: Path) -> ParsedDocument:
         """Parse the provided file and return text content with metadata."""
 
-        suffix = path.suffix.lower()
-        if suffix not in self.supported_extensions:
-            raise ValueError(f"Unsupported extension: {suffix}")
-        if suffix in {".txt", ".md"}:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        elif suffix == ".json":
-            text = self._render_json(path)
-        elif suffix == ".pdf":
-            text = self._parse_pdf(path)
-        else:  # pragma: no cover - guard for future extensions
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        metadata = self._extract_metadata(text)
-        return ParsedDocument(text=text, metadata=metadata)
+        return format_registry.handler(path.suffix).parse(self, path)
 
-    def tokenize(self, text: str) -> List[str]:
-        """Tokenise text for downstream NLP utilities."""
+    def parse_stream(self, stream: BinaryIO, name: str) -> ParsedDocument:
+        """Parse a document read from ``stream``, dispatching on the suffix of ``name``.
 
-        return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+        Used for archive members, which are streamed out of their container rather than
+        extracted to disk. PDF and DOCX parsing require a seekable stream.
+        """
 
-    def _render_json(self, path: Path) -> str:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        return json.dumps(data, indent=2, sort_keys=True)
+        return format_registry.handler(Path(name).suffix).parse(self, stream)
 
-    def _parse_pdf(self, path: Path) -> str:
-        pages: List[str] = []
-        reader = PdfReader(path)
-        for page in reader.pages:
-            try:
-                pages.append(page.extract_text() or "")
-            except Exception as exc:  # pragma: no cover - PyPDF variability
-                logger.warning("Failed to extract text from page due to %s", exc)
-        return "\n".join(pages)
+    def tokenize(self, text: str) -> List[str]:
+        """Tokenise text for downstream NLP utilities."""
 
-    def _extract_metadata(self, text: str) -> Dict[str, List[str]]:
-        explicit_dates = self._normalize_dates(DATE_PATTERN.findall(text))
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def analyze(self, text: str) -> TextAnalysis:
+        """Scan ``text`` once for metadata; tokens are derived from the result on demand."""
+
+        return TextAnalysis.scan(text)
+
+    def parse_pieces(self, pieces: Iterable[str]) -> ParsedDocument:
+        """Parse text delivered in pieces, e.g. by a format handler, as it is produced.
+
+        Up to ``streaming_threshold`` characters are parsed in memory; beyond that, metadata
+        is scanned chunk by chunk and only ``max_text_chars`` are kept.
+        """
+
+        stream = iter(pieces)
+        head: List[str] = []
+        size = 0
+        for piece in stream:
+            head.append(piece)
+            size += len(piece)
+            if size > self.streaming_threshold:
+                return self._parse_chunks(chain(head, stream))
+        return self.parse_text("".join(head))
+
+    def _parse_chunks(self, chunks: Iterable[str]) -> ParsedDocument:
+        scan = _MetadataScan(self)
+        retained: List[str] = []
+        kept = total = 0
+        for chunk in chunks:
+            scan.feed(chunk)
+            total += len(chunk)
+            if kept < self.max_text_chars:
+                piece = chunk[: self.max_text_chars - kept]
+                retained.append(piece)
+                kept += len(piece)
+        metadata = scan.finish()
+        if total > kept:
+            metadata["parse_warnings"] = [
+                f"Text truncated to {kept} of {total} characters; "
+                "metadata was extracted from the full document."
+            ]
+        return ParsedDocument(text="".join(retained), metadata=metadata)
+
+    def parse_text(self, text: str) -> ParsedDocument:
+        """Parse text held in memory in full."""
+
+        analysis = self.analyze(text)
         natural_dates = self._extract_natural_language_dates(text)
-        dates = sorted(set(explicit_dates + natural_dates))
-        money = [amount for amount in MONEY_PATTERN.findall(text)]
-        emails = sorted(set(match.lower() for match in EMAIL_PATTERN.findall(text)))
-        entities = sorted({match.strip() for match in ENTITY_PATTERN.findall(text)})
+        metadata = self._summarise_metadata(analysis.matches, natural_dates)
+        return ParsedDocument(text=text, metadata=metadata, analysis=analysis)
+
+    def _extract_metadata(self, text: str) -> Dict[str, List[str]]:
+        return self.parse_text(text).metadata
+
+    def _summarise_metadata(
+        self, matches: Dict[str, List[Span]], natural_dates: Iterable[str]
+    ) -> Dict[str, List[str]]:
+        explicit_dates = self._normalize_dates(value for value, _, _ in matches["dates"])
         return {
-            "dates": dates,
-            "monetary_amounts": money,
-            "emails": emails,
-            "entities": entities,
+            "dates": sorted(set(explicit_dates) | set(natural_dates)),
+            "monetary_amounts": [value for value, _, _ in matches["monetary_amounts"]],
+            "emails": sorted({value.lower() for value, _, _ in matches["emails"]}),
+            "entities": sorted({value.strip() for value, _, _ in matches["entities"]}),
         }
 
     def _normalize_dates(self, matches: Iterable[str]) -> List[str]:
@@ -97,9 +168,53 @@ class DocumentParser:
         return sorted(set(normalized))
 
     def _extract_natural_language_dates(self, text: str) -> List[str]:
-        results = search_dates(text, settings={"RETURN_AS_TIMEZONE_AWARE": False}) or []
-        normalized = {result.date().isoformat() for _, result in results}
-        return sorted(normalized)
+        return extract_dates(text)
+
+
+class _MetadataScan:
+    """Extract metadata from text delivered in chunks, as if it were one string.
+
+    Each chunk is scanned together with the unscanned tail of the previous one. Matches are
+    accepted only if they start before a cut point on a sentence, line or word boundary at
+    least ``METADATA_OVERLAP_CHARS`` from the end of the window; later ones are found again,
+    with full context, in the next window, and natural-language dates are searched for in
+    the text before the cut only. Matches that straddle the cut are remembered so the
+    next window does not pick up their remainder as a match of its own.
+    """
+
+    def __init__(self, parser: DocumentParser) -> None:
+        self._parser = parser
+        self._tail = ""
+        self._skip: Dict[str, int] = {}
+        self._matches: Dict[str, List[Span]] = {kind: [] for kind in METADATA_KINDS.values()}
+        self._natural_dates: Set[str] = set()
+
+    def feed(self, text: str, final: bool = False) -> None:
+        window = self._tail + text
+        cut = len(window)
+        if not final and len(window) > METADATA_OVERLAP_CHARS:
+            limit = len(window) - METADATA_OVERLAP_CHARS
+            # Prefer a sentence or line break so date phrases are not split across windows.
+            boundary = max(window.rfind(". ", 0, limit) + 1, window.rfind("\n", 0, limit))
+            if boundary <= 0:
+                if len(window) < METADATA_MAX_WINDOW_CHARS:
+                    self._tail = window
+                    return
+                boundary = window.rfind(" ", 0, limit)
+            cut = boundary if boundary > 0 else limit
+        elif not final:
+            self._tail = window
+            return
+        matches, self._skip = scan_metadata(window, until=cut, skip=self._skip)
+        for kind, found in matches.items():
+            self._matches[kind].extend(found)
+        self._natural_dates.update(self._parser._extract_natural_language_dates(window[:cut]))
+        self._tail = window[cut:]
+
+    def finish(self) -> Dict[str, List[str]]:
+        if self._tail:
+            self.feed("", final=True)
+        return self._parser._summarise_metadata(self._matches, self._natural_dates)
 
 
 parser_service = DocumentParser()
@@ -0,0 +1,294 @@
+"""Interchangeable PDF text-extraction engines.
+
+``pypdf`` is pure Python and interprets content streams itself; PDFium (via ``pypdfium2``,
+already used to render pages for OCR) does the same work in C and is typically several times
+faster. The engines lay text out differently on some documents, so ``settings.pdf_text_engine
+= "auto"`` samples a few pages of each document with PDFium and keeps it outright when they
+read as ordinary text; otherwise pypdf reads the same pages and PDFium is kept only when it
+recovers nearly all of the words pypdf finds there.
+
+Run ``python -m app.services.pdf_text FILE...`` to compare throughput and text fidelity of
+the engines, and the choices of the auto-chooser, on a corpus.
+"""
+
+from __future__ import annotations
+
+import abc
+import argparse
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence
+
+import pypdfium2 as pdfium
+from pypdf import PdfReader
+
+from ..config import settings
+from .analysis import TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+PDF_TEXT_ENGINES = {"auto", "pypdf", "pdfium"}
+# Share of pypdf's sampled words PDFium must reproduce for the auto-chooser to pick it.
+MIN_PDFIUM_AGREEMENT = 0.9
+# A PDFium sample with at least this many words per page, almost none of them run together
+# (longer than CLEAN_MAX_WORD_CHARS), is kept without consulting pypdf.
+CLEAN_MIN_WORDS_PER_PAGE = 40
+CLEAN_MAX_WORD_CHARS = 20
+CLEAN_MAX_LONG_WORD_SHARE = 0.01
+
+# PDFium is not thread-safe: calls from the threads of one process must be serialised.
+PDFIUM_LOCK = threading.RLock()
+
+PdfSource = Path | BinaryIO
+
+
+class PdfText(abc.ABC):
+    """An open PDF whose pages' text can be extracted by index."""
+
+    engine = ""
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        """Number of pages."""
+
+    @abc.abstractmethod
+    def page_text(self, index: int) -> str:
+        """Text of the page at ``index``, counted from zero."""
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """Release the engine's resources; a stream it was opened on stays open."""
+
+    def __enter__(self) -> PdfText:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class PypdfText(PdfText):
+    engine = "pypdf"
+
+    def __init__(self, source: PdfSource) -> None:
+        self.reader = PdfReader(source)
+
+    def __len__(self) -> int:
+        return len(self.reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self.reader.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        pass  # pypdf holds no file handle: it reads paths into memory and streams stay open
+
+
+class PdfiumText(PdfText):
+    engine = "pdfium"
+
+    def __init__(self, source: PdfSource) -> None:
+        with PDFIUM_LOCK:
+            self.document = pdfium.PdfDocument(str(source) if isinstance(source, Path) else source)
+
+    def __len__(self) -> int:
+        return len(self.document)
+
+    def page_text(self, index: int) -> str:
+        with PDFIUM_LOCK:
+            page = self.document[index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def close(self) -> None:
+        with PDFIUM_LOCK:
+            self.document.close()
+
+
+_ENGINES = {"pypdf": PypdfText, "pdfium": PdfiumText}
+
+
+def _words(text: str) -> Counter:
+    return Counter(TOKEN_PATTERN.findall(text.lower()))
+
+
+def agreement(reference: str, candidate: str) -> float:
+    """Share of the words of ``reference`` (with multiplicity) that ``candidate`` contains."""
+
+    expected = _words(reference)
+    total = sum(expected.values())
+    if not total:
+        return 1.0
+    return sum((expected & _words(candidate)).values()) / total
+
+
+def reads_cleanly(text: str, pages: int) -> bool:
+    """Whether ``text`` sampled from ``pages`` pages looks like correctly extracted prose.
+
+    Engines disagree mostly on spacing, which shows as words run together into long tokens,
+    and on unmapped glyphs, which show as replacement characters.
+    """
+
+    if "\ufffd" in text:
+        return False
+    words = TOKEN_PATTERN.findall(text)
+    if not pages or len(words) < CLEAN_MIN_WORDS_PER_PAGE * pages:
+        return False
+    long_words = sum(len(word) > CLEAN_MAX_WORD_CHARS for word in words)
+    return long_words <= CLEAN_MAX_LONG_WORD_SHARE * len(words)
+
+
+def _sample_indexes(count: int, samples: int) -> List[int]:
+    if count <= samples:
+        return list(range(count))
+    # Spread the sample so a cover page does not decide for the whole document.
+    return sorted({round(step * (count - 1) / max(samples - 1, 1)) for step in range(samples)})
+
+
+def open_pdf_text(source: PdfSource, engine: Optional[str] = None) -> PdfText:
+    """Open ``source`` with ``engine`` (default ``settings.pdf_text_engine``).
+
+    ``"auto"`` extracts ``settings.pdf_engine_sample_pages`` pages with PDFium and returns
+    it if they read cleanly; otherwise it opens the document with pypdf too, compares their
+    text on the same pages and returns whichever is kept open. A document PDFium cannot open
+    is read with pypdf. Each engine opening a stream starts from the stream's position on
+    entry.
+    """
+
+    engine = engine or settings.pdf_text_engine
+    if engine not in PDF_TEXT_ENGINES:
+        raise ValueError(f"Unknown PDF text engine {engine!r}")
+    if engine != "auto":
+        return _ENGINES[engine](source)
+    start = None if isinstance(source, Path) else source.tell()
+
+    def rewound() -> PdfSource:
+        if start is not None:
+            source.seek(start)  # type: ignore[union-attr]
+        return source
+
+    try:
+        candidate = PdfiumText(rewound())
+        sampled = _sample_indexes(len(candidate), settings.pdf_engine_sample_pages)
+        found = "\n".join(candidate.page_text(index) for index in sampled)
+    except Exception as exc:  # pragma: no cover - PDFium rejects some malformed files
+        logger.info("PDFium could not read %s (%s); using pypdf", source, exc)
+        return PypdfText(rewound())
+    if reads_cleanly(found, len(sampled)):
+        return candidate
+    try:
+        reference = PypdfText(rewound())
+        expected = "\n".join(reference.page_text(index) for index in sampled)
+    except Exception as exc:  # pragma: no cover - PyPDF variability
+        logger.info("Could not sample %s with pypdf (%s); using PDFium", source, exc)
+        return candidate
+    if agreement(expected, found) >= MIN_PDFIUM_AGREEMENT:
+        return candidate
+    candidate.close()
+    return reference
+
+
+@dataclass
+class EngineBenchmark:
+    """Throughput of each engine, and how faithfully PDFium reproduces pypdf's text."""
+
+    documents: int = 0
+    pages: int = 0
+    seconds: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(_ENGINES, 0.0))
+    characters: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(_ENGINES, 0))
+    words: int = 0
+    matched_words: int = 0
+    choices: Counter = field(default_factory=Counter)
+    low_fidelity: List[str] = field(default_factory=list)
+
+    @property
+    def fidelity(self) -> float:
+        return self.matched_words / self.words if self.words else 1.0
+
+    @property
+    def speedup(self) -> float:
+        fast = self.seconds["pdfium"]
+        return self.seconds["pypdf"] / fast if fast else float("inf")
+
+    def summary(self) -> str:
+        lines = [f"documents:   {self.documents} ({self.pages} pages)"]
+        for engine, seconds in self.seconds.items():
+            rate = self.pages / seconds if seconds else float("inf")
+            lines.append(
+                f"{engine + ':':<13}{seconds:.2f}s, {rate:.1f} pages/s, "
+                f"{self.characters[engine]} characters"
+            )
+        lines.append(f"fidelity:    {self.fidelity:.1%} of pypdf's words found by PDFium")
+        lines.append(f"speedup:     {self.speedup:.1f}x")
+        lines.append(
+            "auto choice: " + ", ".join(f"{name} {count}" for name, count in self.choices.items())
+        )
+        return "\n".join(lines)
+
+
+def benchmark(paths: Sequence[Path]) -> EngineBenchmark:
+    """Extract every page of ``paths`` with each engine and compare the results."""
+
+    report = EngineBenchmark()
+    for path in paths:
+        texts: Dict[str, str] = {}
+        for engine, opener in _ENGINES.items():
+            started = time.perf_counter()
+            with opener(path) as document:
+                texts[engine] = "\n".join(document.page_text(i) for i in range(len(document)))
+                pages = len(document)
+            report.seconds[engine] += time.perf_counter() - started
+            report.characters[engine] += len(texts[engine])
+        expected, found = _words(texts["pypdf"]), _words(texts["pdfium"])
+        words, matched = sum(expected.values()), sum((expected & found).values())
+        report.documents += 1
+        report.pages += pages
+        report.words += words
+        report.matched_words += matched
+        if words and matched / words < MIN_PDFIUM_AGREEMENT:
+            report.low_fidelity.append(f"{path.name} ({matched / words:.0%})")
+        with open_pdf_text(path, "auto") as chosen:
+            report.choices[chosen.engine] += 1
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the pypdf and PDFium text engines.")
+    parser.add_argument("paths", nargs="+", type=Path, help="PDF files or folders of PDFs")
+    args = parser.parse_args(argv)
+    files = [
+        candidate
+        for path in args.paths
+        for candidate in (sorted(path.rglob("*.pdf")) if path.is_dir() else [path])
+        if candidate.is_file()
+    ]
+    report = benchmark(files)
+    print(report.summary())
+    if report.low_fidelity:
+        print(f"low fidelity: {', '.join(report.low_fidelity[:20])}")
+
+
+__all__ = [
+    "EngineBenchmark",
+    "PDF_TEXT_ENGINES",
+    "PdfText",
+    "PdfiumText",
+    "PypdfText",
+    "agreement",
+    "benchmark",
+    "open_pdf_text",
+    "reads_cleanly",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Batched persistence for ingestion runs, documents and metadata fragments."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import insert, select, update
+
+from ..config import settings
+from ..database import Document, IngestionRun, MetadataFragment, get_session, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DocumentRecord:
+    """Column values for a document row awaiting insertion."""
+
+    external_id: str
+    source_path: str
+    source: str
+    checksum: str
+    mime_type: str
+    text_content: str
+    summary: Optional[str]
+    document_type: Optional[str]
+    privilege_risk: float
+    importance_score: float
+    metadata_json: Dict[str, Any] = field(default_factory=dict)
+    page_offsets: Optional[List[int]] = None
+    ingestion_run_id: Optional[int] = None
+    duplicate_of_id: Optional[int] = None
+    index_fragments: bool = True
+
+    def row(self) -> Dict[str, Any]:
+        values = asdict(self)
+        values.pop("index_fragments")
+        now = utc_now()
+        values.update(created_at=now, updated_at=now)
+        return values
+
+    def fragment_rows(self, document_id: int) -> List[Dict[str, Any]]:
+        if not self.index_fragments:
+            return []
+        return [
+            {
+                "document_id": document_id,
+                "fragment_type": fragment_type,
+                "fragment_value": value,
+                "confidence": 1.0,
+            }
+            for fragment_type, values in self.metadata_json.items()
+            if isinstance(values, list)
+            for value in values
+        ]
+
+
+class IngestionStore:
+    """Write ingestion state with few round trips.
+
+    Run primary keys are cached by trace id so completion is a single keyed ``UPDATE``.
+    Documents submitted concurrently are group-committed: they are buffered until
+    ``batch_size`` records are waiting or ``linger_seconds`` has elapsed, then written in one
+    transaction using multi-row inserts for documents and ``executemany`` for fragments.
+    Database calls run in worker threads so they never block the event loop.
+    """
+
+    def __init__(
+        self, batch_size: Optional[int] = None, linger_seconds: Optional[float] = None
+    ) -> None:
+        self.batch_size = max(1, batch_size or settings.db_batch_size)
+        self.linger_seconds = (
+            linger_seconds if linger_seconds is not None else settings.db_batch_linger_ms / 1000
+        )
+        self._runs: Dict[str, Tuple[int, datetime]] = {}
+        self._pending: List[Tuple[DocumentRecord, asyncio.Future[None]]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task[None]] = set()
+
+    async def start_run(self, trace_id: str, source: str, job_id: Optional[str] = None) -> int:
+        started_at = utc_now()
+        run_id = await asyncio.to_thread(self._insert_run, trace_id, source, job_id, started_at)
+        self._runs[trace_id] = (run_id, started_at)
+        return run_id
+
+    def _insert_run(
+        self, trace_id: str, source: str, job_id: Optional[str], started_at: datetime
+    ) -> int:
+        with get_session() as session:
+            return session.execute(
+                insert(IngestionRun)
+                .values(
+                    trace_id=trace_id,
+                    source=source,
+                    status="running",
+                    job_id=job_id,
+                    started_at=started_at,
+                    created_at=started_at,
+                )
+                .returning(IngestionRun.id)
+            ).scalar_one()
+
+    def _run(self, trace_id: str) -> Tuple[int, datetime]:
+        cached = self._runs.get(trace_id)
+        if cached is not None:
+            return cached
+        with get_session() as session:
+            row = session.execute(
+                select(IngestionRun.id, IngestionRun.started_at).where(
+                    IngestionRun.trace_id == trace_id
+                )
+            ).one()
+        return row.id, row.started_at
+
+    async def finish_run(
+        self,
+        trace_id: str,
+        status: str,
+        error_message: Optional[str] = None,
+        *,
+        mime_type: Optional[str] = None,
+        stage_timings: Optional[Dict[str, float]] = None,
+    ) -> None:
+        try:
+            await asyncio.to_thread(
+                self._update_run, trace_id, status, error_message, mime_type, stage_timings
+            )
+        finally:
+            self._runs.pop(trace_id, None)
+
+    def _update_run(
+        self,
+        trace_id: str,
+        status: str,
+        error_message: Optional[str],
+        mime_type: Optional[str],
+        stage_timings: Optional[Dict[str, float]],
+    ) -> None:
+        run_id, started_at = self._run(trace_id)
+        completed_at = utc_now()
+        with get_session() as session:
+            session.execute(
+                update(IngestionRun)
+                .where(IngestionRun.id == run_id)
+                .values(
+                    status=status,
+                    completed_at=completed_at,
+                    duration_seconds=(completed_at - started_at).total_seconds(),
+                    error_message=error_message,
+                    mime_type=mime_type,
+                    stage_timings=stage_timings or {},
+                )
+            )
+
+    async def add_document(self, record: DocumentRecord) -> None:
+        """Queue ``record`` for the next group commit and wait until it is durable."""
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.linger_seconds, self._flush_pending)
+        await future
+
+    def write_documents(self, records: Sequence[DocumentRecord]) -> Dict[str, int]:
+        """Insert ``records`` and their fragments in one transaction; return primary keys."""
+
+        if not records:
+            return {}
+        with get_session() as session:
+            result = session.execute(
+                insert(Document).returning(Document.id, Document.external_id),
+                [record.row() for record in records],
+            )
+            ids = {row.external_id: row.id for row in result}
+            fragments = [
+                fragment
+                for record in records
+                for fragment in record.fragment_rows(ids[record.external_id])
+            ]
+            if fragments:
+                session.execute(insert(MetadataFragment), fragments)
+        return ids
+
+    def _flush_pending(self) -> None:
+        """Hand the buffered records to a task that writes them off the event loop."""
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._write_batch(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write_batch(self, batch: List[Tuple[DocumentRecord, asyncio.Future[None]]]) -> None:
+        try:
+            await asyncio.to_thread(self.write_documents, [record for record, _ in batch])
+        except Exception:
+            logger.warning("Batch insert of %d documents failed; retrying individually", len(batch))
+            for record, future in batch:
+                try:
+                    await asyncio.to_thread(self.write_documents, [record])
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+ingestion_store = IngestionStore()
+
+
+__all__ = ["DocumentRecord", "IngestionStore", "ingestion_store"]
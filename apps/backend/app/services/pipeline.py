@@ -0,0 +1,190 @@
+"""Dependency-driven execution of ingestion stages.
+
+A ``StageGraph`` is a small DAG of named stages. Each stage declares the stages whose results
+it reads; it starts as soon as those have finished, so independent stages run concurrently
+and a document's latency follows the longest dependency chain instead of the sum of all
+stages. Results of pure stages (parse, OCR, content scoring) are cached by content key, and
+concurrent requests for the same key share one computation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from graphlib import CycleError, TopologicalSorter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+from .timing import StageTimer
+
+StageFunction = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of a ``StageGraph``.
+
+    ``run`` receives the shared context (graph inputs plus the results of finished stages,
+    keyed by stage name) and returns this stage's result. ``when`` can skip the stage, in
+    which case its result is ``None`` and no time is recorded for it. ``cached`` results are
+    reused for the same cache key across documents.
+    """
+
+    name: str
+    run: StageFunction
+    after: Tuple[str, ...] = ()
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None
+    cached: bool = False
+
+
+class StageCache:
+    """LRU cache of stage results bounded by entry count and retained text size."""
+
+    def __init__(self, max_entries: Optional[int] = None, max_chars: Optional[int] = None):
+        self.max_entries = settings.stage_cache_entries if max_entries is None else max_entries
+        self.max_chars = settings.stage_cache_max_chars if max_chars is None else max_chars
+        self._lock = threading.Lock()
+        self._values: OrderedDict[Tuple[str, str], Tuple[Any, int]] = OrderedDict()
+        self._chars = 0
+        self._pending: Dict[Tuple[str, str], asyncio.Future[Any]] = {}
+
+    def get(self, stage: str, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._values.get((stage, key))
+            if entry is None:
+                return False, None
+            self._values.move_to_end((stage, key))
+            return True, entry[0]
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        weight = len(getattr(value, "text", "") or "")
+        if self.max_entries <= 0 or weight > self.max_chars:
+            return
+        with self._lock:
+            previous = self._values.pop((stage, key), None)
+            if previous is not None:
+                self._chars -= previous[1]
+            self._values[(stage, key)] = (value, weight)
+            self._chars += weight
+            while len(self._values) > self.max_entries or self._chars > self.max_chars:
+                _, (_, evicted) = self._values.popitem(last=False)
+                self._chars -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._chars = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    async def compute(
+        self, stage: str, key: str, factory: Callable[[], Awaitable[Any]], refresh: bool = False
+    ) -> Any:
+        """Return the cached value or compute it once, sharing in-flight work for ``key``.
+
+        ``refresh`` ignores cached and in-flight values and recomputes, storing the result.
+        """
+
+        if not refresh:
+            hit, value = self.get(stage, key)
+            if hit:
+                return value
+            pending = self._pending.get((stage, key))
+            if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+                try:
+                    return await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # The computing caller was cancelled; compute the value here instead.
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending[(stage, key)] = future
+        try:
+            value = await factory()
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+                future.exception()  # waiters re-raise it; do not log it as unretrieved
+            raise
+        else:
+            self.put(stage, key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._pending.get((stage, key)) is future:
+                del self._pending[(stage, key)]
+
+
+class StageGraph:
+    """Run ``Stage`` objects in dependency order with maximal concurrency."""
+
+    def __init__(self, stages: Iterable[Stage], cache: Optional[StageCache] = None) -> None:
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        sorter: TopologicalSorter[str] = TopologicalSorter()
+        for stage in self.stages.values():
+            unknown = [name for name in stage.after if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stages {unknown}")
+            sorter.add(stage.name, *stage.after)
+        try:
+            self.order: List[str] = list(sorter.static_order())
+        except CycleError as exc:
+            raise ValueError(f"Stage dependencies form a cycle: {exc.args[1]}") from exc
+        self.cache = cache if cache is not None else StageCache()
+
+    async def run(
+        self,
+        context: Dict[str, Any],
+        *,
+        timer: Optional[StageTimer] = None,
+        cache_key: Optional[str] = None,
+        refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """Run every stage and return ``context`` with each stage's result added.
+
+        ``context`` is updated in place, so after a failure the caller can still see which
+        stages completed (e.g. to compensate side effects). The first failing stage cancels
+        the stages that have not finished and its exception is re-raised. Cached stages
+        use ``cache_key``; ``refresh`` recomputes them instead of reading the cache.
+        """
+
+        timer = timer or StageTimer()
+        tasks: Dict[str, asyncio.Task[None]] = {}
+
+        async def _execute(stage: Stage) -> None:
+            if stage.after:
+                await asyncio.gather(*(tasks[name] for name in stage.after))
+            if stage.when is not None and not stage.when(context):
+                context[stage.name] = None
+                return
+            with timer.stage(stage.name):
+                if stage.cached and cache_key is not None:
+                    result = await self.cache.compute(
+                        stage.name, cache_key, lambda: stage.run(context), refresh=refresh
+                    )
+                else:
+                    result = await stage.run(context)
+            context[stage.name] = result
+
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(_execute(self.stages[name]))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return context
+
+
+__all__ = ["Stage", "StageCache", "StageGraph"]
@@ -2,49 +2,98 @@
 
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import time
 import uuid
+from bisect import bisect_right
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix
 
 from ..config import settings
 from ..database import Document, get_session
 from ..schemas import SearchResult
+from .analysis import TermMatrix, TextAnalysis
 from .graph import graph_manager
+from .locks import file_lock
+
+
+@dataclass
+class _IndexEntry:
+    """A document appended to the index but not yet written to its artefacts."""
+
+    vector: csr_matrix
+    metadata: Dict[str, List[str]]
+    text: str
+    page_offsets: Optional[List[int]]
 
 
 class HybridRetriever:
-    """Combine TF-IDF similarity with graph proximity for ranked retrieval."""
+    """Combine TF-IDF similarity with graph proximity for ranked retrieval.
 
-    def __init__(self, artifact_dir: Path | None = None) -> None:
+    Documents are represented by the hashed term vectors of their :class:`TextAnalysis`, so
+    ingestion appends the vector it already computed instead of re-analysing the corpus;
+    :meth:`rebuild` re-reads every text from the database, e.g. after removals. Appended
+    documents are searchable at once but written to disk only every ``persist_every``
+    documents or ``persist_seconds``, and on :meth:`flush`, since each write serialises the
+    whole matrix. Until then they are re-applied whenever another process's write is
+    loaded.
+    """
+
+    def __init__(
+        self,
+        artifact_dir: Path | None = None,
+        persist_every: int | None = None,
+        persist_seconds: float | None = None,
+    ) -> None:
         self.artifact_dir = artifact_dir or settings.retriever_index_path
-        self.vectorizer_path = self.artifact_dir / "vectorizer.joblib"
-        self.matrix_path = self.artifact_dir / "matrix.joblib"
+        self.persist_every = persist_every or settings.retriever_persist_every
+        self.persist_seconds = (
+            persist_seconds if persist_seconds is not None else settings.retriever_persist_seconds
+        )
+        self.terms_path = self.artifact_dir / "terms.joblib"
         self.doc_ids_path = self.artifact_dir / "doc_ids.json"
-        self.vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2))
-        self.document_matrix = None
+        self.lock_path = self.artifact_dir / "index.lock"
+        self.generation_path = self.artifact_dir / "index.generation"
+        self.terms: TermMatrix | None = None
         self.document_ids: List[str] = []
         self.metadata_cache: Dict[str, Dict[str, List[str]]] = {}
         self.text_cache: Dict[str, str] = {}
+        self.page_cache: Dict[str, List[int]] = {}
+        self._generation: str | None = None
+        self._unsaved: Dict[str, _IndexEntry] = {}
+        self._last_persist = time.monotonic()
         self._load_if_exists()
 
+    def _read_generation(self) -> str | None:
+        try:
+            return self.generation_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
     def _load_if_exists(self) -> None:
-        if self.vectorizer_path.exists():
-            self.vectorizer = joblib.load(self.vectorizer_path)
-        if self.matrix_path.exists():
-            self.document_matrix = joblib.load(self.matrix_path)
-        if self.doc_ids_path.exists():
-            self.document_ids = json.loads(self.doc_ids_path.read_text(encoding="utf-8"))
-        self._hydrate_metadata()
+        # Artefacts may be rewritten by another process (e.g. an ingestion worker); loading
+        # under the index lock never mixes new document ids with an old matrix.
+        with file_lock(self.lock_path):
+            if self.terms_path.exists() and self.doc_ids_path.exists():
+                self.terms = TermMatrix(joblib.load(self.terms_path))
+                self.document_ids = json.loads(self.doc_ids_path.read_text(encoding="utf-8"))
+            self._generation = self._read_generation()
+            self._hydrate_metadata()
+            for external_id, entry in self._unsaved.items():
+                if self.terms is not None and external_id not in self.document_ids:
+                    self._append(external_id, entry)
 
     def _hydrate_metadata(self) -> None:
         if not self.document_ids:
             self.metadata_cache.clear()
             self.text_cache.clear()
+            self.page_cache.clear()
             return
         with get_session() as session:
             documents = (
@@ -54,23 +103,78 @@ class HybridRetriever:
             )
             self.metadata_cache = {doc.external_id: doc.metadata_json or {} for doc in documents}
             self.text_cache = {doc.external_id: doc.text_content for doc in documents}
+            self.page_cache = {
+                doc.external_id: doc.page_offsets for doc in documents if doc.page_offsets
+            }
 
     def rebuild(self) -> None:
-        with get_session() as session:
-            documents = session.query(Document).order_by(Document.id).all()
-            texts = [document.text_content for document in documents]
-            if not texts:
-                self.document_matrix = None
-                self.document_ids = []
-                self.metadata_cache = {}
-                self.text_cache = {}
+        with file_lock(self.lock_path):
+            with get_session() as session:
+                documents = (
+                    session.query(Document)
+                    .filter(Document.duplicate_of_id.is_(None))
+                    .order_by(Document.id)
+                    .all()
+                )
+                terms = TermMatrix()
+                for document in documents:
+                    terms.append(TextAnalysis(document.text_content).vector)
+                self.terms = terms
+                self.document_ids = [document.external_id for document in documents]
+                self.metadata_cache = {document.external_id: document.metadata_json or {} for document in documents}
+                self.text_cache = {document.external_id: document.text_content for document in documents}
+                self.page_cache = {
+                    document.external_id: document.page_offsets
+                    for document in documents
+                    if document.page_offsets
+                }
                 self._persist()
+                self._unsaved.clear()
+
+    def add_document(
+        self,
+        external_id: str,
+        analysis: TextAnalysis,
+        metadata: Dict[str, List[str]],
+        page_offsets: Optional[List[int]] = None,
+    ) -> None:
+        """Append a stored document to the index using its ingestion-time analysis."""
+
+        with file_lock(self.lock_path):
+            if self._read_generation() != self._generation:
+                self._load_if_exists()
+            if self.terms is None or external_id in self.document_ids:
+                self.rebuild()
                 return
-            self.document_matrix = self.vectorizer.fit_transform(texts)
-            self.document_ids = [document.external_id for document in documents]
-            self.metadata_cache = {document.external_id: document.metadata_json or {} for document in documents}
-            self.text_cache = {document.external_id: document.text_content for document in documents}
-            self._persist()
+            entry = _IndexEntry(analysis.vector, metadata, analysis.text, page_offsets)
+            self._append(external_id, entry)
+            self._unsaved[external_id] = entry
+            elapsed = time.monotonic() - self._last_persist
+            if len(self._unsaved) >= self.persist_every or elapsed >= self.persist_seconds:
+                self._save()
+
+    def _append(self, external_id: str, entry: _IndexEntry) -> None:
+        self.terms.append(entry.vector)
+        self.document_ids.append(external_id)
+        self.metadata_cache[external_id] = entry.metadata
+        self.text_cache[external_id] = entry.text
+        if entry.page_offsets:
+            self.page_cache[external_id] = entry.page_offsets
+
+    def flush(self) -> None:
+        """Write documents appended since the last write to the index artefacts."""
+
+        with file_lock(self.lock_path):
+            if not self._unsaved:
+                return
+            if self._read_generation() != self._generation:
+                self._load_if_exists()
+            self._save()
+
+    def _save(self) -> None:
+        self._persist()
+        self._unsaved.clear()
+        self._last_persist = time.monotonic()
 
     def update_with_document(self, document: Document | None = None) -> None:
         """Refresh the retrieval index after a document change."""
@@ -80,19 +184,30 @@ class HybridRetriever:
 
     def _persist(self) -> None:
         self.artifact_dir.mkdir(parents=True, exist_ok=True)
-        joblib.dump(self.vectorizer, self.vectorizer_path)
-        joblib.dump(self.document_matrix, self.matrix_path)
-        self.doc_ids_path.write_text(json.dumps(self.document_ids), encoding="utf-8")
+        self._replace(self.terms_path, lambda path: joblib.dump(self.terms.counts, path))
+        self._replace(
+            self.doc_ids_path,
+            lambda path: path.write_text(json.dumps(self.document_ids), encoding="utf-8"),
+        )
+        self._generation = uuid.uuid4().hex
+        self.generation_path.write_text(self._generation, encoding="utf-8")
+
+    @staticmethod
+    def _replace(path: Path, write) -> None:
+        temporary = path.with_name(f"{path.name}.tmp")
+        write(temporary)
+        os.replace(temporary, path)
 
     def search(self, query: str, *, filters: Optional[Dict[str, Iterable[str]]] = None, top_k: int = 5) -> List[SearchResult]:
         if not query.strip():
             return []
-        if self.document_matrix is None:
+        if self._read_generation() != self._generation:
+            self._load_if_exists()
+        if self.terms is None:
             self.rebuild()
-        if self.document_matrix is None:
+        if not self.document_ids:
             return []
-        query_vector = self.vectorizer.transform([query])
-        semantic_scores = cosine_similarity(query_vector, self.document_matrix)[0]
+        semantic_scores = self.terms.similarities(TextAnalysis(query).vector)
         results: List[SearchResult] = []
         for idx, doc_id in enumerate(self.document_ids):
             metadata = self.metadata_cache.get(doc_id, {})
@@ -100,7 +215,7 @@ class HybridRetriever:
             filter_penalty = self._apply_filters(metadata, filters)
             score = float(semantic_scores[idx]) * settings.reranker_alpha + structural_bonus
             score *= filter_penalty
-            snippet = self._build_snippet(doc_id, query)
+            snippet, page = self._build_snippet(doc_id, query)
             highlights = self._build_highlights(metadata, query)
             trace_id = f"search-{uuid.uuid4().hex[:12]}"
             results.append(
@@ -108,6 +223,7 @@ class HybridRetriever:
                     document_id=doc_id,
                     score=score,
                     snippet=snippet,
+                    page=page,
                     highlights=highlights,
                     trace_id=trace_id,
                 )
@@ -133,7 +249,11 @@ class HybridRetriever:
                 penalty *= 0.1
         return penalty
 
-    def _build_snippet(self, doc_id: str, query: str, length: int = 320) -> str:
+    def _build_snippet(
+        self, doc_id: str, query: str, length: int = 320
+    ) -> Tuple[str, Optional[int]]:
+        """Return a snippet around the first query hit and, for paginated documents, its page."""
+
         text = self.text_cache.get(doc_id)
         if text is None:
             with get_session() as session:
@@ -141,6 +261,8 @@ class HybridRetriever:
                 text = document.text_content if document else ""
                 if document:
                     self.text_cache[doc_id] = text
+                    if document.page_offsets:
+                        self.page_cache[doc_id] = document.page_offsets
         lowered = text.lower()
         tokens = query.lower().split()
         for token in tokens:
@@ -148,8 +270,14 @@ class HybridRetriever:
             if index != -1:
                 start = max(0, index - length // 2)
                 end = min(len(text), start + length)
-                return text[start:end].strip()
-        return text[:length].strip()
+                return text[start:end].strip(), self._page_at(doc_id, index)
+        return text[:length].strip(), self._page_at(doc_id, 0)
+
+    def _page_at(self, doc_id: str, index: int) -> Optional[int]:
+        offsets = self.page_cache.get(doc_id)
+        if not offsets:
+            return None
+        return max(bisect_right(offsets, index), 1)
 
     def _build_highlights(self, metadata: Dict[str, List[str]], query: str) -> Dict[str, List[str]]:
         tokens = {token.lower() for token in query.split()}
@@ -162,3 +290,4 @@ class HybridRetriever:
 
 
 retriever_service = HybridRetriever()
+atexit.register(retriever_service.flush)
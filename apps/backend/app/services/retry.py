@@ -0,0 +1,102 @@
+"""Retry policy for failed ingestion: error classification and backoff scheduling."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pypdf.errors import PyPdfError
+from pypdfium2 import PdfiumError
+from tenacity import (
+    Future,
+    RetryCallState,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random,
+)
+
+from ..config import settings
+from ..database import utc_now
+
+# Failures that will recur no matter how often the same bytes are re-processed.
+PERMANENT_ERRORS = (
+    FileNotFoundError,
+    IsADirectoryError,
+    PermissionError,
+    ValueError,
+    PyPdfError,
+    PdfiumError,
+)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Return ``True`` when retrying ``exc`` later may succeed.
+
+    Environmental failures such as a locked database (``OperationalError``), timeouts or
+    I/O errors are transient, as is anything unrecognised; the attempt limit still stops
+    documents that keep failing.
+    """
+
+    return not isinstance(exc, PERMANENT_ERRORS)
+
+
+@dataclass(frozen=True)
+class RetryDecision:
+    transient: bool
+    next_retry_at: Optional[datetime]
+
+    @property
+    def retry(self) -> bool:
+        return self.next_retry_at is not None
+
+
+class RetryPolicy:
+    """Decide whether and when a failed ingestion is retried, using tenacity strategies.
+
+    The decision after ``attempts`` failures applies tenacity's retry predicate, attempt
+    limit and exponential backoff with jitter, so background retries follow the same rules
+    as an in-process ``tenacity.retry`` would.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        initial_seconds: Optional[float] = None,
+        max_seconds: Optional[float] = None,
+        jitter_seconds: Optional[float] = None,
+    ) -> None:
+        initial = initial_seconds if initial_seconds is not None else settings.retry_initial_seconds
+        self.retrying = Retrying(
+            retry=retry_if_exception(is_transient),
+            stop=stop_after_attempt(max_attempts or settings.retry_max_attempts),
+            wait=wait_exponential(
+                multiplier=initial,
+                max=max_seconds if max_seconds is not None else settings.retry_max_seconds,
+            )
+            + wait_random(0, jitter_seconds if jitter_seconds is not None else initial),
+        )
+
+    def decide(
+        self, exc: BaseException, attempts: int, now: Optional[datetime] = None
+    ) -> RetryDecision:
+        """Return the decision after the ``attempts``-th failed attempt raised ``exc``."""
+
+        state = RetryCallState(self.retrying, fn=None, args=(), kwargs={})
+        state.attempt_number = attempts
+        state.outcome = Future.construct(attempts, exc, True)
+        transient = bool(self.retrying.retry(state))
+        if not transient or self.retrying.stop(state):
+            return RetryDecision(transient=transient, next_retry_at=None)
+        delay = self.retrying.wait(state)
+        return RetryDecision(
+            transient=True, next_retry_at=(now or utc_now()) + timedelta(seconds=delay)
+        )
+
+
+retry_policy = RetryPolicy()
+
+
+__all__ = ["RetryDecision", "RetryPolicy", "is_transient", "retry_policy"]
@@ -0,0 +1,321 @@
+"""Priority scheduling of ingestion work across light and heavy worker lanes."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config import settings
+from .archives import archive_reader, split_locator
+from .pdf_text import open_pdf_text
+
+logger = logging.getLogger(__name__)
+
+LANES = ("light", "heavy")
+OCR_SUFFIXES = {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
+
+Runner = Callable[..., Awaitable[str]]
+
+
+@dataclass(frozen=True, order=True)
+class Priority:
+    """Queue ordering key: lower ``rank`` first, then smaller inputs, then arrival order.
+
+    When an item is dequeued its rank is lowered by one for every ``scheduler_aging_seconds``
+    it has waited (see :func:`age_bonus`), so large files are not starved by a stream of
+    small ones of the same source.
+    """
+
+    rank: int
+    size: int
+    sequence: int
+
+
+@dataclass
+class _Entry:
+    location: str
+    lane: str
+    priority: Priority
+    kwargs: Dict[str, Any]
+    future: asyncio.Future[str]
+    stop: Optional[asyncio.Event] = field(default=None, repr=False)
+    probe: bool = False
+    queued_at: float = field(default_factory=time.monotonic)
+    # Identifies the entry's current place in a lane queue; stale references are skipped.
+    token: Optional[object] = field(default=None, repr=False)
+
+
+def source_rank(source: str) -> int:
+    return settings.source_priorities.get(source, settings.default_source_priority)
+
+
+def age_bonus(waited: float) -> int:
+    """Ranks an item gains after waiting ``waited`` seconds.
+
+    The bonus stays below the smallest gap between source ranks, so ageing reorders work
+    within a source but never lets a backfill overtake an interactive upload.
+    """
+
+    if settings.scheduler_aging_seconds <= 0:
+        return 0
+    ranks = sorted({*settings.source_priorities.values(), settings.default_source_priority})
+    gaps = [later - earlier for earlier, later in zip(ranks[:-1], ranks[1:], strict=True)]
+    bonus = int(waited / settings.scheduler_aging_seconds)
+    return min(bonus, min(gaps) - 1) if gaps else bonus
+
+
+class _LaneQueue:
+    """Queued entries of one lane, indexed per rank by size and by arrival.
+
+    The best entry of a rank after ageing is either its smallest one or, having waited the
+    longest, its oldest one, so dequeuing compares two candidates per distinct rank.
+    Dequeued entries are dropped from the indexes lazily.
+    """
+
+    def __init__(self) -> None:
+        self._by_size: Dict[int, List[Tuple[int, int, object, _Entry]]] = {}
+        self._by_arrival: Dict[int, Deque[Tuple[object, _Entry]]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[_Entry]:
+        for arrivals in self._by_arrival.values():
+            yield from (entry for token, entry in arrivals if entry.token is token)
+
+    def push(self, entry: _Entry) -> None:
+        token = entry.token = object()
+        rank, size, sequence = entry.priority.rank, entry.priority.size, entry.priority.sequence
+        heapq.heappush(self._by_size.setdefault(rank, []), (size, sequence, token, entry))
+        self._by_arrival.setdefault(rank, deque()).append((token, entry))
+        self._count += 1
+
+    def pop(self) -> _Entry:
+        now = time.monotonic()
+        best: Optional[Tuple[Tuple[int, int, int], _Entry]] = None
+        for rank in list(self._by_size):
+            by_size, arrivals = self._by_size[rank], self._by_arrival[rank]
+            while by_size and by_size[0][3].token is not by_size[0][2]:
+                heapq.heappop(by_size)
+            while arrivals and arrivals[0][1].token is not arrivals[0][0]:
+                arrivals.popleft()
+            if not by_size:
+                del self._by_size[rank], self._by_arrival[rank]
+                continue
+            for entry in (by_size[0][3], arrivals[0][1]):
+                key = (
+                    rank - age_bonus(now - entry.queued_at),
+                    entry.priority.size,
+                    entry.priority.sequence,
+                )
+                if best is None or key < best[0]:
+                    best = (key, entry)
+        if best is None:
+            raise IndexError("pop from an empty lane queue")
+        entry = best[1]
+        entry.token = None
+        self._count -= 1
+        return entry
+
+    def clear(self) -> None:
+        self._by_size.clear()
+        self._by_arrival.clear()
+        self._count = 0
+
+
+def _pdf_lacks_text(path: Path) -> bool:
+    """Return ``True`` when the first pages of ``path`` have no text layer (OCR likely)."""
+
+    try:
+        # Only the presence of text matters here, so the fastest engine decides.
+        with open_pdf_text(path, "pdfium") as document:
+            pages = range(min(len(document), settings.scheduler_ocr_probe_pages))
+            return not any(document.page_text(index).strip() for index in pages)
+    except Exception:  # pragma: no cover - unreadable PDFs fail later in the flow
+        return False
+
+
+def estimate(location: str) -> Tuple[str, int]:
+    """Return ``(lane, size_in_bytes)`` for a path or archive member locator.
+
+    Images and large PDFs go to the heavy lane, since they need OCR or dominate parse time;
+    everything else is light work. Only metadata is read: whether a small PDF lacks a text
+    layer is probed when it is dequeued (see ``IngestionScheduler``).
+    """
+
+    member = split_locator(location)
+    try:
+        if member is None:
+            size = Path(location).stat().st_size
+            suffix = Path(location).suffix.lower()
+        else:
+            archive, name = member
+            size = archive_reader.size(archive, name)
+            suffix = Path(name).suffix.lower()
+    except (OSError, ValueError):
+        # Missing or unreadable inputs fail fast in the flow; do not let them wait.
+        return "light", 0
+    if suffix in OCR_SUFFIXES:
+        return "heavy", size
+    if suffix == ".pdf" and size >= settings.scheduler_heavy_bytes:
+        return "heavy", size
+    return "light", size
+
+
+def _needs_probe(location: str, lane: str) -> bool:
+    """Whether a light-lane ``location`` is a PDF on disk that may turn out to need OCR."""
+
+    return (
+        lane == "light"
+        and settings.enable_ocr
+        and location.lower().endswith(".pdf")
+        and split_locator(location) is None
+    )
+
+
+class IngestionScheduler:
+    """Priority queue in front of the ingestion flow with separate worker lanes.
+
+    Work is ordered by an explicit priority hint or the rank of its source (interactive
+    uploads before API triggers before bulk folder backfills), then smallest first. Heavy
+    items such as large or scanned PDFs run in their own lane so they cannot occupy the
+    workers that light documents are waiting for. Submitting only stats the input; a small
+    PDF is checked for a text layer when a light worker dequeues it, and moved to the heavy
+    lane if it has none.
+    """
+
+    def __init__(self, runner: Runner, workers: Optional[Dict[str, int]] = None) -> None:
+        self._runner = runner
+        self._workers = workers
+        self._sequence = itertools.count()
+        self._queues: Dict[str, _LaneQueue] = {lane: _LaneQueue() for lane in LANES}
+        self._active: Dict[str, int] = dict.fromkeys(LANES, 0)
+        self._running: Dict[str, int] = dict.fromkeys(LANES, 0)
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    def worker_counts(self) -> Dict[str, int]:
+        if self._workers is not None:
+            return dict(self._workers)
+        return {
+            "light": max(1, settings.ingestion_concurrency),
+            "heavy": max(1, settings.ingestion_heavy_concurrency),
+        }
+
+    async def submit(
+        self,
+        location: str,
+        *,
+        source: str,
+        priority: Optional[int] = None,
+        lane: Optional[str] = None,
+        stop: Optional[asyncio.Event] = None,
+        **kwargs: Any,
+    ) -> asyncio.Future[str]:
+        """Queue ``location`` and return a future resolving to its external id.
+
+        ``priority`` overrides the source rank (lower runs sooner) and ``lane`` overrides
+        the estimated lane. Entries still queued when ``stop`` is set are cancelled.
+        """
+
+        estimated_lane, size = await asyncio.to_thread(estimate, location)
+        probe = lane not in LANES and _needs_probe(location, estimated_lane)
+        lane = lane if lane in LANES else estimated_lane
+        rank = priority if priority is not None else source_rank(source)
+        entry = _Entry(
+            location=location,
+            lane=lane,
+            priority=Priority(rank=rank, size=size, sequence=next(self._sequence)),
+            kwargs={"source": source, **kwargs},
+            future=asyncio.get_running_loop().create_future(),
+            stop=stop,
+            probe=probe,
+        )
+        self._enqueue(entry)
+        return entry.future
+
+    def _enqueue(self, entry: _Entry) -> None:
+        self._queues[entry.lane].push(entry)
+        self._dispatch(entry.lane)
+
+    async def run(self, location: str, **kwargs: Any) -> str:
+        """Queue ``location`` and wait for it to be ingested."""
+
+        return await (await self.submit(location, **kwargs))
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        counts = self.worker_counts()
+        return {
+            lane: {
+                "queued": len(self._queues[lane]),
+                "running": self._running[lane],
+                "workers": counts[lane],
+            }
+            for lane in LANES
+        }
+
+    async def shutdown(self) -> None:
+        for queue in self._queues.values():
+            for entry in queue:
+                entry.future.cancel()
+            queue.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _dispatch(self, lane: str) -> None:
+        # Workers are started on demand and exit once their lane is drained, so no task
+        # outlives the event loop it was created on.
+        limit = self.worker_counts()[lane]
+        loop = asyncio.get_running_loop()
+        while self._active[lane] < limit and self._queues[lane]:
+            self._active[lane] += 1
+            task = loop.create_task(self._drain(lane))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, lane: str) -> None:
+        queue = self._queues[lane]
+        try:
+            while queue:
+                entry = queue.pop()
+                if entry.future.done():
+                    continue
+                if entry.stop is not None and entry.stop.is_set():
+                    entry.future.cancel()
+                    continue
+                if entry.probe:
+                    entry.probe = False
+                    if await asyncio.to_thread(_pdf_lacks_text, Path(entry.location)):
+                        entry.lane = "heavy"
+                        self._enqueue(entry)
+                        continue
+                await self._execute(lane, entry)
+        finally:
+            self._active[lane] -= 1
+
+    async def _execute(self, lane: str, entry: _Entry) -> None:
+        self._running[lane] += 1
+        try:
+            result = await self._runner(entry.location, **entry.kwargs)
+        except asyncio.CancelledError:
+            entry.future.cancel()
+            raise
+        except Exception as exc:
+            if not entry.future.done():
+                entry.future.set_exception(exc)
+        else:
+            if not entry.future.done():
+                entry.future.set_result(result)
+        finally:
+            self._running[lane] -= 1
+
+
+__all__ = ["LANES", "IngestionScheduler", "Priority", "age_bonus", "estimate", "source_rank"]
@@ -2,30 +2,81 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import mimetypes
+import os
+import tempfile
 from pathlib import Path
-from typing import Tuple
+from typing import IO, AsyncIterable, Optional, Tuple
 
 from ..config import settings
+from .archives import ARCHIVE_SUFFIXES
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
 
 
 class StorageService:
-    """Persist files to durable storage and expose helper utilities."""
+    """Persist files to durable storage and expose helper utilities.
+
+    Uploads are content addressed: each file is stored once under
+    ``<base>/<checksum[:2]>/<checksum><suffix>`` so identical uploads share a path and a
+    later upload with the same name never overwrites an earlier one.
+    """
 
     def __init__(self, base_directory: Path | None = None) -> None:
         self.base_directory = base_directory or settings.storage_directory
         self.base_directory.mkdir(parents=True, exist_ok=True)
+        self.incoming_directory = self.base_directory / ".incoming"
+
+    def content_path(self, checksum: str, filename: str) -> Path:
+        """Return the content-addressed location for a file with ``checksum``."""
+
+        name = Path(filename).name.lower()
+        # Keep compound archive suffixes such as ``.tar.gz`` so archives stay recognisable.
+        suffix = next(
+            (suffix for suffix in ARCHIVE_SUFFIXES if name.endswith(suffix) and name != suffix),
+            Path(name).suffix,
+        )
+        return self.base_directory / checksum[:2] / f"{checksum}{suffix}"
 
-    def save_upload(self, filename: str, data: bytes) -> Tuple[Path, str, str]:
-        """Persist an uploaded file and return (path, checksum, mime type)."""
+    async def save_stream(
+        self,
+        filename: str,
+        chunks: AsyncIterable[bytes],
+        *,
+        max_bytes: Optional[int] = None,
+    ) -> Tuple[Path, str, str]:
+        """Spool ``chunks`` to disk while hashing and return (path, checksum, mime type).
 
-        sanitized = Path(filename).name
-        destination = self.base_directory / sanitized
-        destination.write_bytes(data)
-        checksum = hashlib.sha256(data).hexdigest()
-        mime_type, _ = mimetypes.guess_type(destination.name)
-        return destination, checksum, mime_type or "application/octet-stream"
+        Only one chunk is held in memory at a time. The file is written to a temporary
+        location and renamed into content-addressed storage once complete; if it grows past
+        ``max_bytes`` (default ``settings.max_upload_bytes``) the partial file is discarded
+        and :class:`UploadTooLargeError` is raised.
+        """
+
+        limit = max_bytes if max_bytes is not None else settings.max_upload_bytes
+        hasher = hashlib.sha256()
+        size = 0
+        handle = self._open_temporary()
+        try:
+            with handle:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > limit:
+                        raise UploadTooLargeError(f"Upload exceeds the {limit} byte limit")
+                    hasher.update(chunk)
+                    await asyncio.to_thread(handle.write, chunk)
+            checksum = hasher.hexdigest()
+            destination = await asyncio.to_thread(
+                self._commit, Path(handle.name), checksum, filename
+            )
+        except BaseException:
+            Path(handle.name).unlink(missing_ok=True)
+            raise
+        return destination, checksum, self.detect_mime_type(destination)
 
     def compute_checksum(self, path: Path) -> str:
         """Compute the SHA256 checksum for a file on disk."""
@@ -42,5 +93,18 @@ class StorageService:
         mime_type, _ = mimetypes.guess_type(path.name)
         return mime_type or "application/octet-stream"
 
+    def _open_temporary(self) -> IO[bytes]:
+        self.incoming_directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.incoming_directory, delete=False)
+
+    def _commit(self, temporary: Path, checksum: str, filename: str) -> Path:
+        destination = self.content_path(checksum, filename)
+        if destination.exists():
+            temporary.unlink(missing_ok=True)
+            return destination
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporary, destination)
+        return destination
+
 
 storage_service = StorageService()
@@ -0,0 +1,367 @@
+"""Incremental folder synchronisation backed by a file manifest and watchfiles."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, or_, select
+from watchfiles import awatch
+
+from ..config import settings
+from ..database import Document, FileManifestEntry, IngestionJobItem, get_session
+from .admission import Reservation
+from .ingestion import IngestionOutcome, ingest_many, remove_documents
+from .jobs import ACTIVE_STATUSES, job_manager
+from .storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncReport:
+    """Summary of one synchronisation pass over a folder."""
+
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    failed: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class _Candidate:
+    path: Path
+    size: int
+    mtime: float
+    checksum: Optional[str] = None
+
+
+@dataclass
+class SyncPlan:
+    """What one synchronisation pass has to do, worked out before anything changes."""
+
+    root: Path
+    report: SyncReport = field(default_factory=SyncReport)
+    to_ingest: List[_Candidate] = field(default_factory=list)
+    # Path of each changed file to the id of the document it replaces.
+    stale: Dict[str, str] = field(default_factory=dict)
+    deleted: List[FileManifestEntry] = field(default_factory=list)
+
+    @property
+    def sizes(self) -> Dict[str, int]:
+        """Bytes to ingest per path, for admission control."""
+
+        return {str(candidate.path): candidate.size for candidate in self.to_ingest}
+
+
+class FolderSyncService:
+    """Keep the index in step with a folder by ingesting only what changed.
+
+    A manifest of path, size, mtime, checksum and document id is kept per file. Files whose
+    size and mtime are unchanged are skipped without being read; files whose stat changed
+    are re-hashed and only re-ingested if their content differs; the previous document is
+    removed once the new content has been ingested. Files that disappear have their
+    documents removed from the database, graph and retrieval index.
+
+    :meth:`sync` ingests in the calling task, as the watcher does. :meth:`plan` and
+    :meth:`submit` split a pass so the ingestion runs as a background job instead.
+    """
+
+    def __init__(self) -> None:
+        self._watchers: Dict[str, asyncio.Task[None]] = {}
+        self._stops: Dict[str, asyncio.Event] = {}
+        self._settling: Set[asyncio.Task[SyncReport]] = set()
+        self._lock = asyncio.Lock()
+
+    async def sync(self, folder: Path, paths: Optional[Iterable[Path]] = None) -> SyncReport:
+        """Synchronise ``folder``, or only ``paths`` within it when given."""
+
+        root = folder.resolve()
+        async with self._lock:
+            plan = await self._plan(root, None if paths is None else [Path(p) for p in paths])
+            await self._remove_deleted(plan)
+            outcomes = await ingest_many(
+                [candidate.path for candidate in plan.to_ingest], source="sync"
+            )
+            return await self._apply(plan, outcomes)
+
+    async def plan(self, folder: Path) -> SyncPlan:
+        """Work out what synchronising ``folder`` involves, without ingesting or removing."""
+
+        async with self._lock:
+            return await self._plan(folder.resolve(), None)
+
+    async def submit(
+        self,
+        plan: SyncPlan,
+        *,
+        priority: Optional[int] = None,
+        reservation: Optional[Reservation] = None,
+    ) -> str:
+        """Carry out ``plan`` with a background ingestion job and return the job id.
+
+        Documents of deleted files are removed straight away; the manifest is updated once
+        the job has finished. Should this process stop first, the next pass finds the files
+        again and ingestion recognises the content already indexed by its checksum.
+        """
+
+        async with self._lock:
+            await self._remove_deleted(plan)
+            job_id = await job_manager.submit(
+                [candidate.path for candidate in plan.to_ingest],
+                source="sync",
+                priority=priority,
+                reservation=reservation,
+            )
+        task = asyncio.get_running_loop().create_task(self._settle(plan, job_id))
+        self._settling.add(task)
+        task.add_done_callback(self._settling.discard)
+        return job_id
+
+    async def _settle(self, plan: SyncPlan, job_id: str) -> SyncReport:
+        job = await job_manager.wait(job_id)
+        # In queue mode the job runs in a worker process, so its status is polled.
+        while job is not None and job.status in ACTIVE_STATUSES:
+            await asyncio.sleep(settings.job_progress_interval_seconds)
+            job = await asyncio.to_thread(job_manager.get, job_id)
+        outcomes = await asyncio.to_thread(_job_outcomes, job_id)
+        async with self._lock:
+            report = await self._apply(plan, outcomes)
+        logger.info(
+            "Sync job %s of %s: %d added, %d changed, %d removed, %d failed",
+            job_id,
+            plan.root,
+            len(report.added),
+            len(report.changed),
+            len(report.removed),
+            len(report.failed),
+        )
+        return report
+
+    async def _plan(self, root: Path, paths: Optional[List[Path]]) -> SyncPlan:
+        plan = SyncPlan(root)
+        on_disk = await asyncio.to_thread(self._scan, root, paths)
+        manifest = await asyncio.to_thread(self._load_manifest, root, paths)
+        for key, candidate in on_disk.items():
+            entry = manifest.get(key)
+            if entry is None:
+                plan.to_ingest.append(candidate)
+                continue
+            if entry.size == candidate.size and entry.mtime == candidate.mtime:
+                plan.report.unchanged += 1
+                continue
+            candidate.checksum = await asyncio.to_thread(
+                storage_service.compute_checksum, candidate.path
+            )
+            if candidate.checksum == entry.checksum:
+                await asyncio.to_thread(self._touch, entry, candidate)
+                plan.report.unchanged += 1
+                continue
+            plan.stale[entry.path] = entry.external_id
+            plan.to_ingest.append(candidate)
+        plan.deleted = [entry for key, entry in manifest.items() if key not in on_disk]
+        return plan
+
+    async def _remove_deleted(self, plan: SyncPlan) -> None:
+        if not plan.deleted:
+            return
+        await asyncio.to_thread(remove_documents, [entry.external_id for entry in plan.deleted])
+        await asyncio.to_thread(self._forget, [entry.path for entry in plan.deleted])
+        plan.report.removed = sorted(entry.path for entry in plan.deleted)
+
+    async def _apply(self, plan: SyncPlan, outcomes: List[IngestionOutcome]) -> SyncReport:
+        report = plan.report
+        by_path = {outcome.path: outcome for outcome in outcomes}
+        replaced: List[str] = []
+        for candidate in plan.to_ingest:
+            key = str(candidate.path)
+            outcome = by_path.get(key)
+            if outcome is None or not outcome.succeeded or outcome.external_id is None:
+                # A changed file keeps its previous document until a replacement is indexed.
+                error = outcome.error if outcome is not None else "not ingested"
+                report.failed.append({"path": key, "error": error or "unknown error"})
+                continue
+            await asyncio.to_thread(self._remember, plan.root, candidate, outcome.external_id)
+            if key in plan.stale:
+                replaced.append(plan.stale[key])
+                report.changed.append(key)
+            else:
+                report.added.append(key)
+        if replaced:
+            await asyncio.to_thread(remove_documents, replaced)
+        return report
+
+    def start_watch(self, folder: Path) -> bool:
+        """Watch ``folder`` in the background; returns ``False`` if already watched."""
+
+        root = folder.resolve()
+        key = str(root)
+        if key in self._watchers:
+            return False
+        stop = asyncio.Event()
+        task = asyncio.get_running_loop().create_task(self._watch(root, stop))
+        self._watchers[key] = task
+        self._stops[key] = stop
+        task.add_done_callback(lambda _: self._forget_watcher(key))
+        return True
+
+    async def stop_watch(self, folder: Path) -> bool:
+        key = str(folder.resolve())
+        stop = self._stops.get(key)
+        task = self._watchers.get(key)
+        if stop is None or task is None:
+            return False
+        stop.set()
+        await asyncio.gather(task, return_exceptions=True)
+        return True
+
+    def watched(self) -> List[str]:
+        return sorted(self._watchers)
+
+    async def shutdown(self) -> None:
+        for task in self._settling:
+            task.cancel()
+        for stop in self._stops.values():
+            stop.set()
+        if self._watchers:
+            await asyncio.gather(*self._watchers.values(), return_exceptions=True)
+
+    async def _watch(self, root: Path, stop: asyncio.Event) -> None:
+        # Catch up on anything that changed while the folder was not being watched.
+        await self.sync(root)
+        async for changes in awatch(
+            root,
+            debounce=settings.watch_debounce_ms,
+            step=settings.watch_step_ms,
+            stop_event=stop,
+        ):
+            changed = {Path(path) for _, path in changes}
+            try:
+                report = await self.sync(root, changed)
+            except Exception:  # pragma: no cover - keep the watcher alive
+                logger.exception("Folder sync of %s failed", root)
+                continue
+            logger.info(
+                "Synced %s: %d added, %d changed, %d removed, %d failed",
+                root,
+                len(report.added),
+                len(report.changed),
+                len(report.removed),
+                len(report.failed),
+            )
+
+    def _forget_watcher(self, key: str) -> None:
+        self._watchers.pop(key, None)
+        self._stops.pop(key, None)
+
+    def _scan(self, root: Path, paths: Optional[List[Path]]) -> Dict[str, _Candidate]:
+        if paths is None:
+            files: Iterable[Path] = root.rglob("*")
+        else:
+            files = self._expand(paths)
+        candidates: Dict[str, _Candidate] = {}
+        for path in files:
+            if path.suffix.lower() not in settings.allowed_extensions:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if not path.is_file():
+                continue
+            resolved = path.resolve()
+            candidates[str(resolved)] = _Candidate(resolved, stat.st_size, stat.st_mtime)
+        return candidates
+
+    @staticmethod
+    def _expand(paths: List[Path]) -> Set[Path]:
+        expanded: Set[Path] = set()
+        for path in paths:
+            if path.is_dir():
+                expanded.update(path.rglob("*"))
+            else:
+                expanded.add(path)
+        return expanded
+
+    def _load_manifest(
+        self, root: Path, paths: Optional[List[Path]]
+    ) -> Dict[str, FileManifestEntry]:
+        query = select(FileManifestEntry).where(FileManifestEntry.root == str(root))
+        if paths is not None:
+            resolved = [str(path.resolve()) for path in paths]
+            if not resolved:
+                return {}
+            # A changed path may be a file or a whole directory that was moved or deleted.
+            query = query.where(
+                or_(
+                    FileManifestEntry.path.in_(resolved),
+                    *(FileManifestEntry.path.startswith(prefix + os.sep) for prefix in resolved),
+                )
+            )
+        with get_session() as session:
+            return {entry.path: entry for entry in session.scalars(query)}
+
+    def _remember(self, root: Path, candidate: _Candidate, external_id: str) -> None:
+        with get_session() as session:
+            checksum = candidate.checksum or session.scalar(
+                select(Document.checksum).where(Document.external_id == external_id)
+            )
+            entry = session.scalar(
+                select(FileManifestEntry).where(FileManifestEntry.path == str(candidate.path))
+            )
+            if entry is None:
+                entry = FileManifestEntry(root=str(root), path=str(candidate.path))
+                session.add(entry)
+            entry.size = candidate.size
+            entry.mtime = candidate.mtime
+            entry.checksum = checksum or ""
+            entry.external_id = external_id
+
+    def _touch(self, entry: FileManifestEntry, candidate: _Candidate) -> None:
+        with get_session() as session:
+            stored = session.get(FileManifestEntry, entry.id)
+            if stored is not None:
+                stored.size = candidate.size
+                stored.mtime = candidate.mtime
+
+    def _forget(self, paths: List[str]) -> None:
+        if not paths:
+            return
+        with get_session() as session:
+            session.execute(delete(FileManifestEntry).where(FileManifestEntry.path.in_(paths)))
+
+
+def _job_outcomes(job_id: str) -> List[IngestionOutcome]:
+    """Outcomes of the finished items of an ingestion job."""
+
+    with get_session() as session:
+        items = session.execute(
+            select(
+                IngestionJobItem.path,
+                IngestionJobItem.status,
+                IngestionJobItem.external_id,
+                IngestionJobItem.error_message,
+            ).where(
+                IngestionJobItem.job_id == job_id,
+                IngestionJobItem.status.in_(("done", "failed")),
+            )
+        ).all()
+    return [
+        IngestionOutcome(
+            path=item.path,
+            external_id=item.external_id if item.status == "done" else None,
+            error=item.error_message,
+        )
+        for item in items
+    ]
+
+
+folder_sync_service = FolderSyncService()
+
+
+__all__ = ["FolderSyncService", "SyncPlan", "SyncReport", "folder_sync_service"]
@@ -0,0 +1,66 @@
+"""Per-stage timing of ingestion runs and percentile summaries across runs."""
+
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimer:
+    """Accumulate wall-clock seconds spent in named stages of a single run.
+
+    ``with timer.stage("parse"): ...`` adds the elapsed time to ``parse``; the block may
+    contain ``await`` expressions, so time spent waiting on executors or batched writes is
+    attributed to the stage that waited for it.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 6)
+
+
+def _summarise(values: Sequence[float]) -> Dict[str, float]:
+    samples = np.asarray(values, dtype=float)
+    summary = {"count": float(samples.size), "mean": float(samples.mean())}
+    for percentile, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES), strict=True):
+        summary[f"p{percentile}"] = float(value)
+    summary["max"] = float(samples.max())
+    return summary
+
+
+def summarise_stage_timings(
+    runs: Iterable[Tuple[Optional[str], Optional[Dict[str, float]]]],
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Return percentile summaries per stage, overall and per mime type.
+
+    ``runs`` yields ``(mime_type, stage_timings)`` pairs. The result maps ``"all"`` and each
+    mime type to ``{stage: {"count", "mean", "p50", "p90", "p95", "p99", "max"}}``; stages a
+    run never reached (e.g. OCR for text files) contribute no sample.
+    """
+
+    samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for mime_type, timings in runs:
+        for stage, seconds in (timings or {}).items():
+            samples["all"][stage].append(seconds)
+            samples[mime_type or "unknown"][stage].append(seconds)
+    return {
+        group: {stage: _summarise(values) for stage, values in stages.items()}
+        for group, stages in samples.items()
+    }
+
+
+__all__ = ["PERCENTILES", "StageTimer", "summarise_stage_timings"]
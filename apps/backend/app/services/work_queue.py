@@ -0,0 +1,342 @@
+"""Durable, database-backed ingestion work queue with leases.
+
+In ``queue`` mode the API only writes ``work_items`` rows; worker processes started with
+``python -m app.worker`` claim them in batches. A claim stamps the rows with a lease token
+and expiry using a conditional ``UPDATE``, so concurrent claimers never receive the same
+row and no external broker is needed. Workers renew leases with heartbeats while items are
+in flight; items whose lease expires (e.g. the worker crashed) become claimable again until
+``settings.worker_max_attempts`` claims have been made, after which they are failed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from uuid import uuid4
+
+from sqlalchemy import ColumnElement, and_, false, func, insert, literal, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import Document, IngestionJob, IngestionJobItem, WorkItem, get_session, utc_now
+from .scheduler import source_rank
+
+ACTIVE_STATUSES = ("queued", "leased")
+
+
+@dataclass(frozen=True)
+class ClaimedItem:
+    """A leased work item; ``token`` must be presented to renew or complete it."""
+
+    id: int
+    token: str
+    path: str
+    source: str
+    force: bool
+    priority: int
+    attempts: int
+    job_id: Optional[str] = None
+    job_item_id: Optional[int] = None
+    original_filename: Optional[str] = None
+
+
+def _claimable(now: datetime) -> ColumnElement[bool]:
+    return or_(
+        WorkItem.status == "queued",
+        and_(WorkItem.status == "leased", WorkItem.lease_expires_at < now),
+    )
+
+
+class WorkQueue:
+    """Enqueue, claim, renew and complete ``WorkItem`` rows."""
+
+    def enqueue(
+        self,
+        paths: Sequence[str],
+        *,
+        source: str,
+        force: bool = False,
+        priority: Optional[int] = None,
+    ) -> List[int]:
+        """Queue standalone paths (not tied to a job) and return their item ids."""
+
+        rank = priority if priority is not None else source_rank(source)
+        with get_session() as session:
+            result = session.execute(
+                insert(WorkItem).returning(WorkItem.id),
+                [
+                    {"path": str(path), "source": source, "force": force, "priority": rank}
+                    for path in paths
+                ],
+            )
+            return [row.id for row in result]
+
+    def enqueue_job(
+        self,
+        session: Session,
+        job_id: str,
+        *,
+        source: str,
+        force: bool = False,
+        priority: Optional[int] = None,
+    ) -> int:
+        """Queue the pending manifest items of ``job_id`` within the caller's transaction."""
+
+        rank = priority if priority is not None else source_rank(source)
+        now = utc_now()
+        items = select(
+            literal(job_id),
+            IngestionJobItem.id,
+            IngestionJobItem.path,
+            IngestionJobItem.original_filename,
+            literal(source),
+            true() if force else false(),
+            literal(rank),
+            literal("queued"),
+            literal(0),
+            literal(now),
+            literal(now),
+        ).where(IngestionJobItem.job_id == job_id, IngestionJobItem.status == "pending")
+        columns = [
+            "job_id",
+            "job_item_id",
+            "path",
+            "original_filename",
+            "source",
+            "force",
+            "priority",
+            "status",
+            "attempts",
+            "created_at",
+            "updated_at",
+        ]
+        result = session.execute(insert(WorkItem).from_select(columns, items))
+        return result.rowcount or 0
+
+    def claim(
+        self, owner: str, limit: Optional[int] = None, lease_seconds: Optional[float] = None
+    ) -> List[ClaimedItem]:
+        """Lease up to ``limit`` claimable items, highest priority (lowest rank) first."""
+
+        limit = limit or settings.worker_batch_size
+        lease = settings.worker_lease_seconds if lease_seconds is None else lease_seconds
+        now = utc_now()
+        token = uuid4().hex
+        with get_session() as session:
+            self._fail_exhausted(session, now)
+            candidates = session.scalars(
+                select(WorkItem.id)
+                .where(_claimable(now))
+                .order_by(WorkItem.priority, WorkItem.id)
+                .limit(limit)
+            ).all()
+            if not candidates:
+                return []
+            # Re-checking the claim condition makes the update a compare-and-set: rows
+            # another worker leased since the select are left alone.
+            session.execute(
+                update(WorkItem)
+                .where(WorkItem.id.in_(candidates), _claimable(now))
+                .values(
+                    status="leased",
+                    lease_token=token,
+                    lease_owner=owner,
+                    lease_expires_at=now + timedelta(seconds=lease),
+                    heartbeat_at=now,
+                    attempts=WorkItem.attempts + 1,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = session.scalars(
+                select(WorkItem).where(WorkItem.lease_token == token).order_by(WorkItem.id)
+            ).all()
+            job_ids = {row.job_id for row in rows if row.job_id}
+            if job_ids:
+                session.execute(
+                    update(IngestionJob)
+                    .where(IngestionJob.job_id.in_(job_ids), IngestionJob.status == "queued")
+                    .values(status="running", started_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            return [
+                ClaimedItem(
+                    id=row.id,
+                    token=token,
+                    path=row.path,
+                    source=row.source,
+                    force=row.force,
+                    priority=row.priority,
+                    attempts=row.attempts,
+                    job_id=row.job_id,
+                    job_item_id=row.job_item_id,
+                    original_filename=row.original_filename,
+                )
+                for row in rows
+            ]
+
+    def heartbeat(self, token: str, lease_seconds: Optional[float] = None) -> int:
+        """Extend the lease of every item still held under ``token``; return how many."""
+
+        lease = settings.worker_lease_seconds if lease_seconds is None else lease_seconds
+        now = utc_now()
+        with get_session() as session:
+            result = session.execute(
+                update(WorkItem)
+                .where(WorkItem.lease_token == token, WorkItem.status == "leased")
+                .values(lease_expires_at=now + timedelta(seconds=lease), heartbeat_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount or 0
+
+    def complete(
+        self,
+        item: ClaimedItem,
+        *,
+        external_id: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Record the outcome of ``item``; ``False`` if its lease was lost to another worker."""
+
+        now = utc_now()
+        status = "done" if external_id is not None else "failed"
+        with get_session() as session:
+            result = session.execute(
+                update(WorkItem)
+                .where(
+                    WorkItem.id == item.id,
+                    WorkItem.lease_token == item.token,
+                    WorkItem.status == "leased",
+                )
+                .values(
+                    status=status,
+                    external_id=external_id,
+                    error_message=error,
+                    lease_token=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if not result.rowcount:
+                return False
+            if item.job_id is not None:
+                self._record_job_item(session, item.job_id, item.job_item_id, external_id, error)
+                self._settle_job(session, item.job_id)
+        return True
+
+    def cancel_job(self, job_id: str) -> int:
+        """Drop the job's items that no worker has claimed yet; return how many."""
+
+        with get_session() as session:
+            result = session.execute(
+                update(WorkItem)
+                .where(WorkItem.job_id == job_id, WorkItem.status == "queued")
+                .values(status="cancelled", updated_at=utc_now())
+                .execution_options(synchronize_session=False)
+            )
+            self._settle_job(session, job_id)
+            return result.rowcount or 0
+
+    def settle_jobs(self) -> None:
+        """Close active jobs whose items are all finished (safety net for racing workers)."""
+
+        with get_session() as session:
+            job_ids = session.scalars(
+                select(IngestionJob.job_id).where(IngestionJob.status.in_(("queued", "running")))
+            ).all()
+            for job_id in job_ids:
+                queued_items = session.scalar(select(func.count()).where(WorkItem.job_id == job_id))
+                if queued_items:
+                    self._settle_job(session, job_id)
+
+    def pending_count(self, source: Optional[str] = None) -> int:
+        query = select(func.count()).where(WorkItem.status.in_(ACTIVE_STATUSES))
+        if source is not None:
+            query = query.where(WorkItem.source == source)
+        with get_session() as session:
+            return session.scalar(query) or 0
+
+    def stats(self) -> Dict[str, int]:
+        with get_session() as session:
+            rows = session.execute(
+                select(WorkItem.status, func.count()).group_by(WorkItem.status)
+            ).all()
+        return {status: count for status, count in rows}
+
+    def _fail_exhausted(self, session: Session, now: datetime) -> None:
+        exhausted = session.scalars(
+            select(WorkItem).where(
+                WorkItem.status == "leased",
+                WorkItem.lease_expires_at < now,
+                WorkItem.attempts >= settings.worker_max_attempts,
+            )
+        ).all()
+        for row in exhausted:
+            error = f"Lease expired after {row.attempts} attempts"
+            row.status = "failed"
+            row.error_message = error
+            row.lease_token = None
+            if row.job_id is not None:
+                self._record_job_item(session, row.job_id, row.job_item_id, None, error)
+        session.flush()
+        for job_id in {row.job_id for row in exhausted if row.job_id}:
+            self._settle_job(session, job_id)
+
+    @staticmethod
+    def _record_job_item(
+        session: Session,
+        job_id: str,
+        job_item_id: Optional[int],
+        external_id: Optional[str],
+        error: Optional[str],
+    ) -> None:
+        succeeded = external_id is not None
+        if job_item_id is not None:
+            checksum = (
+                session.scalar(select(Document.checksum).where(Document.external_id == external_id))
+                if succeeded
+                else None
+            )
+            session.execute(
+                update(IngestionJobItem)
+                .where(IngestionJobItem.id == job_item_id)
+                .values(
+                    status="done" if succeeded else "failed",
+                    external_id=external_id,
+                    checksum=checksum,
+                    error_message=error,
+                    updated_at=utc_now(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        # Counters are incremented in SQL so concurrent workers do not lose updates.
+        counter = IngestionJob.processed if succeeded else IngestionJob.failed
+        session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.job_id == job_id)
+            .values({counter: counter + 1})
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _settle_job(session: Session, job_id: str) -> None:
+        remaining = session.scalar(
+            select(func.count()).where(
+                WorkItem.job_id == job_id, WorkItem.status.in_(ACTIVE_STATUSES)
+            )
+        )
+        if remaining:
+            return
+        job = session.scalars(select(IngestionJob).where(IngestionJob.job_id == job_id)).first()
+        if job is None or job.status not in ("queued", "running"):
+            return
+        job.status = "cancelled" if job.cancel_requested else "completed"
+        job.completed_at = utc_now()
+
+
+work_queue = WorkQueue()
+
+
+__all__ = ["ACTIVE_STATUSES", "ClaimedItem", "WorkQueue", "work_queue"]
@@ -0,0 +1,183 @@
+"""Ingestion worker processes draining the durable work queue.
+
+Run ``python -m app.worker --processes 4`` next to an API started with
+``DISCOVERY_INGESTION_QUEUE_MODE=queue``. Every process claims batches of work items under a
+lease, ingests them through its own scheduler lanes and stage executors, and heartbeats the
+lease while the batch is in flight. Throughput scales by adding processes or nodes that
+point at the same database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from typing import List, Optional, Sequence
+
+from .config import settings
+from .database import init_db
+from .services.work_queue import ClaimedItem, work_queue
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionWorker:
+    """Claim, ingest and complete work items until stopped (or, with ``drain``, idle)."""
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        *,
+        batch_size: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+    ) -> None:
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size or settings.worker_batch_size
+        self.lease_seconds = lease_seconds or settings.worker_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.worker_heartbeat_seconds
+        self.poll_seconds = settings.worker_poll_seconds if poll_seconds is None else poll_seconds
+
+    async def run(self, stop: Optional[asyncio.Event] = None, *, drain: bool = False) -> int:
+        """Process batches until ``stop`` is set; return the number of items completed.
+
+        With ``drain`` the worker returns as soon as no claimable item is left.
+        """
+
+        stop = stop or asyncio.Event()
+        completed = 0
+        while not stop.is_set():
+            items = await asyncio.to_thread(
+                work_queue.claim, self.name, self.batch_size, self.lease_seconds
+            )
+            if not items:
+                await asyncio.to_thread(work_queue.settle_jobs)
+                if drain:
+                    break
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            completed += await self.process(items)
+        return completed
+
+    async def process(self, items: Sequence[ClaimedItem]) -> int:
+        """Ingest one claimed batch while renewing its lease; return items completed."""
+
+        done = asyncio.Event()
+        heartbeat = asyncio.ensure_future(self._heartbeat(items[0].token, done))
+        try:
+            results = await asyncio.gather(*(self._process_item(item) for item in items))
+        finally:
+            done.set()
+            await heartbeat
+        return sum(results)
+
+    async def _process_item(self, item: ClaimedItem) -> bool:
+        from .services.ingestion import ingestion_scheduler
+
+        external_id: Optional[str] = None
+        error: Optional[str] = None
+        try:
+            external_id = await ingestion_scheduler.run(
+                item.path,
+                source=item.source,
+                priority=item.priority,
+                force=item.force,
+                job_id=item.job_id,
+                filename=item.original_filename,
+            )
+        except Exception as exc:  # the flow has already recorded a dead letter
+            error = str(exc)
+        recorded = await asyncio.to_thread(
+            work_queue.complete, item, external_id=external_id, error=error
+        )
+        if not recorded:
+            logger.warning("Lease on work item %s was lost; result discarded", item.id)
+        return recorded
+
+    async def _heartbeat(self, token: str, done: asyncio.Event) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(done.wait(), timeout=self.heartbeat_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.to_thread(work_queue.heartbeat, token, self.lease_seconds)
+            except Exception:  # pragma: no cover - the next beat or lease expiry recovers
+                logger.exception("Work-queue heartbeat failed")
+
+
+def run_process(index: int, drain: bool = False) -> None:
+    """Entry point of one worker process."""
+
+    logging.basicConfig(
+        level=logging.INFO, format=f"%(asctime)s worker-{index} %(levelname)s %(message)s"
+    )
+    init_db()
+
+    async def _main() -> None:
+        from .services.executors import stage_executor
+        from .services.retrieval import retriever_service
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - e.g. Windows
+                pass
+        worker = IngestionWorker()
+        try:
+            completed = await worker.run(stop, drain=drain)
+        finally:
+            stage_executor.shutdown()
+            # Children started by multiprocessing skip atexit handlers, so index appends not
+            # yet written are flushed here.
+            await asyncio.to_thread(retriever_service.flush)
+        logger.info("Worker %s stopped after %d items", worker.name, completed)
+
+    asyncio.run(_main())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run ingestion workers for the work queue.")
+    parser.add_argument(
+        "--processes", type=int, default=settings.worker_processes, help="worker processes"
+    )
+    parser.add_argument(
+        "--drain", action="store_true", help="exit once no claimable work item is left"
+    )
+    args = parser.parse_args(argv)
+    if args.processes <= 1:
+        run_process(0, args.drain)
+        return
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_process, args=(index, args.drain), name=f"worker-{index}")
+        for index in range(args.processes)
+    ]
+
+    def _forward(signum: int, _: object) -> None:
+        # Children stop gracefully on SIGTERM: claimed batches finish before they exit.
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
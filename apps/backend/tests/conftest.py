@@ -56,6 +56,10 @@ def configure_environment(tmp_path_factory: pytest.TempPathFactory) -> Path:
     os.environ["DISCOVERY_RETRIEVER_INDEX_PATH"] = str(base / "index")
     os.environ["DISCOVERY_TIMELINE_EXPORT_PATH"] = str(base / "timeline.csv")
     os.environ["DISCOVERY_AGENT_CONFIG_PATH"] = str(base / "agents.yaml")
+    os.environ["DISCOVERY_PARSE_CACHE_DIRECTORY"] = str(base / "parse_cache")
+    os.environ["DISCOVERY_ARCHIVE_SPOOL_DIRECTORY"] = str(base / "archive_spool")
+    # Stages run on threads so tests can patch them; process backends are tested explicitly.
+    os.environ["DISCOVERY_STAGE_EXECUTORS"] = '{"parse": "thread", "ocr": "thread"}'
 
     project_root = Path(__file__).resolve().parents[1]
     if str(project_root) not in sys.path:
@@ -71,18 +75,55 @@ def configure_environment(tmp_path_factory: pytest.TempPathFactory) -> Path:
     reload(database)
     database.init_db()
 
+    import app.services.archives as archives
+
+    reload(archives)
+
     import app.services.storage as storage
 
     reload(storage)
 
+    import app.services.dates as dates
+
+    reload(dates)
+
+    import app.services.pdf_text as pdf_text
+
+    reload(pdf_text)
+
+    import app.services.ocr as ocr
+
+    reload(ocr)
+
+    import app.services.formats.pdf as pdf_format
+
+    reload(pdf_format)
+
     import app.services.parser as parser
 
     reload(parser)
 
+    import app.services.parse_cache as parse_cache
+
+    reload(parse_cache)
+
     import app.services.classifier as classifier
 
     reload(classifier)
 
+    import app.services.executors as executors
+
+    executors.stage_executor.shutdown()
+    reload(executors)
+
+    import app.services.graph as graph
+
+    reload(graph)
+
+    import app.services.persistence as persistence
+
+    reload(persistence)
+
     import app.services.retrieval as retrieval
 
     reload(retrieval)
@@ -96,8 +137,40 @@ def configure_environment(tmp_path_factory: pytest.TempPathFactory) -> Path:
 
     reload(agents)
 
+    import app.services.retry as retry
+
+    reload(retry)
+
+    import app.services.scheduler as scheduler
+
+    reload(scheduler)
+
+    import app.services.work_queue as work_queue
+
+    reload(work_queue)
+
+    import app.services.admission as admission
+
+    reload(admission)
+
     import app.services.ingestion as ingestion
 
     reload(ingestion)
 
+    import app.services.jobs as jobs
+
+    reload(jobs)
+
+    import app.services.sync as sync
+
+    reload(sync)
+
+    import app.services.dead_letters as dead_letters
+
+    reload(dead_letters)
+
+    import app.api.routes.ingestion as ingestion_routes
+
+    reload(ingestion_routes)
+
     return base
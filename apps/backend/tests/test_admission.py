@@ -0,0 +1,80 @@
+"""Admission control, 429 backpressure and the ingestion metrics exposition."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+def _documents(folder: Path, count: int) -> list[str]:
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = folder / f"note-{index}.txt"
+        path.write_text(f"Admission note {index} from Ada Lovelace", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def test_limits_reject_while_backlog_is_held(configure_environment, monkeypatch):
+    from app.config import settings
+    from app.services.admission import AdmissionController, AdmissionRejected
+
+    monkeypatch.setattr(settings, "admission_max_queue_depth", 3)
+    monkeypatch.setattr(settings, "admission_source_quotas", {"folder": 2})
+    controller = AdmissionController()
+
+    # A batch larger than the quota is admitted while its source is idle.
+    folder = controller.admit("folder", {"a": 10, "b": 10, "c": 10})
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("api", {"d": 1})
+    assert rejected.value.reason == "queue_depth"
+    assert rejected.value.retry_after == settings.admission_retry_after_seconds
+
+    folder.settle("a")
+    folder.settle("b")
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("folder", {"e": 1, "f": 1})
+    assert rejected.value.reason == "source_quota"
+    api = controller.admit("api", {"d": 1})
+
+    folder.release()
+    api.release()
+    snapshot = controller.snapshot()
+    assert (snapshot["queue_depth"], snapshot["inflight_bytes"]) == (0, 0)
+    assert snapshot["admitted"] == {"folder": 3, "api": 1}
+    assert [entry["reason"] for entry in snapshot["rejected"]] == ["queue_depth", "source_quota"]
+
+
+@pytest.mark.asyncio
+async def test_trigger_returns_429_until_jobs_drain(configure_environment, monkeypatch):
+    from app.api.routes.ingestion import trigger_ingestion
+    from app.config import settings
+    from app.schemas import TriggerIngestionRequest
+    from app.services.admission import admission_controller
+    from app.services.jobs import job_manager
+    from app.services.metrics import render_metrics
+    from fastapi import HTTPException
+
+    monkeypatch.setattr(settings, "admission_max_queue_depth", 2)
+    paths = _documents(Path(configure_environment) / "admission", 3)
+
+    accepted = await trigger_ingestion(TriggerIngestionRequest(documents=paths[:2], source="api"))
+    with pytest.raises(HTTPException) as rejected:
+        await trigger_ingestion(TriggerIngestionRequest(documents=paths[2:], source="api"))
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == str(settings.admission_retry_after_seconds)
+    assert b"discovery_ingest_queue_depth 2.0" in render_metrics()
+
+    job_id = accepted.headers["Location"].rsplit("/", 1)[-1]
+    await job_manager.wait(job_id)
+    assert admission_controller.snapshot()["queue_depth"] == 0
+    retried = await trigger_ingestion(TriggerIngestionRequest(documents=paths[2:], source="api"))
+    await job_manager.wait(retried.headers["Location"].rsplit("/", 1)[-1])
+
+    metrics = render_metrics().decode()
+    assert 'discovery_ingest_admission_rejections_total{reason="queue_depth",source="api"} 1.0' in (
+        metrics
+    )
+    assert 'discovery_ingest_lane_workers{lane="heavy"}' in metrics
@@ -0,0 +1,162 @@
+"""Ingesting ZIP, TAR and mbox members without extracting the archive."""
+
+from __future__ import annotations
+
+import io
+import mailbox
+import tarfile
+import zipfile
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+
+def _build_archives(folder: Path) -> dict[str, Path]:
+    folder.mkdir(parents=True, exist_ok=True)
+    bundle = folder / "production.zip"
+    with zipfile.ZipFile(bundle, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("memos/board.txt", "Board memo from Ada Lovelace dated 2019-11-02.")
+        archive.writestr("exhibits/ledger.json", '{"payee": "Grace Hopper", "amount": "$900"}')
+        archive.writestr("scans/photo.png", b"\x89PNG not really")
+
+    tarball = folder / "custodian.tar"
+    with tarfile.open(tarball, "w") as archive:
+        for name, text in [("a/notes.md", "Notes by Alan Turing"), ("a/skip.bin", "binary")]:
+            payload = text.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(payload)
+            archive.addfile(info, io.BytesIO(payload))
+
+    mail = folder / "export.mbox"
+    box = mailbox.mbox(mail)
+    message = EmailMessage()
+    message["From"] = "katherine@example.com"
+    message["To"] = "dorothy@example.com"
+    message["Subject"] = "Settlement draft"
+    message.set_content("Please review the settlement with Dorothy Vaughan by 2021-06-30.")
+    message.add_attachment(
+        b"Term sheet for Mary Jackson", maintype="text", subtype="plain", filename="terms.txt"
+    )
+    box.add(message)
+    box.flush()
+    box.close()
+    return {"zip": bundle, "tar": tarball, "mbox": mail}
+
+
+def test_listing_skips_unsupported_members_and_streams_the_rest(configure_environment):
+    from app.services.archives import archive_reader, split_locator
+    from app.services.executors import parse_document
+
+    archives = _build_archives(Path(configure_environment) / "archives-list")
+    allowed = [".txt", ".md", ".json"]
+
+    listing = archive_reader.expand(list(archives.values()), allowed)
+
+    names = sorted(split_locator(locator)[1] for locator in listing.members)
+    assert names == [
+        "a/notes.md",
+        "exhibits/ledger.json",
+        "memos/board.txt",
+        "message-000000.txt",
+        "message-000000/terms.txt",
+    ]
+    assert sorted(split_locator(locator)[1] for locator in listing.skipped) == [
+        "a/skip.bin",
+        "scans/photo.png",
+    ]
+
+    parsed = parse_document(next(loc for loc in listing.members if loc.endswith("notes.md")))
+    assert parsed.text == "Notes by Alan Turing"
+    message = parse_document(next(loc for loc in listing.members if "000000.txt" in loc))
+    assert "Subject: Settlement draft" in message.text
+    assert "2021-06-30" in message.metadata["dates"]
+
+
+@pytest.mark.asyncio
+async def test_members_are_ingested_with_archive_provenance(configure_environment):
+    from app.config import settings
+    from app.database import Document, get_session
+    from app.services.archives import archive_reader
+    from app.services.ingestion import ingest_many
+
+    archives = _build_archives(Path(configure_environment) / "archives-ingest")
+    listing = archive_reader.expand([archives["zip"]], settings.allowed_extensions)
+
+    outcomes = await ingest_many(listing.members, source="archive-tests")
+
+    assert all(outcome.succeeded for outcome in outcomes)
+    with get_session() as session:
+        documents = {
+            document.source_path: document
+            for document in session.query(Document).filter_by(source="archive-tests")
+        }
+    board = documents[f"{archives['zip'].resolve()}!/memos/board.txt"]
+    assert "Ada Lovelace" in board.metadata_json["entities"]
+    ledger = documents[f"{archives['zip'].resolve()}!/exhibits/ledger.json"]
+    assert ledger.mime_type == "application/json"
+    assert len(documents) == 2
+
+
+def _gzipped_tar(path: Path, count: int, padding: int = 0) -> Path:
+    with tarfile.open(path, "w:gz") as archive:
+        for index in range(count):
+            payload = f"Exhibit {index} from Hedy Lamarr".encode("utf-8") + b" " * padding
+            info = tarfile.TarInfo(f"exhibits/{index}.txt")
+            info.size = len(payload)
+            archive.addfile(info, io.BytesIO(payload))
+    return path
+
+
+def test_compressed_tars_are_decompressed_once_and_zips_opened_once(configure_environment):
+    from app.config import settings
+    from app.services.archives import ArchiveReader
+
+    folder = Path(configure_environment) / "archives-cache"
+    archives = _build_archives(folder)
+    tarball = _gzipped_tar(folder / "custodian.tar.gz", 3)
+
+    reader = ArchiveReader()
+    for index in range(3):
+        with reader.open(tarball, f"exhibits/{index}.txt") as stream:
+            assert stream.read() == f"Exhibit {index} from Hedy Lamarr".encode("utf-8")
+    assert reader.size(tarball, "exhibits/2.txt") == len("Exhibit 2 from Hedy Lamarr")
+    assert len(list(settings.archive_spool_directory.glob("*.tar"))) == 1
+
+    assert reader.exists(archives["zip"], "memos/board.txt")
+    with reader.open(archives["zip"], "memos/board.txt") as stream:
+        assert b"Ada Lovelace" in stream.read()
+    assert len(reader._zips) == 1
+
+
+def test_archive_spool_is_bounded_and_oversized_tars_are_streamed(
+    configure_environment, monkeypatch
+):
+    from app.config import settings
+    from app.services.archives import ArchiveReader
+
+    folder = Path(configure_environment) / "archives-spool"
+    folder.mkdir(parents=True, exist_ok=True)
+    spool = settings.archive_spool_directory
+    for stale in spool.glob("*.tar"):
+        stale.unlink()
+    first = _gzipped_tar(folder / "first.tar.gz", 2, padding=20_000)
+    second = _gzipped_tar(folder / "second.tar.gz", 2, padding=20_000)
+    monkeypatch.setattr(settings, "archive_spool_max_bytes", 60_000)
+
+    reader = ArchiveReader()
+    with reader.open(first, "exhibits/1.txt") as stream:
+        assert stream.read().startswith(b"Exhibit 1")
+    with reader.open(second, "exhibits/0.txt") as stream:
+        assert stream.read().startswith(b"Exhibit 0")
+    # Only one copy fits, so the least recently used one was deleted.
+    assert len(list(spool.glob("*.tar"))) == 1
+
+    monkeypatch.setattr(settings, "archive_spool_max_bytes", 1_000)
+    oversized = _gzipped_tar(folder / "oversized.tar.gz", 3, padding=20_000)
+    with reader.open(oversized, "exhibits/2.txt") as stream:
+        assert stream.read().startswith(b"Exhibit 2 from Hedy Lamarr")
+    with pytest.raises(FileNotFoundError):
+        with reader.open(oversized, "exhibits/9.txt"):
+            pass
+    assert len(list(spool.glob("*.tar"))) == 1
@@ -0,0 +1,119 @@
+"""Dead-letter classification, backoff scheduling and bulk retries."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+
+def test_retry_policy_backs_off_transient_errors_and_stops_permanent_ones(configure_environment):
+    from app.database import utc_now
+    from app.services.retry import RetryPolicy
+
+    policy = RetryPolicy(max_attempts=3, initial_seconds=10, max_seconds=100, jitter_seconds=1)
+    now = utc_now()
+
+    first = policy.decide(OSError("disk busy"), attempts=1, now=now)
+    second = policy.decide(OSError("disk busy"), attempts=2, now=now)
+    assert first.transient and first.retry
+    assert timedelta(seconds=10) <= first.next_retry_at - now <= timedelta(seconds=11)
+    assert second.next_retry_at - now >= timedelta(seconds=20)
+
+    assert not policy.decide(OSError("disk busy"), attempts=3, now=now).retry
+    permanent = policy.decide(FileNotFoundError("gone"), attempts=1, now=now)
+    assert not permanent.transient and not permanent.retry
+
+
+@pytest.mark.asyncio
+async def test_retrier_reschedules_then_resolves_and_abandons_poison(
+    configure_environment, monkeypatch
+):
+    from app.database import DeadLetter, get_session
+    from app.services import ingestion
+    from app.services.dead_letters import DeadLetterRetrier
+    from app.services.retry import RetryPolicy
+
+    folder = Path(configure_environment) / "retry"
+    folder.mkdir(parents=True, exist_ok=True)
+    flaky = folder / "flaky.txt"
+    flaky.write_text("Deposition of Katherine Johnson on 2020-07-14.", encoding="utf-8")
+    missing = folder / "missing.txt"
+
+    real_parse = ingestion._parse_document
+
+    async def _locked(path):
+        raise OSError("storage temporarily unavailable")
+
+    monkeypatch.setattr(ingestion, "_parse_document", _locked)
+    outcomes = await ingestion.ingest_many([flaky, missing], source="retry-tests")
+    assert not any(outcome.succeeded for outcome in outcomes)
+
+    with get_session() as session:
+        records = {
+            record.payload["path"]: record
+            for record in session.query(DeadLetter).filter(
+                DeadLetter.payload["source"].as_string() == "retry-tests"
+            )
+        }
+    flaky_record = records[str(flaky.resolve())]
+    assert (flaky_record.status, flaky_record.error_type) == ("pending", "OSError")
+    assert flaky_record.next_retry_at is not None
+    assert records[str(missing.resolve())].status == "abandoned"
+
+    retrier = DeadLetterRetrier(RetryPolicy(max_attempts=3, initial_seconds=0.01))
+    report = await retrier.retry([flaky_record.trace_id])
+    assert report.rescheduled == [flaky_record.trace_id]
+
+    monkeypatch.setattr(ingestion, "_parse_document", real_parse)
+    report = await retrier.retry([flaky_record.trace_id, records[str(missing.resolve())].trace_id])
+    assert report.attempted == 1
+    assert report.resolved == [flaky_record.trace_id]
+
+    with get_session() as session:
+        resolved = session.get(DeadLetter, flaky_record.id)
+        assert resolved.status == "resolved"
+        assert resolved.attempts == 3
+        assert resolved.resolved_external_id
+
+    report = await retrier.retry(include_abandoned=True)
+    assert str(missing.resolve()) not in report.resolved
+    assert records[str(missing.resolve())].trace_id in report.abandoned
+
+
+@pytest.mark.asyncio
+async def test_claimed_records_are_skipped_and_unfinished_ones_released(
+    configure_environment, monkeypatch
+):
+    from app.database import DeadLetter, get_session, utc_now
+    from app.services import dead_letters
+    from app.services.dead_letters import DeadLetterRetrier
+
+    with get_session() as session:
+        for trace_id, status in (("claimed-elsewhere", "retrying"), ("interrupted", "pending")):
+            session.add(
+                DeadLetter(
+                    trace_id=trace_id,
+                    payload={"path": f"/nowhere/{trace_id}.txt", "source": "claim-tests"},
+                    error_message="boom",
+                    status=status,
+                    last_attempt_at=utc_now(),
+                    next_retry_at=utc_now(),
+                )
+            )
+
+    async def shutdown_midway(paths, **kwargs):
+        return []  # the scheduler was shut down before any outcome arrived
+
+    monkeypatch.setattr(dead_letters, "ingest_many", shutdown_midway)
+    report = await DeadLetterRetrier().retry(["claimed-elsewhere", "interrupted"])
+
+    assert report.attempted == 1
+    with get_session() as session:
+        statuses = dict(
+            session.query(DeadLetter.trace_id, DeadLetter.status).filter(
+                DeadLetter.trace_id.in_(["claimed-elsewhere", "interrupted"])
+            )
+        )
+    assert statuses == {"claimed-elsewhere": "retrying", "interrupted": "pending"}
@@ -0,0 +1,124 @@
+"""Format handlers for DOCX, e-mail and HTML documents, and their lazy registry."""
+
+from __future__ import annotations
+
+import io
+import zipfile
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+DOCX_BODY = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    "<w:body>"
+    "<w:p><w:r><w:t>Settlement between Alice Smith</w:t></w:r>"
+    '<w:r><w:t xml:space="preserve"> and Acme</w:t></w:r></w:p>'
+    "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Amount</w:t><w:tab/><w:t>$2,500</w:t></w:r></w:p>"
+    "</w:tc></w:tr></w:tbl>"
+    "<w:p><w:r><w:t>Signed 2023-03-04</w:t><w:br/><w:t>by counsel</w:t></w:r></w:p>"
+    "</w:body></w:document>"
+)
+
+HTML_PAGE = (
+    "<html><head><title>Board minutes</title><style>p { color: red; }</style></head>"
+    "<body><h1>Minutes</h1><p>Grace Hopper  approved\n the budget of $1,200.</p>"
+    "<script>var ignored = 1;</script><ul><li>One</li><li>Two &amp; three</li></ul>"
+    "<pre>  keep\n  spacing</pre></body></html>"
+)
+
+
+def _docx(path: Path) -> Path:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", DOCX_BODY)
+    return path
+
+
+def _email(path: Path) -> Path:
+    message = EmailMessage()
+    message["From"] = "Alan Turing <alan@example.com>"
+    message["To"] = "counsel@example.com"
+    message["Subject"] = "Invoice 2022-01-15"
+    message.set_content("Please pay $40 by Friday.\n")
+    message.add_alternative("<p>Please pay <b>$40</b> by Friday.</p>", subtype="html")
+    message.add_attachment(b"%PDF-1.4", maintype="application", subtype="pdf", filename="a.pdf")
+    path.write_bytes(bytes(message))
+    return path
+
+
+def test_docx_email_and_html_are_parsed_natively(configure_environment, tmp_path):
+    from app.services.parser import parser_service
+
+    docx = parser_service.parse(_docx(tmp_path / "settlement.docx"))
+    assert docx.text == (
+        "Settlement between Alice Smith and Acme\nAmount\t$2,500\nSigned 2023-03-04\nby counsel\n"
+    )
+    assert docx.metadata["monetary_amounts"] == ["2,500"]
+    assert "2023-03-04" in docx.metadata["dates"]
+
+    email = parser_service.parse(_email(tmp_path / "invoice.eml"))
+    assert email.text.startswith("From: Alan Turing <alan@example.com>\nTo: counsel@example.com\n")
+    assert "Please pay $40 by Friday." in email.text
+    assert "<b>" not in email.text
+    assert email.text.endswith("Attachment: a.pdf")
+    assert email.metadata["emails"] == ["alan@example.com", "counsel@example.com"]
+
+    page = tmp_path / "minutes.html"
+    page.write_text(HTML_PAGE, encoding="utf-8")
+    html = parser_service.parse(page)
+    assert html.text == (
+        "Board minutes\nMinutes\nGrace Hopper approved the budget of $1,200.\n"
+        "One\nTwo & three\n  keep\n  spacing\n"
+    )
+    assert html.metadata["monetary_amounts"] == ["1,200"]
+
+    # Archive members are parsed from streams with the same handlers.
+    with _docx(tmp_path / "member.docx").open("rb") as stream:
+        assert parser_service.parse_stream(stream, "member.docx").text == docx.text
+
+
+def test_handlers_load_lazily_and_declare_ocr_fallback(configure_environment):
+    from app.services.formats import FormatHandler, FormatRegistry, format_registry
+    from app.services.parser import parser_service
+
+    class Incomplete(FormatHandler):
+        needs_ocr_fallback = True
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+    registry = FormatRegistry()
+    registry.register((".html", ".htm"), "app.services.formats.html:HtmlHandler")
+    registry.register((".msgx",), "app.services.formats.msg:OutlookHandler", "missing_module")
+    assert registry.extensions() == {".html", ".htm"}
+    assert not registry._handlers
+    assert registry.handler(".HTM") is registry.handler(".html")
+
+    assert {".docx", ".eml", ".html"} <= parser_service.supported_extensions
+    assert format_registry.needs_ocr_fallback(".pdf")
+    assert not format_registry.needs_ocr_fallback(".docx")
+    assert not format_registry.needs_ocr_fallback(".unknown")
+    handler = format_registry.handler(".txt")
+    assert "".join(handler.iter_text(io.BytesIO("café".encode()))) == "café"
+
+
+def test_every_format_is_parsed_by_its_registered_handler(configure_environment, monkeypatch):
+    from app.services.formats import format_registry
+    from app.services.formats.text import JsonHandler
+    from app.services.parser import parser_service
+
+    parsed = parser_service.parse_stream(io.BytesIO(b'{"b": "Ada Lovelace", "a": 1}'), "x.json")
+    assert parsed.text == '{\n  "a": 1,\n  "b": "Ada Lovelace"\n}'
+
+    calls = []
+    original = JsonHandler.parse
+
+    def recording(self, parser, source):
+        calls.append(source)
+        return original(self, parser, source)
+
+    monkeypatch.setattr(JsonHandler, "parse", recording)
+    parser_service.parse_stream(io.BytesIO(b"[]"), "y.json")
+    assert len(calls) == 1
+    assert isinstance(format_registry.handler(".json"), JsonHandler)
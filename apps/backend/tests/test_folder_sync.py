@@ -0,0 +1,120 @@
+"""Manifest-driven incremental folder synchronisation."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_sync_ingests_only_changes_and_propagates_deletions(configure_environment):
+    from app.database import Document, FileManifestEntry, get_session
+    from app.services.graph import graph_manager
+    from app.services.sync import FolderSyncService
+
+    folder = Path(configure_environment) / "share"
+    folder.mkdir()
+    keep = folder / "keep.txt"
+    edit = folder / "edit.txt"
+    gone = folder / "gone.txt"
+    keep.write_text("Deposition of Ada Lovelace taken on 2020-02-02.", encoding="utf-8")
+    edit.write_text("Draft agreement with Alan Turing.", encoding="utf-8")
+    gone.write_text("Invoice sent to mallory@example.com.", encoding="utf-8")
+    (folder / "notes.bin").write_bytes(b"\x00\x01")
+    service = FolderSyncService()
+
+    first = await service.sync(folder)
+    assert len(first.added) == 3 and not first.failed
+    with get_session() as session:
+        entry = session.query(FileManifestEntry).filter_by(path=str(gone.resolve())).one()
+        gone_id = entry.external_id
+
+    unchanged = await service.sync(folder)
+    assert (unchanged.added, unchanged.changed, unchanged.removed) == ([], [], [])
+    assert unchanged.unchanged == 3
+
+    edit.write_text("Final executed agreement with Alan Turing and Grace Hopper.", encoding="utf-8")
+    gone.unlink()
+    second = await service.sync(folder)
+
+    assert second.changed == [str(edit.resolve())]
+    assert second.removed == [str(gone.resolve())]
+    assert second.unchanged == 1
+    assert gone_id not in graph_manager.graph
+    with get_session() as session:
+        assert session.query(Document).filter_by(external_id=gone_id).count() == 0
+        edited = session.query(Document).filter_by(source_path=str(edit.resolve())).all()
+        assert [document.text_content for document in edited] == [edit.read_text(encoding="utf-8")]
+
+
+@pytest.mark.asyncio
+async def test_changed_file_keeps_its_document_until_the_replacement_is_ingested(
+    configure_environment, monkeypatch
+):
+    from app.database import Document, get_session
+    from app.services import ingestion
+    from app.services.sync import FolderSyncService
+
+    folder = Path(configure_environment) / "replace"
+    folder.mkdir()
+    memo = folder / "memo.txt"
+    memo.write_text("Memo to Barbara Liskov dated 2021-07-08.", encoding="utf-8")
+    service = FolderSyncService()
+    [added] = (await service.sync(folder)).added
+
+    async def broken_parse(location):
+        raise RuntimeError("parser crashed")
+
+    monkeypatch.setattr(ingestion, "_parse_document", broken_parse)
+    memo.write_text("Revised memo to Barbara Liskov dated 2021-07-09.", encoding="utf-8")
+    failed = await service.sync(folder)
+
+    assert failed.changed == [] and failed.failed[0]["path"] == added
+    with get_session() as session:
+        [kept] = session.query(Document).filter_by(source_path=added).all()
+        assert kept.text_content.startswith("Memo to Barbara Liskov")
+
+    monkeypatch.undo()
+    assert (await service.sync(folder)).changed == [added]
+    with get_session() as session:
+        [current] = session.query(Document).filter_by(source_path=added).all()
+        assert current.text_content.startswith("Revised memo")
+
+
+@pytest.mark.asyncio
+async def test_sync_route_runs_an_admitted_job_and_updates_the_manifest(
+    configure_environment, monkeypatch
+):
+    import asyncio
+
+    from app.api.routes.ingestion import sync_folder
+    from app.config import settings
+    from app.schemas import FolderIngestionRequest
+    from app.services.admission import admission_controller
+    from app.services.jobs import job_manager
+    from app.services.sync import folder_sync_service
+    from fastapi import HTTPException
+
+    folder = Path(configure_environment) / "sync-job"
+    folder.mkdir()
+    for name in ("brief.txt", "exhibit.txt"):
+        (folder / name).write_text(f"{name} filed by Frances Allen.", encoding="utf-8")
+    request = FolderIngestionRequest(folder_path=str(folder))
+
+    monkeypatch.setattr(settings, "admission_max_queue_depth", 1)
+    backlog = admission_controller.admit("api", {"queued.txt": 1})
+    with pytest.raises(HTTPException) as rejected:
+        await sync_folder(request)
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == str(settings.admission_retry_after_seconds)
+
+    backlog.release()
+    accepted = await sync_folder(request)
+    assert accepted.status_code == 202
+    job = await job_manager.wait(accepted.headers["Location"].rsplit("/", 1)[-1])
+    assert (job.source, job.status, job.processed) == ("sync", "completed", 2)
+    [report] = await asyncio.gather(*folder_sync_service._settling)
+    assert sorted(report.added) == sorted(str(path.resolve()) for path in folder.iterdir())
+
+    assert (await folder_sync_service.sync(folder)).unchanged == 2
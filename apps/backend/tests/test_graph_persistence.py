@@ -0,0 +1,88 @@
+"""Knowledge graph change log and snapshot behaviour."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+
+def test_graph_changes_are_logged_and_replayed(configure_environment: Path) -> None:
+    from app.services.graph import GraphManager
+
+    path = Path(configure_environment) / "replay" / "graph.gpickle"
+    manager = GraphManager(path, snapshot_every=100, snapshot_seconds=3600)
+    manager.upsert_document("doc-1", {"entities": ["Alice Smith"], "dates": ["2024-01-01"]})
+    manager.upsert_document("doc-2", {"emails": ["bob@example.com"]})
+
+    assert not path.exists()
+    assert manager.log_path.exists()
+    with manager.log_path.open("a", encoding="utf-8") as handle:
+        handle.write('{"op": "upsert", "id": "doc-3", "meta')
+
+    restored = GraphManager(path, snapshot_every=100, snapshot_seconds=3600)
+    assert restored.neighbors("doc-1") == ["date::2024-01-01", "entity::Alice Smith"]
+    assert restored.neighbors("doc-2") == ["email::bob@example.com"]
+    assert "doc-3" not in restored.graph
+
+    restored.persist()
+    assert path.exists()
+    assert not restored.log_path.exists()
+    assert not restored.dirty
+    assert GraphManager(path).neighbors("doc-2") == ["email::bob@example.com"]
+
+
+def test_graph_snapshots_after_threshold_and_upserts_are_idempotent(
+    configure_environment: Path,
+) -> None:
+    from app.services.graph import GraphManager
+
+    path = Path(configure_environment) / "threshold" / "graph.gpickle"
+    manager = GraphManager(path, snapshot_every=2, snapshot_seconds=3600)
+    manager.upsert_document("doc-1", {"entities": ["Alice Smith"]})
+    assert not path.exists()
+    manager.upsert_document("doc-1", {"entities": ["Alice Smith"]})
+
+    assert path.exists()
+    assert not manager.log_path.exists()
+    assert manager.graph.number_of_edges("doc-1", "entity::Alice Smith") == 1
+
+
+def test_graph_managers_sharing_a_path_see_each_others_changes(configure_environment: Path) -> None:
+    from app.services.graph import GraphManager
+
+    path = Path(configure_environment) / "shared" / "graph.gpickle"
+    api = GraphManager(path, snapshot_every=100, snapshot_seconds=3600)
+    worker = GraphManager(path, snapshot_every=100, snapshot_seconds=3600)
+
+    worker.upsert_document("doc-1", {"entities": ["Alice Smith"]})
+    api.upsert_document("doc-2", {"entities": ["Alice Smith"]})
+    assert api.neighbors("doc-1") == ["entity::Alice Smith"]
+
+    worker.persist()
+    api.remove_document("doc-1")
+    worker.upsert_document("doc-3", {"dates": ["2024-01-01"]})
+    api.persist()
+
+    restored = GraphManager(path)
+    assert "doc-1" not in restored.graph
+    assert restored.neighbors("doc-2") == ["entity::Alice Smith"]
+    assert restored.neighbors("doc-3") == ["date::2024-01-01"]
+
+
+def test_edges_of_old_snapshots_are_rekeyed_by_relation(configure_environment: Path) -> None:
+    import pickle
+
+    import networkx as nx
+    from app.services.graph import GraphManager
+
+    path = Path(configure_environment) / "legacy" / "graph.gpickle"
+    path.parent.mkdir(parents=True)
+    legacy = nx.MultiDiGraph()
+    legacy.add_node("doc-1", type="document")
+    legacy.add_node("entity::Alice Smith", type="mentions")
+    legacy.add_edge("doc-1", "entity::Alice Smith", relation="mentions")
+    with path.open("wb") as handle:
+        pickle.dump(legacy, handle)
+
+    manager = GraphManager(path, snapshot_every=100, snapshot_seconds=3600)
+    manager.upsert_document("doc-1", {"entities": ["Alice Smith"]})
+    assert list(manager.graph["doc-1"]["entity::Alice Smith"]) == ["mentions"]
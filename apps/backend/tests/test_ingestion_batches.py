@@ -0,0 +1,258 @@
+"""Batch ingestion behaviour: concurrency, ordering and failure isolation."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_ingest_many_preserves_order_and_isolates_failures(configure_environment):
+    from app.database import DeadLetter, get_session
+    from app.services import ingestion
+
+    base_dir = Path(configure_environment) / "batch"
+    base_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(5):
+        path = base_dir / f"memo-{index}.txt"
+        path.write_text(
+            f"Memo {index} from Carol Danvers dated 2024-02-0{index + 1}.", encoding="utf-8"
+        )
+        paths.append(path)
+    missing = base_dir / "missing.txt"
+    paths.insert(2, missing)
+
+    outcomes = await ingestion.ingest_many(paths, source="tests", concurrency=3)
+
+    assert [outcome.path for outcome in outcomes] == [str(path) for path in paths]
+    assert [outcome.succeeded for outcome in outcomes] == [True, True, False, True, True, True]
+    assert len({outcome.external_id for outcome in outcomes if outcome.succeeded}) == 5
+    with get_session() as session:
+        letters = session.query(DeadLetter).all()
+        assert any(letter.payload["path"] == str(missing.resolve()) for letter in letters)
+
+
+@pytest.mark.asyncio
+async def test_ingest_many_bounds_items_in_flight_and_survives_failed_submits(
+    configure_environment, monkeypatch
+):
+    import asyncio
+
+    from app.config import settings
+    from app.database import DeadLetter, get_session
+    from app.services import ingestion
+
+    base_dir = Path(configure_environment) / "bounded"
+    base_dir.mkdir(parents=True, exist_ok=True)
+    paths = [base_dir / f"note-{index}.txt" for index in range(6)]
+    for path in paths:
+        path.write_text(f"Note {path.stem} by Amelia Earhart.", encoding="utf-8")
+
+    real_submit = ingestion.ingestion_scheduler.submit
+    in_flight = peak = 0
+
+    async def _submit(location, **kwargs):
+        nonlocal in_flight, peak
+        if location.endswith("note-3.txt"):
+            raise RuntimeError("scheduler unavailable")
+        future = await real_submit(location, **kwargs)
+        in_flight += 1
+        peak = max(peak, in_flight)
+
+        def _done(_):
+            nonlocal in_flight
+            in_flight -= 1
+
+        future.add_done_callback(_done)
+        return future
+
+    monkeypatch.setattr(ingestion.ingestion_scheduler, "submit", _submit)
+    monkeypatch.setattr(settings, "ingestion_batch_in_flight", 2)
+    reported = []
+    outcomes = await ingestion.ingest_many(
+        paths, source="bounded-tests", on_outcome=lambda index, _: reported.append(index)
+    )
+    await asyncio.sleep(0)
+
+    assert peak <= 2
+    assert sorted(reported) == list(range(6))
+    assert [outcome.succeeded for outcome in outcomes] == [True, True, True, False, True, True]
+    assert "scheduler unavailable" in outcomes[3].error
+    with get_session() as session:
+        letters = session.query(DeadLetter).all()
+        assert any(letter.payload["path"] == str(paths[3]) for letter in letters)
+
+
+def test_parsed_documents_roundtrip_through_process_backend(configure_environment):
+    import asyncio
+    import pickle
+
+    from app.services import executors
+    from app.services.parser import ParsedDocument
+
+    document_path = Path(configure_environment) / "process.txt"
+    document_path.write_text(
+        "Invoice from Alice Smith to bob@example.com for $250.00.", encoding="utf-8"
+    )
+    executor = executors.StageExecutor(backends={"parse": "process"}, max_workers=1)
+    try:
+        parsed = asyncio.run(executor.run("parse", executors.parse_document, str(document_path)))
+    finally:
+        executor.shutdown()
+
+    assert isinstance(parsed, ParsedDocument)
+    assert parsed.metadata["emails"] == ["bob@example.com"]
+    assert pickle.loads(pickle.dumps(parsed)) == parsed
+
+
+def test_parse_and_ocr_run_in_worker_processes_by_default(configure_environment):
+    from app.config import Settings
+    from app.services.executors import StageExecutor
+
+    executor = StageExecutor(backends=Settings.model_fields["stage_executors"].default_factory())
+    backends = [executor.backend_for(stage) for stage in ("parse", "ocr", "classify")]
+    assert backends == ["process", "process", "thread"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_checksums_are_aliased_not_reprocessed(configure_environment):
+    from app.database import Document, get_session
+    from app.services import ingestion
+
+    base_dir = Path(configure_environment) / "dedup"
+    base_dir.mkdir(parents=True, exist_ok=True)
+    body = "Privileged memo from counsel Erin Brockovich regarding the 2019-06-30 settlement."
+    original = base_dir / "original.txt"
+    copy = base_dir / "attachment-copy.txt"
+    original.write_text(body, encoding="utf-8")
+    copy.write_text(body, encoding="utf-8")
+
+    first = await ingestion.ingest_document_flow(str(original), source="tests")
+    again = await ingestion.ingest_document_flow(str(original), source="tests")
+    alias = await ingestion.ingest_document_flow(str(copy), source="tests")
+    forced = await ingestion.ingest_document_flow(str(copy), source="tests", force=True)
+
+    assert again == first
+    assert len({first, alias, forced}) == 3
+    with get_session() as session:
+        canonical = session.query(Document).filter_by(external_id=first).one()
+        aliased = session.query(Document).filter_by(external_id=alias).one()
+        reprocessed = session.query(Document).filter_by(external_id=forced).one()
+        assert aliased.duplicate_of_id == canonical.id
+        assert aliased.document_type == canonical.document_type
+        assert not aliased.fragments
+        assert reprocessed.duplicate_of_id is None
+        assert reprocessed.text_content == body
+
+
+@pytest.mark.asyncio
+async def test_concurrent_copies_are_parsed_once(configure_environment, monkeypatch):
+    import asyncio
+
+    from app.database import Document, get_session
+    from app.services import ingestion
+
+    base_dir = Path(configure_environment) / "coalesce"
+    base_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(3):
+        path = base_dir / f"copy-{index}.txt"
+        path.write_text("Memo from Diana Prince about the 2020-05-06 audit.", encoding="utf-8")
+        paths.append(str(path))
+    parsed = []
+    parse = ingestion._parse_document
+
+    async def counting_parse(location):
+        parsed.append(location)
+        return await parse(location)
+
+    monkeypatch.setattr(ingestion, "_parse_document", counting_parse)
+    monkeypatch.setattr(ingestion.parse_cache, "max_bytes", 0)
+
+    ids = await asyncio.gather(
+        *(ingestion.ingest_document_flow(path, source="tests") for path in paths)
+    )
+    assert len(parsed) == 1
+    assert not ingestion._checksum_locks
+    with get_session() as session:
+        documents = session.query(Document).filter(Document.external_id.in_(ids)).all()
+        assert sorted(document.duplicate_of_id is None for document in documents) == [
+            False,
+            False,
+            True,
+        ]
+
+
+def test_existing_databases_gain_new_columns(tmp_path):
+    from app.database import init_db
+    from sqlalchemy import create_engine, inspect, text
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE dead_letters (id INTEGER PRIMARY KEY, trace_id VARCHAR(64), "
+                "payload JSON, error_message TEXT, stacktrace TEXT, created_at DATETIME)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO dead_letters (trace_id, payload, error_message) VALUES ('t', '', '')")
+        )
+
+    init_db(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("dead_letters")}
+    assert {"status", "attempts", "next_retry_at", "resolved_external_id"} <= columns
+    assert "ix_dead_letters_status" in {
+        index["name"] for index in inspect(engine).get_indexes("dead_letters")
+    }
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT status, attempts FROM dead_letters")).one()
+    assert tuple(row) == ("pending", 1)
+    init_db(engine)  # idempotent
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_ingestion_store_group_commits_documents_and_fragments(configure_environment):
+    import asyncio
+
+    from app.database import Document, IngestionRun, MetadataFragment, get_session
+    from app.services.persistence import DocumentRecord, IngestionStore
+
+    store = IngestionStore(batch_size=3, linger_seconds=60)
+    run_id = await store.start_run("store-trace", "tests")
+    records = [
+        DocumentRecord(
+            external_id=f"doc-store-{index}",
+            source_path=f"/tmp/store-{index}.txt",
+            source="tests",
+            checksum=f"store-{index}",
+            mime_type="text/plain",
+            text_content=f"Body {index}",
+            summary=f"Body {index}",
+            document_type="memo",
+            privilege_risk=0.0,
+            importance_score=0.5,
+            metadata_json={"entities": [f"Entity {index}"], "dates": ["2024-01-01", "2024-01-02"]},
+            ingestion_run_id=run_id,
+        )
+        for index in range(3)
+    ]
+
+    # A full batch commits immediately, well before the linger timeout.
+    await asyncio.wait_for(asyncio.gather(*(store.add_document(record) for record in records)), 5)
+    await store.finish_run("store-trace", "completed")
+    assert not store._runs
+
+    with get_session() as session:
+        documents = session.query(Document).filter(Document.external_id.like("doc-store-%")).all()
+        assert len(documents) == 3
+        fragments = session.query(MetadataFragment).filter(
+            MetadataFragment.document_id.in_([document.id for document in documents])
+        )
+        assert fragments.count() == 9
+        run = session.query(IngestionRun).filter_by(trace_id="store-trace").one()
+        assert run.status == "completed"
+        assert run.duration_seconds is not None
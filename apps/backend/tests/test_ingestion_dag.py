@@ -0,0 +1,99 @@
+"""Dependency-ordered ingestion stages with concurrent fan-out and cached results."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_overlap_and_results_are_shared():
+    from app.services.pipeline import Stage, StageCache, StageGraph
+
+    calls: list[str] = []
+
+    def _stage(name: str, seconds: float):
+        async def run(context):
+            calls.append(name)
+            await asyncio.sleep(seconds)
+            return f"{name}({','.join(sorted(k for k in context if k != 'input'))})"
+
+        return run
+
+    graph = StageGraph(
+        [
+            Stage("parse", _stage("parse", 0.05), cached=True),
+            Stage("graph", _stage("graph", 0.2), after=("parse",)),
+            Stage("db", _stage("db", 0.2), after=("parse",)),
+            Stage("index", _stage("index", 0.0), after=("db",)),
+        ],
+        cache=StageCache(max_entries=8, max_chars=1024),
+    )
+    assert graph.order.index("db") < graph.order.index("index")
+
+    started = time.perf_counter()
+    first, second = await asyncio.gather(
+        graph.run({"input": 1}, cache_key="same"), graph.run({"input": 2}, cache_key="same")
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.38  # graph and db run side by side: ~0.25s rather than ~0.45s
+    assert calls.count("parse") == 1
+    assert first["parse"] == second["parse"] == "parse()"
+    assert first["index"].startswith("index(db,")
+
+    await graph.run({"input": 3}, cache_key="same", refresh=True)
+    assert calls.count("parse") == 2
+
+    with pytest.raises(ValueError, match="cycle"):
+        StageGraph(
+            [Stage("a", _stage("a", 0), after=("b",)), Stage("b", _stage("b", 0), after=("a",))]
+        )
+
+
+@pytest.mark.asyncio
+async def test_flow_reuses_parse_for_identical_content_and_cleans_up_failures(
+    configure_environment, monkeypatch
+):
+    from app.services import executors, ingestion
+    from app.services.graph import graph_manager
+
+    folder = Path(configure_environment) / "dag"
+    folder.mkdir(parents=True, exist_ok=True)
+    first = folder / "original.txt"
+    first.write_text("Engagement letter from Grace Hopper dated 2020-04-01.", "utf-8")
+    copy = folder / "copy.txt"
+    copy.write_text(first.read_text("utf-8"), "utf-8")
+
+    parses: list[str] = []
+    real_parse = executors.parse_document
+
+    def counting_parse(location: str):
+        parses.append(location)
+        return real_parse(location)
+
+    monkeypatch.setattr(executors, "parse_document", counting_parse)
+
+    original_id = await ingestion.ingest_document_flow(str(first), source="dag")
+    ingestion.remove_documents([original_id])
+    copy_id = await ingestion.ingest_document_flow(str(copy), source="dag")
+
+    assert copy_id != original_id
+    assert len(parses) == 1
+    assert "entity::Grace Hopper" in graph_manager.neighbors(copy_id)
+
+    async def failing_insert(record):
+        raise RuntimeError("database unavailable")
+
+    nodes_before = set(graph_manager.graph.nodes)
+    monkeypatch.setattr(ingestion.ingestion_store, "add_document", failing_insert)
+    failing = folder / "fresh.txt"
+    failing.write_text("Unrelated memo from Alan Turing.", "utf-8")
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        await ingestion.ingest_document_flow(str(failing), source="dag", dead_letter=False)
+    assert not {node for node in graph_manager.graph.nodes if str(node).startswith("doc-")} - (
+        nodes_before
+    )
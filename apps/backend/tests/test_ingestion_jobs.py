@@ -0,0 +1,182 @@
+"""Background ingestion jobs: progress reporting, cancellation and resumption."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+
+def _write_documents(folder: Path, count: int) -> List[Path]:
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = folder / f"letter-{index}.txt"
+        path.write_text(f"Letter {index} to Grace Hopper about invoice {index}.", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_links_runs(configure_environment):
+    from app.database import IngestionRun, get_session
+    from app.services.jobs import job_manager
+
+    paths = _write_documents(Path(configure_environment) / "job", 4)
+    paths.append(Path(configure_environment) / "job" / "missing.txt")
+
+    job_id = await job_manager.submit(paths, source="tests")
+    job = await job_manager.wait(job_id)
+
+    assert job is not None
+    assert job.status == "completed"
+    assert (job.total, job.processed, job.failed, job.remaining) == (5, 4, 1, 0)
+    assert job.throughput_per_second and job.throughput_per_second > 0
+    with get_session() as session:
+        assert session.query(IngestionRun).filter_by(job_id=job_id).count() == 4
+
+
+@pytest.mark.asyncio
+async def test_job_database_writes_run_off_the_event_loop(configure_environment, monkeypatch):
+    import threading
+
+    from app.config import settings
+    from app.services import jobs
+    from app.services.jobs import job_manager
+
+    threads = []
+    flush = jobs._Checkpointer._flush
+
+    def _recording(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        return flush(self, *args, **kwargs)
+
+    monkeypatch.setattr(jobs._Checkpointer, "_flush", _recording)
+    monkeypatch.setattr(settings, "job_checkpoint_batch_size", 1)
+    paths = _write_documents(Path(configure_environment) / "off-loop", 3)
+    job_id = await job_manager.submit(paths, source="tests")
+    job = await job_manager.wait(job_id)
+
+    assert (job.status, job.processed) == ("completed", 3)
+    assert threads and threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_stops_scheduling_new_documents(configure_environment):
+    from app.services.jobs import job_manager
+
+    paths = _write_documents(Path(configure_environment) / "cancel", 6)
+    job_id = await job_manager.submit(paths, source="tests")
+    job_manager.cancel(job_id)
+    job = await job_manager.wait(job_id)
+
+    assert job is not None
+    assert job.status == "cancelled"
+    assert job.cancel_requested
+    assert job.processed + job.failed < job.total
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_from_checkpoint(configure_environment):
+    from app.database import IngestionJob, IngestionJobItem, get_session
+    from app.services.jobs import IngestionJobManager
+
+    folder = Path(configure_environment) / "resume"
+    paths = _write_documents(folder, 2)
+    already_done = folder / "deleted-after-checkpoint.txt"
+    with get_session() as session:
+        session.add(
+            IngestionJob(
+                job_id="job-resume", source="tests", status="running", total=3, processed=1
+            )
+        )
+        session.flush()
+        session.add(
+            IngestionJobItem(
+                job_id="job-resume",
+                position=0,
+                path=str(already_done),
+                status="done",
+                external_id="doc-before-crash",
+            )
+        )
+        for position, path in enumerate(paths, start=1):
+            session.add(IngestionJobItem(job_id="job-resume", position=position, path=str(path)))
+
+    manager = IngestionJobManager()
+    assert manager.resume_incomplete() == ["job-resume"]
+    job = await manager.wait("job-resume")
+
+    assert job is not None
+    assert (job.status, job.processed, job.failed, job.remaining) == ("completed", 3, 0, 0)
+    with get_session() as session:
+        items = session.query(IngestionJobItem).filter_by(job_id="job-resume").all()
+        assert {item.status for item in items} == {"done"}
+        assert all(item.checksum for item in items if item.path != str(already_done))
+
+
+@pytest.mark.asyncio
+async def test_cancellation_requested_elsewhere_is_noticed_and_kept(
+    configure_environment, monkeypatch
+):
+    import asyncio
+
+    from app.database import IngestionJob, get_session
+    from app.services import ingestion
+    from app.services.jobs import job_manager, settings
+
+    parse = ingestion._parse_document
+
+    async def slow_parse(location):
+        await asyncio.sleep(0.2)
+        return await parse(location)
+
+    monkeypatch.setattr(ingestion, "_parse_document", slow_parse)
+    monkeypatch.setattr(settings, "job_progress_interval_seconds", 0.05)
+    paths = _write_documents(Path(configure_environment) / "remote-cancel", 12)
+    job_id = await job_manager.submit(paths, source="tests")
+    await asyncio.sleep(0.1)
+    # Another replica flags the job and closes it as cancelled.
+    with get_session() as session:
+        job = session.query(IngestionJob).filter_by(job_id=job_id).one()
+        job.cancel_requested = True
+        job.status = "cancelled"
+    job = await job_manager.wait(job_id)
+
+    assert job is not None
+    assert job.status == "cancelled"
+    assert job.processed + job.failed < job.total
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_with_expired_leases_are_resumed(configure_environment):
+    from datetime import timedelta
+
+    from app.database import IngestionJob, get_session, utc_now
+    from app.services.jobs import IngestionJobManager
+
+    now = utc_now()
+    with get_session() as session:
+        for job_id, expires in (("job-live", now + timedelta(minutes=5)), ("job-dead", now)):
+            session.add(
+                IngestionJob(
+                    job_id=job_id,
+                    source="tests",
+                    status="running",
+                    lease_owner="other-replica",
+                    lease_expires_at=expires - timedelta(seconds=1),
+                )
+            )
+
+    first, second = IngestionJobManager("replica-a"), IngestionJobManager("replica-b")
+    assert first.resume_incomplete() == ["job-dead"]
+    assert second.resume_incomplete() == []
+    job = await first.wait("job-dead")
+
+    assert job is not None and job.status == "completed"
+    with get_session() as session:
+        live = session.query(IngestionJob).filter_by(job_id="job-live").one()
+        dead = session.query(IngestionJob).filter_by(job_id="job-dead").one()
+        assert (live.status, live.lease_owner) == ("running", "other-replica")
+        assert dead.lease_owner is None
@@ -0,0 +1,76 @@
+"""Parallel per-page OCR with bounded rendering and ordered results."""
+
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pypdf import PdfWriter
+
+
+def test_pdf_pages_are_ocred_in_parallel_and_in_order(configure_environment, monkeypatch, tmp_path):
+    from app.services import ocr
+    from app.services.executors import stage_executor
+
+    widths = [200 + 10 * number for number in range(9)]
+    writer = PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width=width, height=200)
+    pdf = tmp_path / "scan.pdf"
+    with pdf.open("wb") as handle:
+        writer.write(handle)
+
+    rendered = []
+    render = ocr.ocr_engine._pdf_pages
+
+    def counting_render(source):
+        for image in render(source):
+            rendered.append(image.size)
+            yield image
+
+    collected = []
+
+    def fake_ocr(image):
+        time.sleep(random.uniform(0, 0.02))  # finish out of order
+        return ocr.OCRResult(text=f"{image.mode}:{image.width}", mean_confidence=90.0, warnings=[])
+
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(ocr.settings, "ocr_max_pending_pages", 3)
+    monkeypatch.setattr(stage_executor, "process_pool", lambda: pool)
+    monkeypatch.setattr(ocr, "ocr_image", fake_ocr)
+    monkeypatch.setattr(ocr.ocr_engine, "_pdf_pages", counting_render)
+
+    for result in ocr.ocr_engine._ocr_pages(iter(ocr.ocr_engine._pdf_pages(pdf))):
+        collected.append(result.text)
+        assert len(rendered) - len(collected) < 3  # never more than the window ahead
+
+    # Pages were rendered at scale 2, in greyscale, and come back in page order.
+    expected = [f"L:{2 * width}" for width in widths]
+    assert collected == expected
+    document = ocr.ocr_engine.extract_text(pdf)
+    pool.shutdown()
+    assert document.text == "\n".join(expected)
+    assert document.mean_confidence == 90.0
+
+
+def test_a_page_stuck_in_the_pool_is_skipped_with_a_warning(configure_environment, monkeypatch):
+    from concurrent.futures import Future
+
+    from app.services import ocr
+    from app.services.executors import stage_executor
+
+    class StuckPool:
+        def submit(self, func, image):
+            future = Future()
+            if image.width != 20:
+                future.set_result(ocr.OCRResult(text="ok", mean_confidence=80.0, warnings=[]))
+            return future
+
+    monkeypatch.setattr(ocr.settings, "process_task_timeout_seconds", 0.05)
+    monkeypatch.setattr(stage_executor, "process_pool", lambda: StuckPool())
+    images = [ocr.Image.new("L", (width, 10)) for width in (10, 20, 30)]
+
+    results = list(ocr.ocr_engine._ocr_pages(iter(images)))
+    assert [result.text for result in results] == ["ok", "", "ok"]
+    assert "Page 2 skipped" in results[1].warnings[0]
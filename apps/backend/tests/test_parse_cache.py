@@ -0,0 +1,83 @@
+"""Persistent, size-bounded cache of parse results."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+
+def test_entries_round_trip_per_version_and_are_evicted_lru(configure_environment):
+    from app.services.parse_cache import ParseCache
+    from app.services.parser import parser_service
+
+    directory = Path(configure_environment) / "cache-unit"
+    cache = ParseCache(directory, max_bytes=10_000, version="1-test")
+    document = parser_service.parse_text("Memo from Alice Smith paid $40 on 2020-04-01.")
+    cache.put("a" * 64, ".txt", document)
+
+    restored = cache.get("a" * 64, ".txt")
+    assert restored is not None
+    assert restored.text == document.text
+    assert restored.metadata == document.metadata
+    assert restored.analysis.matches == document.analysis.matches
+    assert cache.get("a" * 64, ".json") is None
+    assert ParseCache(directory, max_bytes=10_000, version="2-test").get("a" * 64, ".txt") is None
+
+    bulky = parser_service.parse_text(os.urandom(3000).hex())
+    for index, checksum in enumerate(("b" * 64, "c" * 64, "d" * 64)):
+        cache.put(checksum, ".txt", bulky)
+        entry = cache._path(checksum, ".txt")
+        os.utime(entry, (index, index))  # deterministic LRU order
+        if checksum == "c" * 64:
+            cache.get("b" * 64, ".txt")  # touch: b becomes the most recently used
+    assert cache.get("c" * 64, ".txt") is None
+    assert cache.get("d" * 64, ".txt") is not None
+    assert cache._measure() <= 10_000
+
+
+@pytest.mark.asyncio
+async def test_forced_reingest_reuses_the_persisted_parse(configure_environment, monkeypatch):
+    from app.services import executors, ingestion
+
+    path = Path(configure_environment) / "cached" / "letter.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("Engagement letter from Grace Hopper dated 2020-04-01.", "utf-8")
+
+    parses: list[str] = []
+    real_parse = executors.parse_document
+
+    def counting_parse(location: str):
+        parses.append(location)
+        return real_parse(location)
+
+    monkeypatch.setattr(executors, "parse_document", counting_parse)
+    first = await ingestion.ingest_document_flow(str(path), source="cache")
+    ingestion.ingestion_dag.cache.clear()  # as after a restart
+    second = await ingestion.ingest_document_flow(str(path), source="cache", force=True)
+
+    assert first != second
+    assert parses == [str(path)]
+
+
+def test_ocr_results_are_persisted_under_the_parser_version(configure_environment, monkeypatch):
+    from app.config import settings
+    from app.services.ocr import OCRResult
+    from app.services.parse_cache import ParseCache
+    from app.services.parser import parser_service
+
+    directory = Path(configure_environment) / "cache-ocr"
+    cache = ParseCache(directory, max_bytes=10_000)
+    result = OCRResult("Scanned lease for Ada Lovelace", 91.5, ["sparse"])
+    cache.put_ocr("e" * 64, ".pdf", result)
+    cache.put_ocr("f" * 64, ".pdf", OCRResult("", 0.0, ["Page 1 skipped"], complete=False))
+
+    assert cache.get_ocr("e" * 64, ".pdf") == result
+    assert cache.get("e" * 64, ".pdf") is None  # parse entries are kept apart
+    assert cache.get_ocr("f" * 64, ".pdf") is None
+
+    version = parser_service.version
+    monkeypatch.setattr(settings, "ocr_language", "deu")
+    assert parser_service.version != version
+    assert cache.get_ocr("e" * 64, ".pdf") is None
@@ -0,0 +1,129 @@
+"""Page-level PDF extraction: parallel page ranges, page provenance and per-page timeouts."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import List
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+
+def _write_pdf(path: Path, pages: List[str]) -> Path:
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with path.open("wb") as handle:
+        writer.write(handle)
+    return path
+
+
+def test_parallel_page_ranges_match_serial_extraction(configure_environment, monkeypatch, tmp_path):
+    from app.services.executors import stage_executor
+    from app.services.parser import parser_service, settings
+
+    pages = [f"Page {number} mentions Grace Hopper and ${number}00" for number in range(1, 8)]
+    pdf = _write_pdf(tmp_path / "pages.pdf", pages)
+
+    serial = parser_service.parse(pdf)
+    assert serial.text.split("\n") == pages
+    assert serial.page_offsets == [serial.text.index(page) for page in pages]
+
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 2)
+    monkeypatch.setattr(settings, "pdf_pages_per_task", 3)
+    parallel = parser_service.parse(pdf)
+    assert stage_executor._pool is not None
+    assert parallel.text == serial.text
+    assert parallel.page_offsets == serial.page_offsets
+    assert parallel.metadata == serial.metadata
+
+
+def test_slow_pages_are_skipped_with_a_warning(configure_environment):
+    from app.services.formats.pdf import _extract_page
+
+    class SlowDocument:
+        def page_text(self, index: int) -> str:
+            time.sleep(2)
+            return "never"
+
+    text, warning = _extract_page(SlowDocument(), 3, 0.05)
+    assert text == ""
+    assert "Page 4" in warning
+
+
+def test_search_results_report_the_page_of_the_snippet(configure_environment):
+    from app.services.retrieval import retriever_service
+
+    retriever_service.text_cache["doc-pages"] = "first page\nsecond page\nthird page about zebras"
+    retriever_service.page_cache["doc-pages"] = [0, 11, 23]
+    assert retriever_service._build_snippet("doc-pages", "zebras")[1] == 3
+    assert retriever_service._build_snippet("doc-pages", "first")[1] == 1
+
+
+def test_pdf_text_engines_agree_and_auto_prefers_pdfium(configure_environment, tmp_path):
+    from app.services.pdf_text import agreement, open_pdf_text
+
+    pages = ["Invoice for Alan Turing dated 2021-02-03", "Balance due: $40"]
+    pdf = _write_pdf(tmp_path / "engines.pdf", pages)
+
+    texts = {}
+    for engine in ("pypdf", "pdfium"):
+        with open_pdf_text(pdf, engine) as document:
+            texts[engine] = [document.page_text(index) for index in range(len(document))]
+    assert texts["pypdf"] == texts["pdfium"] == pages
+    with pdf.open("rb") as stream, open_pdf_text(stream, "auto") as document:
+        assert document.engine == "pdfium"
+        assert document.page_text(1) == pages[1]
+
+    assert agreement("alpha beta beta", "beta alpha") == 2 / 3
+
+
+def test_auto_engine_skips_pypdf_for_clean_text_and_rewinds_streams(
+    configure_environment, monkeypatch, tmp_path
+):
+    import io
+
+    from app.services import pdf_text
+
+    prose = " ".join(["Counsel for Alan Turing reviewed the lease terms"] * 6)
+    clean = _write_pdf(tmp_path / "clean.pdf", [prose, prose])
+    sparse = _write_pdf(tmp_path / "sparse.pdf", ["Balance due: $40"])
+    assert pdf_text.reads_cleanly(prose, 1)
+    assert not pdf_text.reads_cleanly("Balance due", 1)
+    assert not pdf_text.reads_cleanly(prose.replace(" ", ""), 1)
+
+    opened: list[int] = []
+    pypdf_text = pdf_text.PypdfText
+
+    def recording_pypdf(source):
+        opened.append(source.tell())
+        return pypdf_text(source)
+
+    monkeypatch.setattr(pdf_text, "PypdfText", recording_pypdf)
+    with clean.open("rb") as stream, pdf_text.open_pdf_text(stream, "auto") as document:
+        assert document.engine == "pdfium"
+    assert opened == []
+
+    # A stream handed over mid-way is read by each engine from where it was given.
+    payload = b"header" + sparse.read_bytes()
+    stream = io.BytesIO(payload)
+    stream.seek(len(b"header"))
+    with pdf_text.open_pdf_text(stream, "auto") as document:
+        assert document.page_text(0) == "Balance due: $40"
+    assert opened == [len(b"header")]
@@ -0,0 +1,128 @@
+"""Priority ordering and lane selection of the ingestion scheduler."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from pypdf import PdfWriter
+
+
+@pytest.mark.asyncio
+async def test_uploads_outrank_backfill_and_small_files_go_first(configure_environment):
+    from app.services.scheduler import IngestionScheduler
+
+    folder = Path(configure_environment) / "scheduler-order"
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, size in [("blocker", 1), ("big", 5000), ("small", 10), ("upload", 2000)]:
+        paths[name] = folder / f"{name}.txt"
+        paths[name].write_text("x" * size, encoding="utf-8")
+
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def runner(location: str, **kwargs) -> str:
+        if Path(location).stem == "blocker":
+            await release.wait()
+        order.append(Path(location).stem)
+        return kwargs["source"]
+
+    scheduler = IngestionScheduler(runner, workers={"light": 1, "heavy": 1})
+    blocker = await scheduler.submit(str(paths["blocker"]), source="folder")
+    await asyncio.sleep(0)
+    queued = [
+        await scheduler.submit(str(paths["big"]), source="folder"),
+        await scheduler.submit(str(paths["small"]), source="folder"),
+        await scheduler.submit(str(paths["upload"]), source="upload"),
+    ]
+    assert scheduler.snapshot()["light"] == {"queued": 3, "running": 1, "workers": 1}
+
+    release.set()
+    results = await asyncio.gather(blocker, *queued)
+
+    assert order == ["blocker", "upload", "small", "big"]
+    assert results == ["folder", "folder", "folder", "upload"]
+    assert scheduler.snapshot()["light"]["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_textless_pdfs_are_moved_to_the_heavy_lane_when_dequeued(
+    configure_environment, monkeypatch
+):
+    from app.config import settings
+    from app.services import scheduler as scheduling
+
+    monkeypatch.setattr(settings, "enable_ocr", True)
+    folder = Path(configure_environment) / "scheduler-lanes"
+    folder.mkdir(parents=True, exist_ok=True)
+    scan = folder / "scan.pdf"
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    with scan.open("wb") as handle:
+        writer.write(handle)
+    note = folder / "note.txt"
+    note.write_text("plain text", encoding="utf-8")
+
+    # Submitting only stats the file; the text layer is probed by the worker.
+    assert scheduling.estimate(str(scan)) == ("light", scan.stat().st_size)
+    assert scheduling.estimate(str(note)) == ("light", len("plain text"))
+    assert scheduling.estimate(str(folder / "missing.pdf")) == ("light", 0)
+
+    async def runner(location: str, **kwargs) -> str:
+        return location
+
+    scheduler = scheduling.IngestionScheduler(runner, workers={"light": 1, "heavy": 1})
+    dispatched: list[str] = []
+    enqueue = scheduler._enqueue
+
+    def recording_enqueue(entry):
+        dispatched.append(f"{Path(entry.location).name}:{entry.lane}")
+        enqueue(entry)
+
+    monkeypatch.setattr(scheduler, "_enqueue", recording_enqueue)
+    await asyncio.gather(
+        await scheduler.submit(str(scan), source="folder"),
+        await scheduler.submit(str(note), source="folder"),
+    )
+    assert dispatched == ["scan.pdf:light", "note.txt:light", "scan.pdf:heavy"]
+
+
+@pytest.mark.asyncio
+async def test_waiting_items_age_within_their_source_but_uploads_stay_first(
+    configure_environment, monkeypatch
+):
+    from app.config import settings
+    from app.services.scheduler import IngestionScheduler, age_bonus
+
+    monkeypatch.setattr(settings, "scheduler_aging_seconds", 0.005)
+    assert age_bonus(3600) == 9  # capped below the 10-rank gap between sources
+    folder = Path(configure_environment) / "scheduler-ageing"
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, size in [("blocker", 1), ("backlog", 5000), ("small", 10), ("upload", 2000)]:
+        paths[name] = folder / f"{name}.txt"
+        paths[name].write_text("x" * size, encoding="utf-8")
+
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def runner(location: str, **kwargs) -> str:
+        if Path(location).stem == "blocker":
+            await release.wait()
+        order.append(Path(location).stem)
+        return location
+
+    scheduler = IngestionScheduler(runner, workers={"light": 1, "heavy": 1})
+    blocker = await scheduler.submit(str(paths["blocker"]), source="folder")
+    await asyncio.sleep(0)
+    backlog = await scheduler.submit(str(paths["backlog"]), source="folder")
+    await asyncio.sleep(0.3)  # the backlog item has waited far longer than the ageing step
+    small = await scheduler.submit(str(paths["small"]), source="folder")
+    upload = await scheduler.submit(str(paths["upload"]), source="upload")
+
+    release.set()
+    await asyncio.gather(blocker, backlog, small, upload)
+    # The large backlog item overtakes newer small backfill, never the later upload.
+    assert order == ["blocker", "upload", "backlog", "small"]
@@ -0,0 +1,57 @@
+"""Per-stage ingestion timings recorded on runs and summarised as percentiles."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_runs_record_stage_timings_and_stats_aggregate_them(configure_environment):
+    from app.api.routes.ingestion import run_stage_stats
+    from app.database import IngestionRun, get_session
+    from app.services import ingestion
+
+    folder = Path(configure_environment) / "timed"
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(3):
+        path = folder / f"memo-{index}.txt"
+        path.write_text(f"Memo {index} from Ada Lovelace dated 2021-02-0{index + 1}.", "utf-8")
+        paths.append(path)
+
+    await ingestion.ingest_paths(paths, source="timing")
+
+    with get_session() as session:
+        runs = session.query(IngestionRun).filter_by(source="timing").all()
+        assert len(runs) == 3
+        for run in runs:
+            assert run.mime_type == "text/plain"
+            assert {"checksum", "parse", "classify", "db", "graph", "index"} <= set(
+                run.stage_timings
+            )
+            assert all(seconds >= 0 for seconds in run.stage_timings.values())
+
+    stats = await run_stage_stats(status="completed", source="timing", limit=100)
+    assert stats.runs == 3
+    assert stats.stages["parse"].count == 3
+    assert stats.stages["parse"].p50 <= stats.stages["parse"].p99 <= stats.stages["parse"].max
+    assert stats.by_mime_type["text/plain"]["db"].count == 3
+
+
+def test_summarise_stage_timings_groups_by_mime_type():
+    from app.services.timing import summarise_stage_timings
+
+    summary = summarise_stage_timings(
+        [
+            ("application/pdf", {"parse": 1.0, "ocr": 4.0}),
+            ("application/pdf", {"parse": 3.0}),
+            (None, {"parse": 2.0}),
+        ]
+    )
+
+    assert summary["all"]["parse"]["count"] == 3
+    assert summary["all"]["parse"]["p50"] == pytest.approx(2.0)
+    assert summary["application/pdf"]["ocr"]["max"] == pytest.approx(4.0)
+    assert summary["unknown"]["parse"]["mean"] == pytest.approx(2.0)
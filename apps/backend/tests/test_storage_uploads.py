@@ -0,0 +1,43 @@
+"""Streaming, content-addressed upload storage."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator, List
+
+import pytest
+
+
+async def _chunks(parts: List[bytes]) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+def test_save_stream_hashes_incrementally_into_content_addressed_paths(
+    configure_environment: Path,
+) -> None:
+    from app.services.storage import StorageService
+
+    storage = StorageService(Path(configure_environment) / "cas")
+    parts = [b"Settlement ", b"agreement ", b"dated 2022-03-04."]
+    path, checksum, mime_type = asyncio.run(storage.save_stream("Deal.TXT", _chunks(parts)))
+
+    assert checksum == hashlib.sha256(b"".join(parts)).hexdigest()
+    assert path == storage.base_directory / checksum[:2] / f"{checksum}.txt"
+    assert path.read_bytes() == b"".join(parts)
+    assert mime_type == "text/plain"
+
+    again, _, _ = asyncio.run(storage.save_stream("other-name.txt", _chunks(parts)))
+    assert again == path
+    assert not any(storage.incoming_directory.iterdir())
+
+
+def test_save_stream_enforces_size_limit(configure_environment: Path) -> None:
+    from app.services.storage import StorageService, UploadTooLargeError
+
+    storage = StorageService(Path(configure_environment) / "limited")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(storage.save_stream("big.txt", _chunks([b"x" * 8, b"y" * 8]), max_bytes=10))
+    assert not any(storage.incoming_directory.iterdir())
@@ -0,0 +1,69 @@
+"""Chunked parsing of large text and JSON inputs with bounded memory."""
+
+from __future__ import annotations
+
+import io
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+SENTENCE = "Meeting with Alice Smith on 2023-01-05 paid $1,200.00 to bob@example.com. "
+
+
+def test_chunked_metadata_matches_in_memory_parse(configure_environment, monkeypatch):
+    from app.services import parser
+    from app.services.formats import text as text_format
+
+    text = SENTENCE * 12 + "Final sign-off by Carol King on 01/02/2024"
+    expected = parser.DocumentParser().parse_stream(io.BytesIO(text.encode()), "memo.txt")
+
+    monkeypatch.setattr(text_format, "STREAM_CHUNK_CHARS", 64)
+    streaming = parser.DocumentParser(streaming_threshold=100, max_text_chars=150)
+    path = Path(configure_environment) / "large-memo.txt"
+    path.write_text(text, encoding="utf-8")
+    parsed = streaming.parse(path)
+
+    warnings = parsed.metadata.pop("parse_warnings")
+    assert parsed.metadata == expected.metadata
+    assert len(parsed.metadata["monetary_amounts"]) == 12
+    assert parsed.text == text[:150]
+    assert "truncated to 150" in warnings[0]
+
+
+def test_json_is_tokenised_incrementally(configure_environment, monkeypatch):
+    from app.services import parser
+    from app.services.formats import text as text_format
+
+    monkeypatch.setattr(text_format, "STREAM_CHUNK_CHARS", 16)
+    document = {"custodian": "Grace Hopper", "items": [{"amount": 5, "note": 'say "hi"'}]}
+    streaming = parser.DocumentParser(streaming_threshold=10)
+
+    parsed = streaming.parse_stream(io.BytesIO(json.dumps(document).encode()), "export.json")
+
+    assert parsed.text.splitlines() == ["custodian: Grace Hopper", "amount: 5", 'note: say "hi"']
+    assert parsed.metadata["entities"] == ["Grace Hopper"]
+    with pytest.raises(ValueError):
+        streaming.parse_stream(io.BytesIO(b'{"open": [1, 2'), "broken.json")
+
+
+def test_json_rendering_memory_is_independent_of_input_size(configure_environment):
+    from app.services.formats.text import render_json_stream
+
+    def _records(count: int):
+        yield "["
+        for index in range(count):
+            yield ("," if index else "") + json.dumps({"id": index, "body": "x" * 2000})
+        yield "]"
+
+    tracemalloc.start()
+    lines = 0
+    for block in render_json_stream(_records(4_000)):
+        lines += block.count("\n")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert lines == 8_000
+    # ~8 MB of JSON flows through; only a couple of rendered blocks are alive at once.
+    assert peak < 4 * 1024**2
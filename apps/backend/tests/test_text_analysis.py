@@ -0,0 +1,161 @@
+"""Single-pass metadata scanning shared by the parser and classifier."""
+
+from __future__ import annotations
+
+from functools import cached_property
+from pathlib import Path
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+TEXT = (
+    "Alice Smith Jones met Grace Hopper on 2020-04-01 and 12/3/21 (not a2020-01-01). "
+    "She paid $1,200.50 and $ 300 to bob.jones@example.com, -foo@bar.org and "
+    "2021-02-03@dates.example; Court Clerk filed on.2022-05-06."
+)
+
+
+def test_single_pass_scan_matches_individual_patterns():
+    from app.services import parser
+    from app.services.analysis import TextAnalysis, scan_metadata
+
+    analysis = TextAnalysis.scan(TEXT)
+    patterns = {
+        "dates": parser.DATE_PATTERN,
+        "monetary_amounts": parser.MONEY_PATTERN,
+        "emails": parser.EMAIL_PATTERN,
+        "entities": parser.ENTITY_PATTERN,
+    }
+    for kind, pattern in patterns.items():
+        assert analysis.values(kind) == pattern.findall(TEXT), kind
+    for value, start, end in analysis.matches["emails"]:
+        assert TEXT[start:end] == value
+    assert analysis.tokens == parser.parser_service.tokenize(TEXT)
+    assert "grace" in analysis.tokens
+
+    # A chunked scan that stops at ``until`` resumes without re-reporting straddling matches.
+    cut = TEXT.index("Grace") + 2
+    head, overhang = scan_metadata(TEXT, until=cut)
+    assert head["entities"][-1][0] == "Grace Hopper"
+    rest, _ = scan_metadata(TEXT[cut:], skip=overhang)
+    assert [value for value, _, _ in rest["entities"]] == ["Court Clerk"]
+
+
+def test_parsed_documents_carry_their_analysis(configure_environment):
+    from app.services.classifier import DocumentClassifier
+    from app.services.parser import parser_service
+
+    parsed = parser_service.analyze("Invoice balance due from Alan Turing: $40.")
+    scores = DocumentClassifier().score_content(parsed.text, parsed)
+    assert scores.document_type == "financial"
+    assert scores.token_count == len(parsed.tokens)
+    assert parsed.values("monetary_amounts") == ["40"]
+
+
+def test_term_matrix_matches_a_refitted_tfidf_vectorizer():
+    from app.services.analysis import TermMatrix, TextAnalysis
+
+    corpus = [
+        "The contract between Alice Smith and Acme, signed January 5.",
+        "Invoice balance due: $40 for account 12 of Alan Turing.",
+        "Privileged and confidential: attorney work product about the contract.",
+    ]
+    query = "Alice contract zebra account"
+    vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2))
+    documents = vectorizer.fit_transform(corpus)
+    expected = cosine_similarity(vectorizer.transform([query]), documents)
+
+    terms = TermMatrix()
+    for text in corpus:
+        terms.append(TextAnalysis(text).vector)
+    assert list(terms.similarities(TextAnalysis(query).vector)) == pytest.approx(list(expected[0]))
+
+
+def test_term_matrix_stacks_buffered_rows_in_batches():
+    from app.services import analysis
+    from app.services.analysis import TermMatrix, TextAnalysis
+
+    vectors = [
+        TextAnalysis(f"Memo {index} about contract {index % 7} and invoice {index % 11}").vector
+        for index in range(analysis._STACK_ROWS + 10)
+    ]
+    terms = TermMatrix()
+    for vector in vectors:
+        terms.append(vector)
+
+    assert len(terms) == len(vectors)
+    assert len(terms._pending) == 10  # the first batch was stacked in one copy
+    query = TextAnalysis("contract 3 invoice").vector
+    buffered = terms.similarities(query)
+    reloaded = TermMatrix(terms.counts)
+    assert not terms._pending
+    assert list(buffered) == pytest.approx(list(reloaded.similarities(query)))
+
+
+@pytest.mark.asyncio
+async def test_flow_tokenises_once_and_appends_to_the_index(configure_environment, monkeypatch):
+    from app.services import analysis, ingestion
+    from app.services.retrieval import retriever_service
+
+    tokenised: list[str] = []
+    tokens = analysis.TextAnalysis.tokens
+
+    def counting(self):
+        tokenised.append(self.text)
+        return tokens.func(self)
+
+    counted = cached_property(counting)
+    counted.__set_name__(analysis.TextAnalysis, "tokens")
+    monkeypatch.setattr(analysis.TextAnalysis, "tokens", counted)
+
+    def no_rebuild():
+        raise AssertionError("ingestion should not rebuild the index")
+
+    retriever_service.search("warm up")  # load any index written by earlier tests
+    monkeypatch.setattr(retriever_service, "rebuild", no_rebuild)
+
+    text = "Confidential settlement memo from counsel regarding the zeppelin lease."
+    path = Path(configure_environment) / "analysis" / "memo.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, "utf-8")
+    external_id = await ingestion.ingest_document_flow(str(path), source="analysis")
+
+    assert tokenised.count(text) == 1
+    results = retriever_service.search("zeppelin lease", top_k=1)
+    assert results[0].document_id == external_id
+
+
+def test_index_appends_are_written_in_batches_and_survive_reloads(configure_environment, tmp_path):
+    import json
+
+    from app.services.analysis import TextAnalysis
+    from app.services.retrieval import HybridRetriever
+
+    directory = tmp_path / "index"
+    HybridRetriever(directory).rebuild()
+    api = HybridRetriever(directory, persist_every=3, persist_seconds=3600)
+    worker = HybridRetriever(directory, persist_every=1)
+
+    def stored_ids() -> list[str]:
+        return json.loads((directory / "doc_ids.json").read_text(encoding="utf-8"))
+
+    corpus = stored_ids()
+    api.add_document("api-1", TextAnalysis("Zeppelin hangar lease for Amelia Earhart"), {})
+    api.add_document("api-2", TextAnalysis("Glider invoice for Orville Wright"), {})
+    assert stored_ids() == corpus
+    assert api.search("zeppelin hangar", top_k=1)[0].document_id == "api-1"
+
+    # Another process writes the index; documents appended here are kept on reload.
+    worker.add_document("worker-1", TextAnalysis("Balloon permit for Jacques Charles"), {})
+    assert stored_ids() == corpus + ["worker-1"]
+    assert {"api-1", "api-2", "worker-1"} <= {
+        result.document_id for result in api.search("zeppelin glider balloon", top_k=50)
+    }
+
+    api.flush()
+    assert stored_ids() == corpus + ["worker-1", "api-1", "api-2"]
+    api.add_document("api-3", TextAnalysis("Airship charter for Hugo Eckener"), {})
+    api.add_document("api-4", TextAnalysis("Hangar repairs for Hugo Junkers"), {})
+    api.add_document("api-5", TextAnalysis("Propeller order for Louis Bleriot"), {})
+    assert stored_ids()[-3:] == ["api-3", "api-4", "api-5"]
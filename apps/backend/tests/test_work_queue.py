@@ -0,0 +1,75 @@
+"""Durable work queue with leases drained by ingestion worker processes."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+def _documents(folder: Path, count: int) -> list[str]:
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = folder / f"queued-{index}.txt"
+        path.write_text(f"Queued memo {index} signed by Katherine Johnson", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.asyncio
+async def test_queue_mode_api_enqueues_and_worker_completes_job(configure_environment, monkeypatch):
+    from app.config import settings
+    from app.database import Document, WorkItem, get_session
+    from app.services.jobs import job_manager
+    from app.services.work_queue import work_queue
+    from app.worker import IngestionWorker
+
+    monkeypatch.setattr(settings, "ingestion_queue_mode", "queue")
+    paths = _documents(Path(configure_environment) / "work-queue", 3)
+    job_id = await job_manager.submit(
+        paths + [paths[0] + ".missing"], source="api", filenames={paths[1]: "Memo.txt"}
+    )
+
+    assert job_manager.get(job_id).status == "queued"
+    assert work_queue.stats() == {"queued": 4}
+
+    completed = await IngestionWorker("test-worker", batch_size=3).run(drain=True)
+
+    assert completed == 4
+    job = job_manager.get(job_id)
+    assert (job.status, job.processed, job.failed) == ("completed", 3, 1)
+    with get_session() as session:
+        items = session.query(WorkItem).filter_by(job_id=job_id).order_by(WorkItem.id).all()
+        assert [item.status for item in items] == ["done", "done", "done", "failed"]
+        assert all(item.lease_owner == "test-worker" for item in items)
+        named = session.query(Document).filter_by(external_id=items[1].external_id).one()
+        assert named.metadata_json["original_filename"] == "Memo.txt"
+
+
+def test_expired_leases_are_reclaimed_and_stale_results_rejected(
+    configure_environment, monkeypatch
+):
+    from app.config import settings
+    from app.services.work_queue import work_queue
+
+    monkeypatch.setattr(settings, "worker_max_attempts", 2)
+    failed_before = work_queue.stats().get("failed", 0)
+    [item_id] = work_queue.enqueue(["/nowhere/lease.txt"], source="api")
+
+    [first] = work_queue.claim("crashed", limit=1, lease_seconds=-1)
+    [second] = work_queue.claim("healthy", limit=1, lease_seconds=60)
+    assert first.id == second.id == item_id
+    assert second.attempts == 2
+    assert work_queue.claim("idle", limit=1) == []
+    assert work_queue.heartbeat(second.token, lease_seconds=60) == 1
+
+    assert not work_queue.complete(first, external_id="doc-stale")
+    assert work_queue.complete(second, error="not found")
+    assert work_queue.stats()["failed"] == failed_before + 1
+
+    work_queue.enqueue(["/nowhere/poison.txt"], source="api")
+    work_queue.claim("a", limit=1, lease_seconds=-1)
+    work_queue.claim("b", limit=1, lease_seconds=-1)
+    assert work_queue.claim("c", limit=1) == []
+    assert work_queue.stats()["failed"] == failed_before + 2